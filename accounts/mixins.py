@@ -3,6 +3,8 @@ from django.core.exceptions import PermissionDenied
 from django.shortcuts import redirect
 from django.contrib import messages
 
+from .utils import load_user_profiles
+
 
 class AdminRequiredMixin(LoginRequiredMixin):
     """Mixin to require that the user has an AdminProfile."""
@@ -11,6 +13,7 @@ class AdminRequiredMixin(LoginRequiredMixin):
         if not request.user.is_authenticated:
             return self.handle_no_permission()
         
+        load_user_profiles(request.user)
         if not hasattr(request.user, 'adminprofile'):
             messages.error(request, 'You do not have permission to access this page.')
             raise PermissionDenied("Admin access required.")
@@ -25,6 +28,7 @@ class TrainerRequiredMixin(LoginRequiredMixin):
         if not request.user.is_authenticated:
             return self.handle_no_permission()
         
+        load_user_profiles(request.user)
         if not hasattr(request.user, 'trainer'):
             messages.error(request, 'You do not have permission to access this page.')
             raise PermissionDenied("Trainer access required.")
@@ -39,6 +43,7 @@ class StaffRequiredMixin(LoginRequiredMixin):
         if not request.user.is_authenticated:
             return self.handle_no_permission()
         
+        load_user_profiles(request.user)
         if not hasattr(request.user, 'staff'):
             messages.error(request, 'You do not have permission to access this page.')
             raise PermissionDenied("Staff access required.")
@@ -53,6 +58,7 @@ class MemberRequiredMixin(LoginRequiredMixin):
         if not request.user.is_authenticated:
             return self.handle_no_permission()
         
+        load_user_profiles(request.user)
         if not hasattr(request.user, 'member'):
             messages.error(request, 'You do not have a member profile. Please contact support.')
             raise PermissionDenied("Member access required.")
@@ -67,6 +73,7 @@ class StaffOrAdminRequiredMixin(LoginRequiredMixin):
         if not request.user.is_authenticated:
             return self.handle_no_permission()
         
+        load_user_profiles(request.user)
         if not (hasattr(request.user, 'staff') or hasattr(request.user, 'adminprofile')):
             messages.error(request, 'You do not have permission to access this page.')
             raise PermissionDenied("Staff or Admin access required.")
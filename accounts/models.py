@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.core.validators import RegexValidator
 from django.core.exceptions import ValidationError
@@ -69,6 +70,10 @@ class User(AbstractUser):
         verbose_name = 'User'
         verbose_name_plural = 'Users'
         ordering = ['-created_at']
+        indexes = [
+            # Serves the type-ahead member search's UPPER(full_name) prefix range
+            models.Index(Upper('full_name'), name='users_full_name_upper_idx'),
+        ]
     
     def __str__(self):
         return self.email or self.username
@@ -102,8 +107,8 @@ class ActiveMemberQuerySet(models.QuerySet):
         )
     
     def with_active_subscription(self):
-        """Return members with at least one active subscription."""
-        return self.filter(subscriptions__status='active').distinct()
+        """Return members with an active subscription."""
+        return self.filter(current_subscription_status='active')
 
 
 class ActiveMemberManager(models.Manager):
@@ -152,7 +157,13 @@ class BaseProfile(models.Model):
 
 
 class Member(BaseProfile):
-    """Member profile for gym members with soft delete support."""
+    """
+    Member profile for gym members with soft delete support.
+    
+    search_text and current_subscription_* are written only by their services
+    with queryset updates. Save existing members with update_fields, so a
+    stale instance cannot write old values back over them.
+    """
     
     emergency_contact = models.CharField(max_length=150, blank=True, help_text="Emergency contact name and phone")
     deactivated_at = models.DateTimeField(
@@ -160,6 +171,17 @@ class Member(BaseProfile):
         blank=True,
         help_text="Timestamp when member account was deactivated"
     )
+    # Lower-cased "name email phone" for member search; maintained by
+    # MemberSearchService from User/Member signals, never edited directly.
+    search_text = models.TextField(blank=True, default='', editable=False)
+    # Denormalized pointer to the member's current subscription: the active
+    # one, else the newest pending one, else the newest of any status. Kept by
+    # SubscriptionService.sync_current_subscriptions in the same transaction
+    # as every status change. A plain id rather than a ForeignKey so accounts
+    # does not take a migration dependency on gym_management.
+    current_subscription_id = models.BigIntegerField(null=True, blank=True, editable=False)
+    current_subscription_status = models.CharField(max_length=20, blank=True, default='', editable=False)
+    current_subscription_end_date = models.DateField(null=True, blank=True, editable=False)
     
     # Custom managers - Order matters! First manager becomes default for admin
     objects = ActiveMemberManager()  # Default: only active members
@@ -169,6 +191,9 @@ class Member(BaseProfile):
         db_table = 'members'
         verbose_name = 'Member'
         verbose_name_plural = 'Members'
+        indexes = [
+            models.Index(fields=['current_subscription_status']),
+        ]
     
     def delete(self, using=None, keep_parents=False):
         """Prevent hard deletion of members with financial history."""
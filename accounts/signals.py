@@ -1,9 +1,9 @@
 import logging
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from allauth.account.signals import email_confirmed
-from .models import User, Member
+from .models import AdminProfile, Member, Staff, Trainer, User
 
 
 logger = logging.getLogger('security.audit')
@@ -57,3 +57,21 @@ def create_member_for_superuser(sender, instance, created, **kwargs):
                 'SUPERUSER_PROFILE_CREATED | user=%s | profile=member',
                 instance.email,
             )
+
+
+@receiver(post_delete, sender=AdminProfile)
+@receiver(post_delete, sender=Trainer)
+@receiver(post_delete, sender=Staff)
+@receiver(post_delete, sender=Member)
+def clear_cached_profile_on_delete(sender, instance, **kwargs):
+    """
+    Forget a deleted profile on the user instance it was loaded through.
+    
+    load_user_profiles() caches profiles on the user object for the rest of
+    the request, so a role change made mid-request must be reflected there.
+    Newly saved profiles update that cache themselves via the forward
+    one-to-one assignment.
+    """
+    user = sender._meta.get_field('user').get_cached_value(instance, default=None)
+    if user is not None:
+        User._meta.get_field(sender._meta.model_name).set_cached_value(user, None)
@@ -5,7 +5,8 @@ from django.urls import reverse
 from allauth.account.models import EmailAddress, EmailConfirmationHMAC
 from allauth.account.signals import email_confirmed
 
-from .models import Member
+from .models import AdminProfile, Member
+from .utils import can_manage_users, get_user_profile, get_user_role
 
 User = get_user_model()
 
@@ -50,6 +51,38 @@ class EmailConfirmationSignalTests(TestCase):
 		self.assertEqual(Member.objects.filter(user=self.user).count(), 1)
 
 
+class RoleResolutionTests(TestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(
+			email='role-user@test.com',
+			username='role_user',
+			password='testpass123',
+			full_name='Role User',
+			is_verified=True,
+		)
+
+	def test_role_and_profile_resolve_with_one_query(self):
+		AdminProfile.objects.create(user=self.user, access_level='full')
+		user = User.objects.get(pk=self.user.pk)
+
+		with self.assertNumQueries(1):
+			self.assertEqual(get_user_role(user), 'admin')
+			self.assertIsInstance(get_user_profile(user), AdminProfile)
+			self.assertTrue(can_manage_users(user))
+			self.assertFalse(hasattr(user, 'member'))
+
+	def test_deleted_profile_is_forgotten_on_the_same_instance(self):
+		member = Member.objects.create(user=self.user)
+		user = User.objects.get(pk=self.user.pk)
+		self.assertEqual(get_user_role(user), 'member')
+
+		user.member.delete()
+
+		with self.assertNumQueries(0):
+			self.assertIsNone(get_user_role(user))
+		self.assertFalse(Member.all_objects.filter(pk=member.pk).exists())
+
+
 class AuthenticationSurfaceTests(TestCase):
 	def test_login_template_has_no_social_login_text(self):
 		response = self.client.get(reverse('account_login'))
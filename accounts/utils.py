@@ -2,6 +2,48 @@
 Utility functions for user profile and permission management.
 """
 
+# Reverse one-to-one profile accessors on User, in role priority order
+PROFILE_RELATIONS = ('adminprofile', 'trainer', 'staff', 'member')
+ROLE_BY_RELATION = {
+    'adminprofile': 'admin',
+    'trainer': 'trainer',
+    'staff': 'staff',
+    'member': 'member',
+}
+
+
+def load_user_profiles(user):
+    """
+    Load every role profile for a user in a single query.
+    
+    The profiles (or their absence) are stored in the user instance's related
+    object cache, so later ``hasattr(user, 'member')``-style checks on the same
+    instance are free. ``request.user`` lives for exactly one request, which
+    makes this a per-request memo: role lookup costs at most one query.
+    
+    Args:
+        user: User instance
+    """
+    if not user or not user.is_authenticated:
+        return
+    
+    from .models import User
+    
+    relations = [User._meta.get_field(name) for name in PROFILE_RELATIONS]
+    missing = [relation for relation in relations if not relation.is_cached(user)]
+    if not missing:
+        return
+    
+    loaded = User.objects.select_related(
+        *(relation.get_accessor_name() for relation in missing)
+    ).filter(pk=user.pk).first()
+    
+    for relation in missing:
+        profile = relation.get_cached_value(loaded, default=None) if loaded else None
+        if profile is not None:
+            relation.field.set_cached_value(profile, user)
+        relation.set_cached_value(user, profile)
+
 
 def get_user_role(user):
     """
@@ -16,15 +58,12 @@ def get_user_role(user):
     if not user or not user.is_authenticated:
         return None
     
+    load_user_profiles(user)
+    
     # Check in priority order
-    if hasattr(user, 'adminprofile'):
-        return 'admin'
-    elif hasattr(user, 'trainer'):
-        return 'trainer'
-    elif hasattr(user, 'staff'):
-        return 'staff'
-    elif hasattr(user, 'member'):
-        return 'member'
+    for relation in PROFILE_RELATIONS:
+        if hasattr(user, relation):
+            return ROLE_BY_RELATION[relation]
     
     return None
 
@@ -42,15 +81,12 @@ def get_user_profile(user):
     if not user or not user.is_authenticated:
         return None
     
+    load_user_profiles(user)
+    
     # Check in priority order
-    if hasattr(user, 'adminprofile'):
-        return user.adminprofile
-    elif hasattr(user, 'trainer'):
-        return user.trainer
-    elif hasattr(user, 'staff'):
-        return user.staff
-    elif hasattr(user, 'member'):
-        return user.member
+    for relation in PROFILE_RELATIONS:
+        if hasattr(user, relation):
+            return getattr(user, relation)
     
     return None
 
@@ -73,6 +109,8 @@ def user_has_permission(user, permission):
     if user.is_superuser:
         return True
     
+    load_user_profiles(user)
+    
     # Check if user has AdminProfile
     if hasattr(user, 'adminprofile'):
         admin_profile = user.adminprofile
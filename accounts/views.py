@@ -101,7 +101,9 @@ class ProfileUpdateView(LoginRequiredMixin, TemplateView):
         if user_form.is_valid() and (profile_form is None or profile_form.is_valid()):
             user_form.save()
             if profile_form:
-                profile_form.save()
+                # Only the form's columns, never the profile's service-maintained ones
+                profile = profile_form.save(commit=False)
+                profile.save(update_fields=[*profile_form._meta.fields, 'updated_at'])
             
             messages.success(request, 'Profile updated successfully!')
             return redirect('accounts_profile')
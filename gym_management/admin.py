@@ -3,10 +3,12 @@ from datetime import timedelta
 from django.contrib import admin
 from django.contrib import messages
 from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
 from django.utils.html import format_html
 from .forms import PaymentAdminForm, SubscriptionAdminForm
-from .models import MembershipPlan, Subscription, Payment, Attendance, Notification
-from .services import PaymentService
+from .models import MembershipPlan, Subscription, Payment, Attendance, GymLocation, Notification, OutboundEmail
+from .services import DashboardSnapshotService, PaymentService, RevenueLedgerService, SubscriptionService
 
 
 @admin.register(MembershipPlan)
@@ -105,7 +107,12 @@ class SubscriptionAdmin(admin.ModelAdmin):
     activate_subscriptions.short_description = "Activate selected subscriptions"
     
     def cancel_subscriptions(self, request, queryset):
-        updated = queryset.update(status='cancelled')
+        with transaction.atomic():
+            member_ids = set(queryset.values_list('member_id', flat=True))
+            updated = queryset.update(status='cancelled')
+            SubscriptionService.sync_current_subscriptions(member_ids)
+            # update() skips the post_save signals, so drop the snapshot on commit here.
+            DashboardSnapshotService.invalidate('subscriptions')
         self.message_user(request, f"{updated} subscriptions cancelled.")
     cancel_subscriptions.short_description = "Cancel selected subscriptions"
     
@@ -223,7 +230,7 @@ class PaymentAdmin(admin.ModelAdmin):
             obj.initiated_at = payment.initiated_at
             return
 
-        previous_payment = Payment.objects.get(pk=obj.pk)
+        previous_payment = Payment.objects.select_for_update().get(pk=obj.pk)
         obj.amount = obj.subscription.plan.price
 
         if previous_payment.status != 'completed' and form.cleaned_data.get('status') == 'completed':
@@ -232,26 +239,58 @@ class PaymentAdmin(admin.ModelAdmin):
             PaymentService.complete_payment(obj)
             return
 
+        if previous_payment.status == 'completed' and form.cleaned_data.get('status') != 'completed':
+            # Revenue reporting reads the ledger, so leaving 'completed' must
+            # take the payment back out of its bucket.
+            new_status = obj.status
+            obj.status = previous_payment.status
+            super().save_model(request, obj, form, change)
+            if new_status == 'refunded':
+                PaymentService.refund_payment(obj)
+            else:
+                obj.status = new_status
+                obj.save(update_fields=['status'])
+                RevenueLedgerService.record_reversal(previous_payment)
+            return
+
         super().save_model(request, obj, form, change)
 
 
+@admin.register(GymLocation)
+class GymLocationAdmin(admin.ModelAdmin):
+    """Admin for gym branches and their check-in geofences."""
+    
+    list_display = ('name', 'latitude', 'longitude', 'radius_meters', 'is_active', 'updated_at')
+    list_filter = ('is_active',)
+    search_fields = ('name', 'address')
+    ordering = ('name',)
+    
+    fieldsets = (
+        ('Branch', {'fields': ('name', 'address', 'is_active')}),
+        ('Geofence', {'fields': ('latitude', 'longitude', 'radius_meters')}),
+    )
+    
+    readonly_fields = ('created_at', 'updated_at')
+
+
 @admin.register(Attendance)
 class AttendanceAdmin(admin.ModelAdmin):
     """Admin for Attendance records."""
     
-    list_display = ('get_member_name', 'get_member_email', 'check_in', 'check_out', 'duration_hours', 'date')
-    list_filter = ('date', 'check_in')
+    list_display = ('get_member_name', 'get_member_email', 'location', 'channel', 'check_in', 'check_out', 'duration_hours', 'date')
+    list_filter = ('date', 'check_in', 'location', 'channel')
     search_fields = ('member__user__username', 'member__user__email', 'member__user__full_name')
     ordering = ('-check_in',)
     date_hierarchy = 'date'
     
     fieldsets = (
         ('Member', {'fields': ('member',)}),
-        ('Attendance', {'fields': ('check_in', 'check_out', 'date')}),
+        ('Attendance', {'fields': ('location', 'check_in', 'check_out', 'date')}),
+        ('Check-in Channel', {'fields': ('channel', 'check_in_latitude', 'check_in_longitude', 'check_in_distance_meters')}),
         ('Notes', {'fields': ('notes',)}),
     )
     
-    readonly_fields = ('check_in', 'date')
+    readonly_fields = ('check_in', 'date', 'channel', 'check_in_latitude', 'check_in_longitude', 'check_in_distance_meters')
     
     def get_member_name(self, obj):
         return obj.member.user.full_name
@@ -302,9 +341,32 @@ class NotificationAdmin(admin.ModelAdmin):
     
     def send_email_notifications(self, request, queryset):
         from .services import NotificationService
-        count = 0
-        for notification in queryset.filter(email_sent=False, channel__in=['email', 'both']):
-            if NotificationService.send_email_notification(notification):
-                count += 1
-        self.message_user(request, f"{count} email notifications sent.")
+        pending = queryset.filter(
+            email_sent=False, channel__in=['email', 'both']
+        ).select_related('member__user', 'subscription__plan')
+        queued = NotificationService.queue_email_notifications(pending)
+        self.message_user(request, f"{queued} email notifications queued for delivery.")
     send_email_notifications.short_description = "Send email for selected notifications"
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    """Admin for the outbound email queue."""
+    
+    list_display = ('to_email', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at', 'created_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('to_email', 'subject')
+    ordering = ('-created_at',)
+    date_hierarchy = 'created_at'
+    
+    readonly_fields = ('notification', 'attempts', 'locked_at', 'locked_by', 'last_error', 'sent_at', 'created_at')
+    
+    actions = ['retry_now']
+    
+    def retry_now(self, request, queryset):
+        # Rows in 'sending' belong to a live worker; attempts keeps the backoff history.
+        count = queryset.filter(status__in=['failed', 'pending']).update(
+            status='pending', next_attempt_at=timezone.now(), locked_at=None
+        )
+        self.message_user(request, f"{count} emails rescheduled for immediate delivery.")
+    retry_now.short_description = "Retry selected emails now"
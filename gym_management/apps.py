@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class GymManagementConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'gym_management'
+    
+    def ready(self):
+        """Import signals when the app is ready."""
+        from django.db.models.signals import post_migrate
+
+        import gym_management.signals
+
+        post_migrate.connect(gym_management.signals.ensure_member_search_index, sender=self)
@@ -1,11 +1,11 @@
 from django import forms
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from django.db.models import Case, CharField, Exists, IntegerField, OuterRef, Q, Value, When
+from django.db.models import Q
 from django.utils import timezone
 from accounts.models import Member
 from .models import MembershipPlan, Subscription, Payment, Attendance
-from .services import PaymentService, SubscriptionService
+from .services import MemberChoiceService, PaymentService, SubscriptionService
 from datetime import timedelta
 
 User = get_user_model()
@@ -18,45 +18,53 @@ def normalize_model_pk(value):
 
 
 def get_member_subscription_status_queryset(current_member_id=None):
+    """Members selectable on subscription forms; choices and labels come from MemberChoiceService."""
     current_member_id = normalize_model_pk(current_member_id)
-    pending_subscriptions = Subscription.objects.filter(member=OuterRef('pk'), status='pending')
-    active_subscriptions = Subscription.objects.filter(member=OuterRef('pk'), status='active')
-    expired_subscriptions = Subscription.objects.filter(member=OuterRef('pk'), status='expired')
-    cancelled_subscriptions = Subscription.objects.filter(member=OuterRef('pk'), status='cancelled')
-
     member_filter = Q(is_active=True)
     if current_member_id:
         member_filter |= Q(pk=current_member_id)
+    return Member.all_objects.filter(member_filter).select_related('user')
 
-    return (
-        Member.all_objects.filter(member_filter)
-        .select_related('user')
-        .annotate(
-            has_pending_subscription=Exists(pending_subscriptions),
-            has_active_subscription=Exists(active_subscriptions),
-            has_expired_subscription=Exists(expired_subscriptions),
-            has_cancelled_subscription=Exists(cancelled_subscriptions),
-        )
-        .annotate(
-            subscription_status_label=Case(
-                When(has_pending_subscription=True, then=Value('Pending')),
-                When(has_active_subscription=True, then=Value('Active')),
-                When(has_expired_subscription=True, then=Value('Expired')),
-                When(has_cancelled_subscription=True, then=Value('Cancelled')),
-                default=Value('No Subscription'),
-                output_field=CharField(),
-            ),
-            subscription_status_rank=Case(
-                When(has_pending_subscription=True, then=Value(0)),
-                When(has_active_subscription=True, then=Value(1)),
-                When(has_expired_subscription=True, then=Value(2)),
-                When(has_cancelled_subscription=True, then=Value(3)),
-                default=Value(4),
-                output_field=IntegerField(),
-            ),
+
+class MemberStatusChoiceIterator(forms.models.ModelChoiceIterator):
+    """Yield cached (id, "Name (Status)") choices instead of iterating the queryset."""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        yield from MemberChoiceService.get_choices(extra_member_id=self.field.current_member_id)
+
+    def __len__(self):
+        return len(MemberChoiceService.get_choices(extra_member_id=self.field.current_member_id)) + (
+            self.field.empty_label is not None
         )
-        .order_by('subscription_status_rank', 'user__full_name')
-    )
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(MemberChoiceService.get_entries())
+
+
+class MemberStatusChoiceField(forms.ModelChoiceField):
+    """
+    Member picker labelled and ordered by subscription status.
+
+    Rendering reads the cached choices; only validating a submitted member
+    queries the database.
+    """
+    iterator = MemberStatusChoiceIterator
+
+    def __init__(self, *args, **kwargs):
+        self.current_member_id = None
+        super().__init__(*args, **kwargs)
+
+    def set_current_member(self, current_member_id):
+        """Restrict to active members plus the member of the subscription being edited."""
+        self.current_member_id = normalize_model_pk(current_member_id)
+        if isinstance(self.current_member_id, str):
+            self.current_member_id = int(self.current_member_id) if self.current_member_id.isdigit() else None
+        self.queryset = get_member_subscription_status_queryset(self.current_member_id)
+
+    def label_from_instance(self, obj):
+        return format_member_status_label(obj)
 
 
 def get_subscription_payment_queryset(current_subscription_id=None):
@@ -72,16 +80,8 @@ def get_subscription_payment_queryset(current_subscription_id=None):
 
 
 def format_member_status_label(member):
-    status_label = getattr(member, 'subscription_status_label', 'No Subscription')
-    if status_label == 'No Subscription':
-        if member.subscriptions.filter(status='pending').exists():
-            status_label = 'Pending'
-        elif member.subscriptions.filter(status='active').exists():
-            status_label = 'Active'
-        elif member.subscriptions.filter(status='expired').exists():
-            status_label = 'Expired'
-        elif member.subscriptions.filter(status='cancelled').exists():
-            status_label = 'Cancelled'
+    entry = MemberChoiceService.get_entry(member.pk)
+    status_label = entry[2] if entry else MemberChoiceService.NO_SUBSCRIPTION_LABEL
     return f"{member.user.full_name} ({status_label})"
 
 
@@ -314,7 +314,7 @@ class SubscriptionBaseForm(forms.ModelForm):
 class SubscriptionForm(SubscriptionBaseForm):
     """Shared form for creating and updating subscriptions."""
 
-    member = forms.ModelChoiceField(
+    member = MemberStatusChoiceField(
         queryset=Member.objects.filter(is_active=True).select_related('user'),
         widget=forms.Select(attrs={
             'class': (
@@ -332,10 +332,7 @@ class SubscriptionForm(SubscriptionBaseForm):
         super().__init__(*args, **kwargs)
         self.is_update = bool(self.instance and self.instance.pk)
         current_member_id = self.instance.member_id or self.data.get('member') or self.initial.get('member')
-        self.fields['member'].queryset = get_member_subscription_status_queryset(
-            current_member_id=current_member_id,
-        )
-        self.fields['member'].label_from_instance = format_member_status_label
+        self.fields['member'].set_current_member(current_member_id)
         if self.is_update:
             self.fields['member'].required = False
             self.fields['member'].initial = self.instance.member
@@ -407,6 +404,9 @@ class PaymentCreateForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        # The admin makes subscription read-only once the payment exists.
+        if 'subscription' not in self.fields:
+            return
         current_subscription_id = self.instance.subscription_id or self.data.get('subscription') or self.initial.get('subscription')
         self.fields['subscription'].queryset = get_subscription_payment_queryset(
             current_subscription_id=current_subscription_id,
@@ -442,6 +442,8 @@ class PaymentCreateForm(forms.ModelForm):
 
 
 class SubscriptionAdminForm(forms.ModelForm):
+    member = MemberStatusChoiceField(queryset=Member.objects.select_related('user'))
+
     class Meta:
         model = Subscription
         fields = ['member', 'plan', 'start_date', 'end_date', 'status']
@@ -449,8 +451,7 @@ class SubscriptionAdminForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         current_member_id = self.instance.member_id or self.data.get('member') or self.initial.get('member')
-        self.fields['member'].queryset = get_member_subscription_status_queryset(current_member_id=current_member_id)
-        self.fields['member'].label_from_instance = format_member_status_label
+        self.fields['member'].set_current_member(current_member_id)
 
     def clean(self):
         cleaned_data = super().clean()
@@ -484,6 +485,9 @@ class PaymentAdminForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        # The admin makes subscription read-only once the payment exists.
+        if 'subscription' not in self.fields:
+            return
         current_subscription_id = self.instance.subscription_id or self.data.get('subscription') or self.initial.get('subscription')
         self.fields['subscription'].queryset = get_subscription_payment_queryset(
             current_subscription_id=current_subscription_id,
@@ -0,0 +1,185 @@
+"""
+Management command to re-check self check-in coordinates against the geofences.
+
+For fraud review, stored QR check-in coordinates are read in primary-key
+ordered chunks and each chunk is checked against every active gym branch in
+one vectorized call:
+    python manage.py audit_checkin_locations
+    python manage.py audit_checkin_locations --since 2026-01-01 --until 2026-03-31 --output outside.csv
+
+A CSV export (columns ``latitude`` and ``longitude``, plus an optional ``id``)
+can be audited instead of the attendance table:
+    python manage.py audit_checkin_locations --input checkins.csv --chunk-size 50000
+
+NumPy is used when installed; otherwise the pure-Python fallback runs, which
+gives identical results more slowly.
+
+What this command does:
+1. Loads the active gym branch geofences (or the settings-defined gym)
+2. Streams check-in coordinates in fixed-size chunks so memory stays flat
+3. Reports how many check-ins fell outside every geofence, optionally writing them to a CSV
+"""
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from gym_management.models import Attendance
+from gym_management.services import GeofenceService
+from gym_management.utils import location
+
+
+class Command(BaseCommand):
+    help = 'Re-check stored check-in coordinates against the gym geofences'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--input',
+            help='Audit this CSV file (latitude, longitude and optional id columns) instead of stored check-ins'
+        )
+        parser.add_argument(
+            '--since',
+            help='Only audit stored check-ins on or after this date (YYYY-MM-DD)'
+        )
+        parser.add_argument(
+            '--until',
+            help='Only audit stored check-ins on or before this date (YYYY-MM-DD)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=10000,
+            help='Coordinates checked per vectorized call'
+        )
+        parser.add_argument(
+            '--output',
+            help='Write check-ins outside every geofence to this CSV file'
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        if chunk_size <= 0:
+            raise CommandError('--chunk-size must be greater than 0.')
+
+        fences = GeofenceService.get_fences()
+        self.stdout.write(
+            f"Auditing against {len(fences)} geofence(s) "
+            f"using {'NumPy' if location.np is not None else 'pure Python'}"
+        )
+
+        if options['input']:
+            chunks = self._csv_chunks(options['input'], chunk_size)
+        else:
+            chunks = self._attendance_chunks(
+                self._parse_date(options['since'], '--since'),
+                self._parse_date(options['until'], '--until'),
+                chunk_size,
+            )
+
+        writer = None
+        output = None
+        if options['output']:
+            output = open(options['output'], 'w', newline='')
+            writer = csv.writer(output)
+            writer.writerow(['id', 'latitude', 'longitude', 'nearest_location', 'distance_meters'])
+
+        checked = 0
+        outside = 0
+        started = time.monotonic()
+        try:
+            for chunk in chunks:
+                outside += self._audit_chunk(chunk, fences, writer)
+                checked += len(chunk)
+        finally:
+            if output is not None:
+                output.close()
+
+        elapsed = time.monotonic() - started
+        rate = checked / elapsed if elapsed > 0 else checked
+        self.stdout.write(self.style.SUCCESS(
+            f"Check-ins audited: {checked} ({rate:.0f} rows/sec)"
+        ))
+        if outside:
+            self.stdout.write(self.style.WARNING(f"Outside every geofence: {outside}"))
+        else:
+            self.stdout.write("Outside every geofence: 0")
+
+    def _parse_date(self, value, option):
+        if not value:
+            return None
+        parsed = parse_date(value)
+        if parsed is None:
+            raise CommandError(f"{option} must be a date in YYYY-MM-DD format.")
+        return parsed
+
+    def _attendance_chunks(self, since, until, chunk_size):
+        """Yield (id, latitude, longitude) chunks of stored QR check-ins by keyset on pk."""
+        queryset = Attendance.objects.filter(
+            channel=Attendance.CHANNEL_QR,
+            check_in_latitude__isnull=False,
+            check_in_longitude__isnull=False,
+        )
+        if since:
+            queryset = queryset.filter(date__gte=since)
+        if until:
+            queryset = queryset.filter(date__lte=until)
+
+        last_pk = 0
+        while True:
+            rows = list(
+                queryset.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', 'check_in_latitude', 'check_in_longitude')[:chunk_size]
+            )
+            if not rows:
+                return
+            yield [(pk, float(lat), float(lon)) for pk, lat, lon in rows]
+            last_pk = rows[-1][0]
+
+    def _csv_chunks(self, path, chunk_size):
+        """Yield (id, latitude, longitude) chunks from a CSV export."""
+        try:
+            source = open(path, newline='')
+        except OSError as exc:
+            raise CommandError(f"Cannot read {path}: {exc}")
+
+        with source:
+            reader = csv.DictReader(source)
+            missing = {'latitude', 'longitude'} - set(reader.fieldnames or [])
+            if missing:
+                raise CommandError(f"Input is missing column(s): {', '.join(sorted(missing))}")
+
+            chunk = []
+            for line_number, row in enumerate(reader, start=2):
+                try:
+                    chunk.append((row.get('id') or line_number, float(row['latitude']), float(row['longitude'])))
+                except (TypeError, ValueError):
+                    self.stdout.write(self.style.WARNING(f"Skipping line {line_number}: invalid coordinates"))
+                    continue
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+    def _audit_chunk(self, chunk, fences, writer):
+        """Check one chunk and record points outside all fences; returns their count."""
+        result = location.batch_geofence_check(
+            [lat for _, lat, _ in chunk],
+            [lon for _, _, lon in chunk],
+            fences,
+        )
+        outside = 0
+        for index, inside in enumerate(result.inside):
+            if inside:
+                continue
+            outside += 1
+            if writer is not None:
+                record_id, lat, lon = chunk[index]
+                writer.writerow([
+                    record_id, lat, lon,
+                    result.keys[index] if result.keys[index] is not None else '',
+                    f"{float(result.distances_meters[index]):.1f}",
+                ])
+        return outside
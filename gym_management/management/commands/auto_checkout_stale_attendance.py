@@ -0,0 +1,106 @@
+"""
+Management command to close attendance sessions members forgot to check out of.
+
+An open Attendance row blocks the member's next check-in (one open session
+per member) and inflates the "currently present" count. This command closes
+sessions opened more than a configurable number of hours ago, recording a
+capped visit length and a note marking the checkout as automatic:
+    python manage.py auto_checkout_stale_attendance
+    python manage.py auto_checkout_stale_attendance --older-than-hours 16 --visit-hours 1
+    python manage.py auto_checkout_stale_attendance --dry-run
+
+Crontab example (run hourly, so a session is closed within an hour of
+passing the cutoff and an evening check-in does not block the next morning's):
+    5 * * * * cd /path/to/mscube && /path/to/venv/bin/python manage.py auto_checkout_stale_attendance
+Keep GYM_AUTO_CHECKOUT_AFTER_HOURS (or --older-than-hours) below the gap
+between closing and the next opening, so sessions left open at closing are
+cleared before the doors open again.
+
+What this command does:
+1. Selects open sessions whose check-in is older than the configured age
+2. Closes them in primary-key-ordered batches, one UPDATE per batch, with
+   check_out = check_in + visit length and an [auto-checkout] note
+3. Updates the attendance rollups, live occupancy and dashboard, then reports counts
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from gym_management.models import Attendance
+from gym_management.services import AttendanceService
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Close attendance sessions left open longer than the configured age'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-hours',
+            type=int,
+            default=getattr(settings, 'GYM_AUTO_CHECKOUT_AFTER_HOURS', 12),
+            help='Close sessions whose check-in is older than this many hours'
+        )
+        parser.add_argument(
+            '--visit-hours',
+            type=int,
+            default=getattr(settings, 'GYM_AUTO_CHECKOUT_VISIT_HOURS', 2),
+            help='Visit length recorded for auto-closed sessions'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Sessions closed per transaction'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count the sessions that would be closed without closing them'
+        )
+
+    def handle(self, *args, **options):
+        older_than_hours = options['older_than_hours']
+        visit_hours = options['visit_hours']
+        batch_size = options['batch_size']
+
+        if visit_hours <= 0:
+            raise CommandError('--visit-hours must be greater than 0.')
+        if older_than_hours < visit_hours:
+            # Otherwise the capped check_out could land in the future.
+            raise CommandError('--older-than-hours must be at least --visit-hours.')
+        if batch_size <= 0:
+            raise CommandError('--batch-size must be greater than 0.')
+
+        cutoff = timezone.now() - timedelta(hours=older_than_hours)
+        self.stdout.write(f"[{timezone.now()}] Closing attendance sessions opened before {cutoff}...")
+
+        if options['dry_run']:
+            count = Attendance.objects.filter(check_out__isnull=True, check_in__lt=cutoff).count()
+            self.stdout.write(self.style.WARNING(f"DRY RUN - would close {count} attendance session(s)"))
+            return
+
+        started = time.monotonic()
+        closed = 0
+        batches = 0
+        for batch_closed in AttendanceService.auto_checkout_stale_attendance(
+            cutoff,
+            timedelta(hours=visit_hours),
+            batch_size=batch_size,
+        ):
+            closed += batch_closed
+            batches += 1
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  Batch {batches}: closed {batch_closed} session(s)")
+
+        elapsed = time.monotonic() - started
+        logger.info('Auto-checkout closed %s stale attendance session(s) in %s batch(es)', closed, batches)
+        self.stdout.write(self.style.SUCCESS(
+            f"Closed {closed} attendance session(s) in {batches} batch(es), {elapsed:.2f}s"
+        ))
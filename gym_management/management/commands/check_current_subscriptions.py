@@ -0,0 +1,86 @@
+"""
+Management command to verify each member's denormalized current subscription.
+
+Member.current_subscription_id/status/end_date are kept in step with the
+subscriptions table by SubscriptionService. Writes that bypass it (raw SQL,
+queryset.update() on subscriptions outside the services) leave them stale.
+This command reports mismatches and, with --fix, rewrites them:
+    python manage.py check_current_subscriptions
+    python manage.py check_current_subscriptions --fix
+
+Crontab example (run nightly at 04:00, after the expiry job):
+    0 4 * * * cd /path/to/mscube && /path/to/venv/bin/python manage.py check_current_subscriptions --fix
+
+What this command does:
+1. Walks members in primary-key batches, including inactive members
+2. Recomputes each member's current subscription with one query per batch
+3. Reports members whose stored pointer differs, and rewrites them with --fix
+"""
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import Member
+from gym_management.services import SubscriptionService
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Check members' denormalized current subscription against their subscriptions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Rewrite stale pointers instead of only reporting them'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Members checked per query'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError('--batch-size must be greater than 0.')
+
+        self.stdout.write(f"[{timezone.now()}] Checking member current-subscription pointers...")
+        checked = 0
+        stale_count = 0
+        last_pk = 0
+        while True:
+            member_ids = list(
+                Member.all_objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not member_ids:
+                break
+            last_pk = member_ids[-1]
+            checked += len(member_ids)
+
+            with transaction.atomic():
+                if options['fix']:
+                    # Lock the batch so a concurrent subscription change cannot
+                    # interleave between the check and the rewrite.
+                    list(Member.all_objects.select_for_update().filter(pk__in=member_ids).values_list('pk'))
+                stale = SubscriptionService.find_stale_current_subscriptions(member_ids)
+                if stale and options['fix']:
+                    SubscriptionService.sync_current_subscriptions(stale)
+
+            stale_count += len(stale)
+            for member_id, (stored, expected) in stale.items():
+                self.stdout.write(self.style.WARNING(
+                    f"  Member {member_id}: stored {stored}, expected {expected}"
+                ))
+
+        if stale_count:
+            logger.warning('Found %s stale current-subscription pointer(s) among %s member(s)', stale_count, checked)
+        action = 'fixed' if options['fix'] else 'found'
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {checked} member(s); {action} {stale_count} stale pointer(s)"
+        ))
@@ -8,13 +8,15 @@ Crontab example (run daily at 8:00 AM):
     0 8 * * * cd /path/to/mscube && /path/to/venv/bin/python manage.py process_expiry_notifications
 
 What this command does:
-1. Expires any subscriptions that have passed their end date
-2. Creates notifications for subscriptions expiring in 7, 3, and 1 days
-3. Sends email notifications if configured
-4. Creates dashboard notifications for members
+1. Expires subscriptions past their end date in committed batches, creating
+   each one's 'expired' notification and email; an interrupted run resumes
+   where it stopped when rerun
+2. Fetches every subscription expiring in 7, 3, or 1 days (or yesterday) in one query
+3. Creates the missing notifications with batched bulk inserts
+4. Queues email notifications if configured; `run_email_worker` delivers them
 """
 import logging
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.utils import timezone
 
 from gym_management.services import SubscriptionService, NotificationService
@@ -34,12 +36,23 @@ class Command(BaseCommand):
         parser.add_argument(
             '--skip-emails',
             action='store_true',
-            help='Create notifications but skip sending emails'
+            help='Create notifications but skip queueing emails'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=SubscriptionService.EXPIRY_BATCH_SIZE,
+            help='Subscriptions expired per transaction'
         )
 
     def handle(self, *args, **options):
         dry_run = options['dry_run']
         skip_emails = options['skip_emails']
+        batch_size = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError('--batch-size must be greater than 0.')
+        # Dashboard-only notifications when the email stage is skipped
+        notify = {'send_emails': False, 'channel': 'dashboard'} if skip_emails else {}
         
         self.stdout.write(f"[{timezone.now()}] Starting expiry notification processing...")
         
@@ -48,7 +61,17 @@ class Command(BaseCommand):
         
         # Step 1: Expire past-due subscriptions
         if not dry_run:
-            expired_count = SubscriptionService.check_and_expire_subscriptions()
+            expired_count = 0
+            expiry_notifications = 0
+            expiry_emails = 0
+            for batch in SubscriptionService.expire_due_subscriptions(batch_size=batch_size, **notify):
+                expired_count += batch['expired']
+                expiry_notifications += batch['notifications_created']
+                expiry_emails += batch['emails_queued']
+                if options['verbosity'] > 1:
+                    self.stdout.write(
+                        f"  Expired {batch['expired']} subscription(s) in {batch['elapsed_seconds']:.2f}s"
+                    )
             self.stdout.write(
                 self.style.SUCCESS(f"Expired {expired_count} past-due subscription(s)")
             )
@@ -62,22 +85,17 @@ class Command(BaseCommand):
         
         # Step 2: Process notifications
         if not dry_run:
-            if skip_emails:
-                # Process notifications without sending emails
-                stats = self._process_notifications_without_email()
-            else:
-                stats = NotificationService.process_expiry_notifications()
+            # Step 1 already expired everything due, with its batch size
+            stats = NotificationService.process_expiry_notifications(expire=False, **notify)
+            stats['notifications_created'] += expiry_notifications
+            stats['emails_queued'] += expiry_emails
             
             self.stdout.write(self.style.SUCCESS(
                 f"Notifications created: {stats['notifications_created']}"
             ))
             self.stdout.write(self.style.SUCCESS(
-                f"Emails sent: {stats['emails_sent']}"
+                f"Emails queued: {stats['emails_queued']}"
             ))
-            if stats['errors'] > 0:
-                self.stdout.write(self.style.WARNING(
-                    f"Errors encountered: {stats['errors']}"
-                ))
         else:
             # Show what would be processed
             self._show_dry_run_preview()
@@ -86,34 +104,6 @@ class Command(BaseCommand):
             self.style.SUCCESS(f"[{timezone.now()}] Expiry notification processing complete")
         )
 
-    def _process_notifications_without_email(self):
-        """Process notifications but skip email sending."""
-        from gym_management.models import Notification
-        
-        stats = {
-            'notifications_created': 0,
-            'emails_sent': 0,
-            'errors': 0,
-        }
-        
-        for days in NotificationService.EXPIRY_ALERT_DAYS:
-            subscriptions = NotificationService.get_expiring_subscriptions(days)
-            
-            for subscription in subscriptions:
-                try:
-                    notification = NotificationService.create_expiry_notification(
-                        subscription, days, channel='dashboard'  # Dashboard only
-                    )
-                    
-                    if notification:
-                        stats['notifications_created'] += 1
-                        
-                except Exception as e:
-                    logger.error(f"Error processing notification: {e}")
-                    stats['errors'] += 1
-        
-        return stats
-
     def _show_dry_run_preview(self):
         """Show preview of what would be processed in dry run mode."""
         for days in NotificationService.EXPIRY_ALERT_DAYS:
@@ -0,0 +1,83 @@
+"""
+Management command to purge expired and used QR check-in sessions.
+
+Every self check-in or check-out scan in 'session' token mode inserts a
+CheckInSession row. This command deletes rows that expired, or were used,
+before the retention window in small primary-key-ordered batches, so it is
+safe to run every few minutes alongside live check-ins:
+    python manage.py purge_checkin_sessions
+    python manage.py purge_checkin_sessions --retention-hours 72 --batch-size 500
+    python manage.py purge_checkin_sessions --dry-run
+
+Crontab example (run every 10 minutes):
+    */10 * * * * cd /path/to/mscube && /path/to/venv/bin/python manage.py purge_checkin_sessions
+
+What this command does:
+1. Selects sessions that expired, or were used, before now minus the retention window
+2. Deletes them in primary-key order, one short transaction per batch
+3. Reports the rows deleted and the deletion rate
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from gym_management.services import AttendanceService
+
+
+class Command(BaseCommand):
+    help = 'Delete expired and used QR check-in sessions older than the retention window'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention-hours',
+            type=int,
+            default=getattr(settings, 'GYM_QR_SESSION_RETENTION_HOURS', 24),
+            help='Keep sessions that expired or were used within this many hours'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows deleted per transaction'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count the sessions that would be deleted without deleting them'
+        )
+
+    def handle(self, *args, **options):
+        retention_hours = options['retention_hours']
+        batch_size = options['batch_size']
+
+        if retention_hours < 0:
+            raise CommandError('--retention-hours must not be negative.')
+        if batch_size <= 0:
+            raise CommandError('--batch-size must be greater than 0.')
+
+        cutoff = timezone.now() - timedelta(hours=retention_hours)
+        self.stdout.write(f"[{timezone.now()}] Purging check-in sessions older than {cutoff}...")
+
+        if options['dry_run']:
+            count = AttendanceService.get_purgeable_qr_sessions(cutoff).count()
+            self.stdout.write(self.style.WARNING(f"DRY RUN - would delete {count} check-in session(s)"))
+            return
+
+        started = time.monotonic()
+        deleted = 0
+        batches = 0
+        for batch_deleted in AttendanceService.purge_qr_sessions(cutoff, batch_size=batch_size):
+            deleted += batch_deleted
+            batches += 1
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  Batch {batches}: deleted {batch_deleted} row(s)")
+
+        elapsed = time.monotonic() - started
+        rate = deleted / elapsed if elapsed > 0 else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {deleted} check-in session(s) in {batches} batch(es), "
+            f"{elapsed:.2f}s ({rate:.0f} rows/sec)"
+        ))
@@ -0,0 +1,59 @@
+"""
+Management command to backfill the pre-aggregated attendance rollup table.
+
+Rollup buckets are maintained incrementally on check-in and check-out only.
+Editing or deleting Attendance rows in the admin (or with queryset.update(),
+raw SQL, etc.) does not touch the rollups. Run this once after deploying the
+rollup table, and again whenever raw attendance rows are corrected by hand:
+    python manage.py rebuild_attendance_rollups
+    python manage.py rebuild_attendance_rollups --start-date 2025-01-01 --end-date 2025-12-31
+
+What this command does:
+1. Deletes rollup buckets inside the requested date range
+2. Recomputes visits, unique members and visit durations from Attendance rows
+3. Writes the recomputed buckets in bulk
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from gym_management.services import AttendanceRollupService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild hourly attendance rollup buckets from raw attendance records'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start-date',
+            help='First date to rebuild (YYYY-MM-DD). Defaults to the earliest attendance record.'
+        )
+        parser.add_argument(
+            '--end-date',
+            help='Last date to rebuild (YYYY-MM-DD). Defaults to today.'
+        )
+
+    def handle(self, *args, **options):
+        start_date = self._parse_date(options['start_date'], '--start-date')
+        end_date = self._parse_date(options['end_date'], '--end-date')
+
+        if start_date and end_date and start_date > end_date:
+            raise CommandError('--start-date must be on or before --end-date.')
+
+        self.stdout.write(f"[{timezone.now()}] Rebuilding attendance rollups...")
+
+        bucket_count = AttendanceRollupService.rebuild(start_date, end_date)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {bucket_count} attendance rollup bucket(s)")
+        )
+
+    @staticmethod
+    def _parse_date(value, option_name):
+        if not value:
+            return None
+        try:
+            return date.fromisoformat(value)
+        except ValueError as exc:
+            raise CommandError(f'{option_name} must be a date in YYYY-MM-DD format.') from exc
@@ -0,0 +1,63 @@
+"""
+Management command to rebuild the member search index.
+
+Member search text is kept in step by User/Member signals, but bulk writes
+that bypass signals (queryset.update() on users, raw SQL imports) leave it
+stale. This command recomputes it for every member, or only for members that
+were never indexed:
+    python manage.py rebuild_member_search_index
+    python manage.py rebuild_member_search_index --only-missing
+
+Crontab example (run weekly on Sunday at 03:30):
+    30 3 * * 0 cd /path/to/mscube && /path/to/venv/bin/python manage.py rebuild_member_search_index
+
+What this command does:
+1. Creates the backend search index if missing (SQLite FTS5 table or PostgreSQL trigram index)
+2. Recomputes each member's normalized name/email/phone text in primary-key batches
+3. Reports the number of members indexed
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from gym_management.services import MemberSearchService
+
+
+class Command(BaseCommand):
+    help = 'Recompute the member search index from user names, emails and phones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only-missing',
+            action='store_true',
+            help='Only index members that have no search text yet'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=MemberSearchService.REBUILD_BATCH_SIZE,
+            help='Members indexed per transaction'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError('--batch-size must be greater than 0.')
+
+        self.stdout.write(f"[{timezone.now()}] Rebuilding member search index...")
+        started = time.monotonic()
+        if MemberSearchService.ensure_backend():
+            self.stdout.write("  Created search index")
+
+        indexed = 0
+        for batch_indexed in MemberSearchService.rebuild(
+            only_missing=options['only_missing'],
+            batch_size=batch_size,
+        ):
+            indexed += batch_indexed
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  Indexed {indexed} member(s)")
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} member(s) in {elapsed:.2f}s"))
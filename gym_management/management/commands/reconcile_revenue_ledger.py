@@ -0,0 +1,65 @@
+"""
+Management command to reconcile the materialized revenue ledger with payments.
+
+Revenue buckets are written in the same transaction as payment completion and
+refund. Run this after deploying the ledger, and periodically (e.g. nightly) to
+repair drift caused by manual edits in the Django admin:
+    python manage.py reconcile_revenue_ledger
+    python manage.py reconcile_revenue_ledger --start-date 2025-01-01 --end-date 2025-12-31
+
+Crontab example (run daily at 2:00 AM):
+    0 2 * * * cd /path/to/mscube && /path/to/venv/bin/python manage.py reconcile_revenue_ledger
+
+What this command does:
+1. Aggregates completed Payment rows by completion day and payment method
+2. Compares the result against the existing revenue buckets
+3. Replaces the buckets in the requested range with the recomputed values
+"""
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from gym_management.services import RevenueLedgerService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the revenue bucket ledger from completed payments'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start-date',
+            help='First completion date to reconcile (YYYY-MM-DD). Defaults to all history.'
+        )
+        parser.add_argument(
+            '--end-date',
+            help='Last completion date to reconcile (YYYY-MM-DD). Defaults to all history.'
+        )
+
+    def handle(self, *args, **options):
+        start_date = self._parse_date(options['start_date'], '--start-date')
+        end_date = self._parse_date(options['end_date'], '--end-date')
+
+        if start_date and end_date and start_date > end_date:
+            raise CommandError('--start-date must be on or before --end-date.')
+
+        self.stdout.write(f"[{timezone.now()}] Reconciling revenue ledger...")
+
+        stats = RevenueLedgerService.rebuild(start_date, end_date)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {stats['buckets_written']} revenue bucket(s)")
+        )
+        if stats['buckets_drifted']:
+            self.stdout.write(self.style.WARNING(
+                f"Corrected {stats['buckets_drifted']} bucket(s) that had drifted from payments"
+            ))
+
+    @staticmethod
+    def _parse_date(value, option_name):
+        if not value:
+            return None
+        try:
+            return date.fromisoformat(value)
+        except ValueError as exc:
+            raise CommandError(f'{option_name} must be a date in YYYY-MM-DD format.') from exc
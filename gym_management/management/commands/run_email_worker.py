@@ -0,0 +1,82 @@
+"""
+Management command to deliver the outbound email queue.
+
+Notification emails are queued by NotificationService and delivered here, so
+request handlers and the expiry cron job never wait on the SMTP server. Run
+one or more long-lived workers under a process supervisor:
+    python manage.py run_email_worker
+    python manage.py run_email_worker --batch-size 50 --poll-interval 10
+
+Or drain the queue once from cron (every minute):
+    * * * * * cd /path/to/mscube && /path/to/venv/bin/python manage.py run_email_worker --once
+
+What this command does:
+1. Claims due emails with SELECT ... FOR UPDATE SKIP LOCKED
+2. Sends each claimed batch over a single SMTP connection
+3. Marks delivered emails sent and reschedules failures with exponential backoff
+"""
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from gym_management.services import EmailQueueService
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbound emails with retry and backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=EmailQueueService.EMAIL_BATCH_SIZE,
+            help='Emails claimed and sent per SMTP connection'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='Seconds to sleep when the queue has no due emails'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the currently due emails and exit instead of polling'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        poll_interval = options['poll_interval']
+
+        if batch_size <= 0:
+            raise CommandError('--batch-size must be greater than 0.')
+        if poll_interval < 0:
+            raise CommandError('--poll-interval must not be negative.')
+
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        totals = {'claimed': 0, 'emails_sent': 0, 'retried': 0, 'failed': 0}
+
+        self.stdout.write(f"[{timezone.now()}] Email worker {worker_id} started")
+
+        try:
+            while True:
+                stats = EmailQueueService.process_batch(worker_id, batch_size)
+                for key in totals:
+                    totals[key] += stats[key]
+
+                if stats['claimed']:
+                    continue
+                if options['once']:
+                    break
+                time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('Interrupted, stopping worker'))
+
+        self.stdout.write(self.style.SUCCESS(f"Emails sent: {totals['emails_sent']}"))
+        if totals['retried']:
+            self.stdout.write(self.style.WARNING(f"Emails rescheduled for retry: {totals['retried']}"))
+        if totals['failed']:
+            self.stdout.write(self.style.ERROR(f"Emails failed permanently: {totals['failed']}"))
@@ -1,8 +1,11 @@
 import logging
 
+from django.conf import settings
 from django.core.exceptions import PermissionDenied
 
-from accounts.utils import get_user_role, can_manage_users, can_manage_payments
+from accounts.utils import get_user_role, can_manage_users, can_manage_payments, load_user_profiles
+
+from .utils.pagination import capped_count, keyset_paginate
 
 
 audit_logger = logging.getLogger('security.audit')
@@ -28,6 +31,7 @@ class ObjectOwnershipMixin:
         if user.is_superuser:
             return True
 
+        load_user_profiles(user)
         if not hasattr(user, 'adminprofile'):
             return False
 
@@ -57,3 +61,32 @@ class ObjectOwnershipMixin:
             raise PermissionDenied('You do not have permission to access this resource.')
 
         return obj
+
+
+class KeysetPaginationMixin:
+    """
+    Page a ListView newest-first by ``(keyset_field, pk)`` cursors instead of OFFSET.
+
+    Pages are linked with ``?after=`` / ``?before=`` cursors and every page
+    costs one index seek. Instead of ``paginator.count`` the context carries
+    ``result_count``, counted only up to GYM_LIST_COUNT_CAP rows
+    (``result_count_capped`` is True past that); a cap of 0 skips counting.
+    """
+    keyset_field = None
+
+    def paginate_queryset(self, queryset, page_size):
+        page = keyset_paginate(
+            queryset,
+            self.keyset_field,
+            page_size,
+            after=self.request.GET.get('after'),
+            before=self.request.GET.get('before'),
+        )
+        return None, page, page.object_list, page.has_other_pages()
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        cap = getattr(settings, 'GYM_LIST_COUNT_CAP', 10000)
+        if cap:
+            context['result_count'], context['result_count_capped'] = capped_count(self.object_list, cap)
+        return context
@@ -1,6 +1,6 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
-from django.core.validators import MinValueValidator
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.core.exceptions import ValidationError
 from decimal import Decimal
 import uuid
@@ -80,6 +80,9 @@ class Subscription(models.Model):
             models.Index(fields=['member', 'status']),
             models.Index(fields=['status']),
             models.Index(fields=['end_date']),
+            # Keyset pagination of the subscription list (newest first, optionally by status)
+            models.Index(fields=['-created_at', '-id']),
+            models.Index(fields=['status', '-created_at', '-id']),
         ]
         constraints = [
             # Ensure only one active subscription per member
@@ -189,6 +192,9 @@ class Payment(models.Model):
             models.Index(fields=['transaction_id']),
             models.Index(fields=['status']),
             models.Index(fields=['payment_method']),
+            # Keyset pagination of the payment list (newest first, optionally by status)
+            models.Index(fields=['-initiated_at', '-id']),
+            models.Index(fields=['status', '-initiated_at', '-id']),
         ]
     
     def __str__(self):
@@ -227,14 +233,116 @@ class Payment(models.Model):
         )
 
 
+class RevenueBucket(models.Model):
+    """Materialized completed-payment revenue per completion day and payment method."""
+
+    date = models.DateField()
+    payment_method = models.CharField(
+        max_length=20,
+        choices=Payment.PAYMENT_METHOD_CHOICES
+    )
+    total = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0')
+    )
+    count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'revenue_buckets'
+        verbose_name = 'Revenue Bucket'
+        verbose_name_plural = 'Revenue Buckets'
+        ordering = ['date', 'payment_method']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'payment_method'],
+                name='unique_revenue_bucket_per_day_method',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.payment_method} - NPR {self.total} ({self.count})"
+
+
+class GymLocation(models.Model):
+    """A gym branch with the geofence used to validate self check-ins."""
+    
+    name = models.CharField(max_length=150, unique=True)
+    address = models.CharField(max_length=255, blank=True)
+    latitude = models.DecimalField(
+        max_digits=9,
+        decimal_places=6,
+        validators=[MinValueValidator(Decimal('-90')), MaxValueValidator(Decimal('90'))]
+    )
+    longitude = models.DecimalField(
+        max_digits=9,
+        decimal_places=6,
+        validators=[MinValueValidator(Decimal('-180')), MaxValueValidator(Decimal('180'))]
+    )
+    radius_meters = models.FloatField(
+        default=100.0,
+        validators=[MinValueValidator(1.0)],
+        help_text="Check-ins must be within this distance of the branch"
+    )
+    is_active = models.BooleanField(default=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'gym_locations'
+        verbose_name = 'Gym Location'
+        verbose_name_plural = 'Gym Locations'
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+
+
 class Attendance(models.Model):
     """Attendance tracking for gym members."""
+
+    CHANNEL_STAFF = 'staff'
+    CHANNEL_QR = 'qr'
+    CHANNEL_CHOICES = [
+        (CHANNEL_STAFF, 'Staff Desk'),
+        (CHANNEL_QR, 'QR Self Check-in'),
+    ]
     
     member = models.ForeignKey(
         Member,
         on_delete=models.PROTECT,
         related_name='attendance_records'
     )
+    location = models.ForeignKey(
+        GymLocation,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='attendance_records',
+        help_text="Branch whose geofence matched the check-in"
+    )
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES, default=CHANNEL_STAFF)
+    check_in_latitude = models.DecimalField(
+        max_digits=9,
+        decimal_places=6,
+        null=True,
+        blank=True,
+        help_text="Device latitude reported at QR check-in"
+    )
+    check_in_longitude = models.DecimalField(
+        max_digits=9,
+        decimal_places=6,
+        null=True,
+        blank=True,
+        help_text="Device longitude reported at QR check-in"
+    )
+    check_in_distance_meters = models.FloatField(
+        null=True,
+        blank=True,
+        help_text="Distance from the matched geofence centre at QR check-in"
+    )
     check_in = models.DateTimeField(auto_now_add=True)
     check_out = models.DateTimeField(blank=True, null=True)
     date = models.DateField(auto_now_add=True)  # For easy date-based queries
@@ -252,6 +360,9 @@ class Attendance(models.Model):
             models.Index(fields=['member', 'check_in']),
             models.Index(fields=['member', 'date']),
             models.Index(fields=['date']),
+            models.Index(fields=['channel', 'date']),
+            # Keyset pagination of a day's attendance list (newest check-in first)
+            models.Index(fields=['date', '-check_in', '-id']),
         ]
         constraints = [
             models.UniqueConstraint(
@@ -278,9 +389,48 @@ class Attendance(models.Model):
     
     def checkout(self):
         """Mark member as checked out."""
+        from .services import AttendanceRollupService, OccupancyService
+
         if not self.check_out:
-            self.check_out = timezone.now()
-            self.save()
+            # The row and its rollup bucket change together; occupancy waits for commit.
+            with transaction.atomic():
+                self.check_out = timezone.now()
+                self.save()
+                AttendanceRollupService.record_check_out(self)
+                OccupancyService.record_check_out(self)
+
+
+class AttendanceRollup(models.Model):
+    """Pre-aggregated attendance counters bucketed by visit date and check-in hour."""
+
+    date = models.DateField()
+    hour = models.PositiveSmallIntegerField()
+    visits = models.PositiveIntegerField(default=0)
+    unique_members = models.PositiveIntegerField(
+        default=0,
+        help_text="Members whose first visit of the day started in this hour"
+    )
+    completed_visits = models.PositiveIntegerField(default=0)
+    duration_seconds = models.BigIntegerField(
+        default=0,
+        help_text="Total duration of completed visits in seconds"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'attendance_rollups'
+        verbose_name = 'Attendance Rollup'
+        verbose_name_plural = 'Attendance Rollups'
+        ordering = ['date', 'hour']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['date', 'hour'],
+                name='unique_attendance_rollup_bucket',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.hour:02d}:00 - {self.visits} visits"
 
 
 class CheckInSession(models.Model):
@@ -410,3 +560,57 @@ class Notification(models.Model):
             self.email_sent = True
             self.email_sent_at = timezone.now()
             self.save(update_fields=['email_sent', 'email_sent_at'])
+
+
+class OutboundEmail(models.Model):
+    """
+    Persistent outbound email queue.
+    
+    Rows are written by NotificationService and delivered by the
+    `run_email_worker` management command, so request handlers and cron jobs
+    never wait on the SMTP server. Failed deliveries are retried with
+    exponential backoff until EMAIL_QUEUE_MAX_ATTEMPTS is reached.
+    """
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
+    notification = models.ForeignKey(
+        Notification,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='outbound_emails'
+    )
+    to_email = models.EmailField()
+    from_email = models.CharField(max_length=255)
+    subject = models.CharField(max_length=255)
+    body_text = models.TextField()
+    body_html = models.TextField(blank=True)
+    
+    # Delivery state
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'outbound_emails'
+        verbose_name = 'Outbound Email'
+        verbose_name_plural = 'Outbound Emails'
+        ordering = ['next_attempt_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.to_email} - {self.subject} ({self.get_status_display()})"
@@ -5,6 +5,7 @@ Keeps complex logic out of views and ensures proper transaction handling.
 Phase 2 Features:
 - Enhanced Subscription Management (create, renew, cancel, upgrade)
 - Expiry Notification System (7, 3, 1 day alerts)
+- Outbound Email Queue (worker-delivered, retried with backoff)
 - Payment System with eSewa integration
 - Analytics and Reporting
 - Export System (CSV, PDF, Excel)
@@ -14,21 +15,28 @@ import hashlib
 import hmac
 import io
 import logging
+import time
+import uuid
 from decimal import Decimal
 from datetime import timedelta
-from typing import Optional, Tuple, List, Dict, Any
+from smtplib import SMTPServerDisconnected
+from typing import Optional, Tuple, List, Dict, Any, Iterable, Iterator
 
 from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.db import transaction, IntegrityError
 from django.db.models import Sum, Count, Avg, Q, F
 from django.db.models.functions import TruncDate, TruncMonth, TruncHour, ExtractHour
-from django.template.loader import render_to_string
+from django.template.loader import get_template
 from django.utils import timezone
 
 from accounts.models import Member
-from .utils.location import calculate_distance_meters
+from .utils.live_events import publish_event
+from .utils.location import GeofenceEngine
+from .utils.qr_tokens import SignedQRToken
 
 logger = logging.getLogger(__name__)
 audit_logger = logging.getLogger('security.audit')
@@ -260,6 +268,7 @@ class SubscriptionService:
             payment.status = 'completed'
             payment.completed_at = timezone.now()
             payment.save(update_fields=['status', 'completed_at'])
+            RevenueLedgerService.record_completion(payment)
             
             new_subscription.status = 'active'
             new_subscription.save(update_fields=['status'])
@@ -325,22 +334,265 @@ class SubscriptionService:
         
         return locked_sub, refund_amount
     
+    EXPIRY_BATCH_SIZE = 500
+
     @staticmethod
-    def check_and_expire_subscriptions():
+    def expire_due_subscriptions(
+        batch_size: Optional[int] = None,
+        channel: str = 'both',
+        send_emails: bool = True,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Expire active subscriptions past their end date, in primary-key batches.
+        
+        Each batch is one transaction that claims up to ``batch_size`` due
+        subscriptions (skipping rows a concurrent run has locked), flips them
+        with one UPDATE, bulk-creates their 'expired' notifications, queues
+        the emails and re-points the members' current subscription; the
+        subscriptions dashboard section is dropped after it commits. A crash
+        loses at most the open batch: committed batches are complete and the
+        rest are still active, so the next run resumes where this one stopped.
+        
+        Args:
+            batch_size: Subscriptions claimed per transaction
+            channel: Channel for the 'expired' notifications
+            send_emails: Queue emails for the new notifications
+        
+        Yields:
+            dict: Per-batch ``expired``, ``notifications_created``,
+            ``emails_queued`` and ``elapsed_seconds``
+        """
+        from .models import Subscription
+        
+        batch_size = batch_size or SubscriptionService.EXPIRY_BATCH_SIZE
+        today = timezone.localdate()
+        last_pk = 0
+        batch_number = 0
+        while True:
+            started = time.monotonic()
+            with transaction.atomic():
+                batch = list(
+                    Subscription.objects.select_for_update(skip_locked=True, of=('self',))
+                    .select_related('member__user', 'plan')
+                    .filter(status='active', end_date__lt=today, pk__gt=last_pk)
+                    .order_by('pk')[:batch_size]
+                )
+                if not batch:
+                    return
+                last_pk = batch[-1].pk
+                
+                expired = Subscription.objects.filter(
+                    pk__in=[subscription.pk for subscription in batch],
+                    status='active',
+                ).update(status='expired', updated_at=timezone.now())
+                for subscription in batch:
+                    subscription.status = 'expired'
+                
+                notifications = NotificationService.create_expiry_notifications_bulk(
+                    [(subscription, 0) for subscription in batch],
+                    channel=channel,
+                )
+                emails_queued = (
+                    NotificationService.dispatch_email_notifications(notifications) if send_emails else 0
+                )
+                SubscriptionService.sync_current_subscriptions({subscription.member_id for subscription in batch})
+            
+            DashboardSnapshotService.invalidate('subscriptions')
+            elapsed = time.monotonic() - started
+            batch_number += 1
+            logger.info(
+                'Expiry batch %s: expired %s subscription(s), %s notification(s), %s email(s) in %.3fs (%.0f/s)',
+                batch_number, expired, len(notifications), emails_queued, elapsed,
+                expired / elapsed if elapsed else 0,
+            )
+            yield {
+                'expired': expired,
+                'notifications_created': len(notifications),
+                'emails_queued': emails_queued,
+                'elapsed_seconds': elapsed,
+            }
+    
+    @staticmethod
+    def check_and_expire_subscriptions(send_emails: bool = True, channel: str = 'both'):
         """
         Background task to check and expire subscriptions.
         Should be run daily via cron/celery.
         
+        Runs expire_due_subscriptions to completion, so expired members also
+        get their 'expired' notification.
+        
         Returns:
             int: Number of subscriptions expired
         """
-        today = timezone.localdate()
-        expired_count = Subscription.objects.filter(
-            status='active',
-            end_date__lt=today
-        ).update(status='expired')
-        
-        return expired_count
+        return sum(
+            batch['expired']
+            for batch in SubscriptionService.expire_due_subscriptions(channel=channel, send_emails=send_emails)
+        )
+
+    # Precedence for Member.current_subscription_*: active, then pending, then
+    # anything else; ties go to the newest subscription. (End dates are not
+    # used: an upgrade or renewal expires the old row before its end date.)
+    CURRENT_STATUS_PRECEDENCE = {'active': 0, 'pending': 1}
+
+    @staticmethod
+    def compute_current_subscriptions(member_ids) -> Dict[int, Tuple[Optional[int], str, Any]]:
+        """
+        Work out each member's current subscription from the subscriptions table.
+
+        Args:
+            member_ids: Members to compute for
+
+        Returns:
+            dict: member id -> (subscription id, status, end date); members
+            without subscriptions map to (None, '', None)
+        """
+        from .models import Subscription
+
+        member_ids = set(member_ids)
+        current = {member_id: (None, '', None) for member_id in member_ids}
+        best_keys = {}
+        precedence = SubscriptionService.CURRENT_STATUS_PRECEDENCE
+        rows = Subscription.objects.filter(member_id__in=member_ids).values_list(
+            'member_id', 'pk', 'status', 'end_date',
+        )
+        for member_id, pk, status, end_date in rows:
+            key = (-precedence.get(status, 2), pk)
+            if member_id not in best_keys or key > best_keys[member_id]:
+                best_keys[member_id] = key
+                current[member_id] = (pk, status, end_date)
+        return current
+
+    @staticmethod
+    def sync_current_subscriptions(member_ids) -> int:
+        """
+        Rewrite Member.current_subscription_* for ``member_ids``.
+
+        Call inside the transaction that changed their subscriptions; saves
+        already do so through the Subscription post_save signal, queryset
+        updates must call this themselves.
+
+        Returns:
+            int: Number of members written
+        """
+        current = SubscriptionService.compute_current_subscriptions(member_ids)
+        if not current:
+            return 0
+        MemberChoiceService.invalidate()
+
+        members = [
+            Member(
+                pk=member_id,
+                current_subscription_id=subscription_id,
+                current_subscription_status=status,
+                current_subscription_end_date=end_date,
+            )
+            for member_id, (subscription_id, status, end_date) in current.items()
+        ]
+        Member.all_objects.bulk_update(
+            members,
+            ['current_subscription_id', 'current_subscription_status', 'current_subscription_end_date'],
+            batch_size=500,
+        )
+        return len(members)
+
+    @staticmethod
+    def find_stale_current_subscriptions(member_ids) -> Dict[int, Tuple[Tuple, Tuple]]:
+        """
+        Compare stored current-subscription pointers with the subscriptions table.
+
+        Returns:
+            dict: member id -> (stored, expected) for members whose pointer
+            is out of date; both are (subscription id, status, end date)
+        """
+        expected = SubscriptionService.compute_current_subscriptions(member_ids)
+        stored = Member.all_objects.filter(pk__in=expected).values_list(
+            'pk', 'current_subscription_id', 'current_subscription_status', 'current_subscription_end_date',
+        )
+        return {
+            member_id: (tuple(pointer), expected[member_id])
+            for member_id, *pointer in stored
+            if tuple(pointer) != expected[member_id]
+        }
+
+    @staticmethod
+    def get_active_subscription(member, select_related=('plan',)):
+        """
+        The member's active subscription, read through the denormalized pointer.
+
+        Costs no query when the member has no active subscription and a
+        primary-key lookup otherwise.
+        """
+        from .models import Subscription
+
+        if member.current_subscription_status != 'active':
+            return None
+        return (
+            Subscription.objects.select_related(*select_related)
+            .filter(pk=member.current_subscription_id, status='active')
+            .first()
+        )
+
+
+class GeofenceService:
+    """
+    Multi-branch geofence lookups for self check-in.
+
+    Active GymLocation rows are loaded once per process into a GeofenceEngine
+    and reloaded after GYM_LOCATION_RELOAD_SECONDS, or immediately in this
+    process when a location is saved or deleted. Without any configured
+    branch, the single gym from GYM_LATITUDE / GYM_LONGITUDE is used.
+    """
+
+    RELOAD_SECONDS = getattr(settings, 'GYM_LOCATION_RELOAD_SECONDS', 300)
+
+    _engine = None
+    _loaded_at = None
+
+    @staticmethod
+    def get_engine() -> GeofenceEngine:
+        """Return the branch geofence engine, loading it when missing or stale."""
+        from .models import GymLocation
+
+        now = timezone.now()
+        if (
+            GeofenceService._engine is None
+            or (now - GeofenceService._loaded_at).total_seconds() > GeofenceService.RELOAD_SECONDS
+        ):
+            fences = GymLocation.objects.filter(is_active=True).values_list(
+                'pk', 'latitude', 'longitude', 'radius_meters'
+            )
+            GeofenceService._engine = GeofenceEngine(fences)
+            GeofenceService._loaded_at = now
+
+        if GeofenceService._engine.size == 0:
+            return GeofenceEngine(GeofenceService.get_default_fences())
+        return GeofenceService._engine
+
+    @staticmethod
+    def get_default_fences() -> List[Tuple[Any, float, float, float]]:
+        """The settings-defined gym, used until GymLocation branches exist."""
+        return [(None, settings.GYM_LATITUDE, settings.GYM_LONGITUDE, settings.GYM_RADIUS_METERS)]
+
+    @staticmethod
+    def get_fences() -> List[Tuple[Any, float, float, float]]:
+        """Active branch fences as (id, latitude, longitude, radius_meters), read fresh."""
+        from .models import GymLocation
+
+        fences = list(GymLocation.objects.filter(is_active=True).values_list(
+            'pk', 'latitude', 'longitude', 'radius_meters'
+        ))
+        return fences or GeofenceService.get_default_fences()
+
+    @staticmethod
+    def invalidate() -> None:
+        """Drop the loaded engine so the next lookup reloads branches."""
+        GeofenceService._engine = None
+        GeofenceService._loaded_at = None
+
+    @staticmethod
+    def match(latitude: float, longitude: float):
+        """Return the GeofenceMatch for the nearest branch containing the point, or None."""
+        return GeofenceService.get_engine().match(latitude, longitude)
 
 
 class AttendanceService:
@@ -350,15 +602,35 @@ class AttendanceService:
     EXPIRED_QR_MESSAGE = 'This QR session has expired. Please scan the QR code again.'
     LOCATION_REQUIRED_MESSAGE = 'Location access is required to continue.'
     INVALID_LOCATION_MESSAGE = 'Location data was invalid. Please try again.'
+    BULK_CHECK_IN_LIMIT = 100  # Members per group check-in request
+    AUTO_CHECKOUT_NOTE = '[auto-checkout] Session closed automatically; actual exit time unknown.'
+
+    @staticmethod
+    def signed_qr_tokens_enabled() -> bool:
+        """
+        Whether signed QR tokens are issued and accepted.
+        
+        Only signed mode requires the shared cache their replay protection
+        relies on, so other modes reject signed tokens outright.
+        """
+        return getattr(settings, 'GYM_QR_TOKEN_MODE', 'session') == 'signed'
 
     @staticmethod
     def create_qr_session(member, action):
-        """Create a short-lived QR session token for a member action."""
+        """
+        Create a short-lived QR session token for a member action.
+
+        With GYM_QR_TOKEN_MODE = 'signed' this returns a stateless SignedQRToken
+        instead of inserting a CheckInSession row.
+        """
         from .models import CheckInSession
 
         if action not in {CheckInSession.ACTION_CHECKIN, CheckInSession.ACTION_CHECKOUT}:
             raise ValueError('Unsupported QR action.')
 
+        if AttendanceService.signed_qr_tokens_enabled():
+            return SignedQRToken.issue(member.pk, action, settings.GYM_QR_SESSION_TTL_SECONDS)
+
         return CheckInSession.objects.create(
             member=member,
             action=action,
@@ -370,13 +642,23 @@ class AttendanceService:
         """Validate token existence, expiry, member ownership, and action."""
         from .models import CheckInSession
 
-        try:
-            session = CheckInSession.objects.select_related('member__user').get(
-                pk=token,
-                action=action,
-            )
-        except (CheckInSession.DoesNotExist, ValidationError, ValueError, TypeError) as exc:
-            raise ValueError(AttendanceService.INVALID_QR_MESSAGE) from exc
+        if SignedQRToken.is_signed_value(token):
+            if not AttendanceService.signed_qr_tokens_enabled():
+                raise ValueError(AttendanceService.INVALID_QR_MESSAGE)
+            try:
+                session = SignedQRToken.parse(token)
+            except signing.BadSignature as exc:
+                raise ValueError(AttendanceService.INVALID_QR_MESSAGE) from exc
+            if session.action != action:
+                raise ValueError(AttendanceService.INVALID_QR_MESSAGE)
+        else:
+            try:
+                session = CheckInSession.objects.select_related('member__user').get(
+                    pk=token,
+                    action=action,
+                )
+            except (CheckInSession.DoesNotExist, ValidationError, ValueError, TypeError) as exc:
+                raise ValueError(AttendanceService.INVALID_QR_MESSAGE) from exc
 
         if session.used:
             raise ValueError(AttendanceService.INVALID_QR_MESSAGE)
@@ -393,6 +675,118 @@ class AttendanceService:
 
         return session, member
 
+    @staticmethod
+    def get_purgeable_qr_sessions(cutoff):
+        """QR sessions that expired, or were used, before ``cutoff``."""
+        from .models import CheckInSession
+
+        return CheckInSession.objects.filter(
+            Q(expires_at__lt=cutoff) | Q(used=True, created_at__lt=cutoff)
+        )
+
+    @staticmethod
+    def purge_qr_sessions(cutoff, batch_size: int = 1000) -> Iterator[int]:
+        """
+        Delete purgeable QR sessions in primary-key-ordered batches.
+
+        Each batch is a short transaction of its own, so live check-ins never
+        wait behind a long-held lock. Only sessions that expired before
+        ``cutoff`` are touched, which live tokens never are.
+
+        Yields:
+            int: Rows deleted by each batch
+        """
+        last_pk = None
+        while True:
+            candidates = AttendanceService.get_purgeable_qr_sessions(cutoff).order_by('pk')
+            if last_pk is not None:
+                candidates = candidates.filter(pk__gt=last_pk)
+            batch_pks = list(candidates.values_list('pk', flat=True)[:batch_size])
+            if not batch_pks:
+                return
+
+            last_pk = batch_pks[-1]
+            with transaction.atomic():
+                # Re-check the predicate so a row is never deleted on stale information
+                deleted, _ = AttendanceService.get_purgeable_qr_sessions(cutoff).filter(
+                    pk__in=batch_pks
+                ).delete()
+            yield deleted
+
+    @staticmethod
+    def auto_checkout_stale_attendance(cutoff, visit_duration, batch_size: int = 1000) -> Iterator[int]:
+        """
+        Close attendance sessions left open since before ``cutoff``.
+
+        Each batch locks its rows in primary-key order and closes them with a
+        single UPDATE that sets ``check_out`` to ``check_in + visit_duration``
+        (the real exit time is unknown) and appends AUTO_CHECKOUT_NOTE to the
+        notes. Rollup buckets, live occupancy and the dashboard are updated
+        once per batch, as they would be for the same number of manual
+        checkouts.
+
+        Yields:
+            int: Sessions closed by each batch
+        """
+        from django.db.models import Case, TextField, Value, When
+        from django.db.models.functions import Concat
+        from .models import Attendance
+
+        stale = Attendance.objects.filter(check_out__isnull=True, check_in__lt=cutoff)
+        last_pk = None
+        while True:
+            with transaction.atomic():
+                candidates = stale.order_by('pk')
+                if last_pk is not None:
+                    candidates = candidates.filter(pk__gt=last_pk)
+                batch = list(candidates.select_for_update(skip_locked=True)[:batch_size])
+                if not batch:
+                    return
+
+                last_pk = batch[-1].pk
+                closed = stale.filter(pk__in=[attendance.pk for attendance in batch]).update(
+                    check_out=F('check_in') + visit_duration,
+                    notes=Case(
+                        When(notes='', then=Value(AttendanceService.AUTO_CHECKOUT_NOTE)),
+                        default=Concat(
+                            F('notes'),
+                            Value('\n' + AttendanceService.AUTO_CHECKOUT_NOTE),
+                            output_field=TextField(),
+                        ),
+                        output_field=TextField(),
+                    ),
+                    updated_at=timezone.now(),
+                )
+                for attendance in batch:
+                    attendance.check_out = attendance.check_in + visit_duration
+
+                AttendanceRollupService.record_check_outs(batch)
+                OccupancyService.record_check_outs(batch)
+                DashboardSnapshotService.invalidate('attendance')
+            yield closed
+
+    @staticmethod
+    def _no_subscription_error(member):
+        return ValueError(
+            f'{member.user.full_name} does not have an active subscription. '
+            'Please renew membership before check-in.'
+        )
+
+    @staticmethod
+    def _expired_subscription_error(member, subscription):
+        return ValueError(
+            f'{member.user.full_name}\'s subscription expired on {subscription.end_date}. '
+            'Please renew before check-in.'
+        )
+
+    @staticmethod
+    def _already_checked_in_error(member, open_attendance):
+        return ValueError(
+            f'{member.user.full_name} is already checked in at '
+            f'{open_attendance.check_in.strftime("%I:%M %p")}. '
+            'Please check them out first.'
+        )
+
     @staticmethod
     def _validate_active_subscription(member):
         """Validate and return the active subscription for a member."""
@@ -406,19 +800,13 @@ class AttendanceService:
             )
 
             if not active_sub:
-                raise ValueError(
-                    f'{member.user.full_name} does not have an active subscription. '
-                    'Please renew membership before check-in.'
-                )
+                raise AttendanceService._no_subscription_error(member)
 
             today = timezone.localdate()
             if active_sub.end_date < today:
                 active_sub.status = 'expired'
                 active_sub.save(update_fields=['status'])
-                expired_error = ValueError(
-                    f'{member.user.full_name}\'s subscription expired on {active_sub.end_date}. '
-                    'Please renew before check-in.'
-                )
+                expired_error = AttendanceService._expired_subscription_error(member, active_sub)
             else:
                 expired_error = None
 
@@ -429,7 +817,13 @@ class AttendanceService:
 
     @staticmethod
     def _validate_geolocation(latitude, longitude, rejection_message):
-        """Validate the user coordinates fall within the configured gym radius."""
+        """
+        Validate the user coordinates fall within a gym branch geofence.
+
+        Returns:
+            GeofenceMatch: The matched branch id (None for the settings-defined
+            gym) and the distance from it in meters
+        """
         if latitude in {None, ''} or longitude in {None, ''}:
             raise ValueError(AttendanceService.LOCATION_REQUIRED_MESSAGE)
 
@@ -442,42 +836,23 @@ class AttendanceService:
         if not (-90 <= latitude <= 90) or not (-180 <= longitude <= 180):
             raise ValueError(AttendanceService.INVALID_LOCATION_MESSAGE)
 
-        distance_meters = calculate_distance_meters(
-            latitude,
-            longitude,
-            settings.GYM_LATITUDE,
-            settings.GYM_LONGITUDE,
-        )
-
-        if distance_meters > settings.GYM_RADIUS_METERS:
+        match = GeofenceService.match(latitude, longitude)
+        if match is None:
             raise ValueError(rejection_message)
 
-        return distance_meters
+        return match
 
     @staticmethod
-    def _create_attendance_record(member, session_token=None, session_action=None):
-        """Create an attendance row under lock, optionally consuming a QR token."""
-        from .models import Attendance, CheckInSession
-
-        with transaction.atomic():
-            if session_token is not None:
-                try:
-                    locked_session = CheckInSession.objects.select_for_update().get(
-                        pk=session_token,
-                        action=session_action,
-                        member=member,
-                    )
-                except (CheckInSession.DoesNotExist, ValidationError, ValueError, TypeError) as exc:
-                    raise ValueError(AttendanceService.INVALID_QR_MESSAGE) from exc
-
-                if locked_session.used:
-                    raise ValueError(AttendanceService.INVALID_QR_MESSAGE)
+    def _to_coordinate(value):
+        """Round an already validated coordinate to the stored six decimal places."""
+        return Decimal(str(round(float(value), 6)))
 
-                if locked_session.is_expired():
-                    raise ValueError(AttendanceService.EXPIRED_QR_MESSAGE)
-            else:
-                locked_session = None
+    @staticmethod
+    def _create_attendance_record(member):
+        """Create an attendance row under a member lock."""
+        from .models import Attendance
 
+        with transaction.atomic():
             locked_member = Member.objects.select_for_update().get(pk=member.pk)
 
             existing = Attendance.objects.select_for_update().filter(
@@ -486,11 +861,7 @@ class AttendanceService:
             ).first()
 
             if existing:
-                raise ValueError(
-                    f'{locked_member.user.full_name} is already checked in at '
-                    f'{existing.check_in.strftime("%I:%M %p")}. '
-                    'Please check them out first.'
-                )
+                raise AttendanceService._already_checked_in_error(locked_member, existing)
 
             try:
                 attendance = Attendance.objects.create(member=locked_member)
@@ -500,61 +871,167 @@ class AttendanceService:
                     'Please complete checkout before a new check-in.'
                 ) from exc
 
-            if locked_session is not None:
-                locked_session.used = True
-                locked_session.save(update_fields=['used'])
-
+            AttendanceRollupService.record_check_in(attendance)
+            OccupancyService.record_check_in(attendance)
             return attendance
 
     @staticmethod
-    def _checkout_attendance_record(member, session_token):
+    def _checkout_attendance_record(member, session_token=None, signed_token=None):
         """Check out an open attendance row under lock and consume a QR token."""
         from .models import Attendance, CheckInSession
 
-        with transaction.atomic():
-            try:
-                locked_session = CheckInSession.objects.select_for_update().get(
-                    pk=session_token,
-                    action=CheckInSession.ACTION_CHECKOUT,
-                    member=member,
-                )
-            except (CheckInSession.DoesNotExist, ValidationError, ValueError, TypeError) as exc:
-                raise ValueError(AttendanceService.INVALID_QR_MESSAGE) from exc
-
-            if locked_session.used:
-                raise ValueError(AttendanceService.INVALID_QR_MESSAGE)
+        token_consumed = False
+        try:
+            with transaction.atomic():
+                if signed_token is None:
+                    try:
+                        locked_session = CheckInSession.objects.select_for_update().get(
+                            pk=session_token,
+                            action=CheckInSession.ACTION_CHECKOUT,
+                            member=member,
+                        )
+                    except (CheckInSession.DoesNotExist, ValidationError, ValueError, TypeError) as exc:
+                        raise ValueError(AttendanceService.INVALID_QR_MESSAGE) from exc
 
-            if locked_session.is_expired():
-                raise ValueError(AttendanceService.EXPIRED_QR_MESSAGE)
+                    if locked_session.used:
+                        raise ValueError(AttendanceService.INVALID_QR_MESSAGE)
 
-            attendance = Attendance.objects.select_for_update().select_related('member__user').filter(
-                member=member,
-                check_out__isnull=True,
-            ).first()
-
-            if not attendance:
-                raise ValueError('You do not have an active check-in session to check out from.')
+                    if locked_session.is_expired():
+                        raise ValueError(AttendanceService.EXPIRED_QR_MESSAGE)
+                else:
+                    locked_session = None
 
-            attendance.checkout()
-            locked_session.used = True
-            locked_session.save(update_fields=['used'])
-            return attendance
+                attendance = Attendance.objects.select_for_update().select_related('member__user').filter(
+                    member=member,
+                    check_out__isnull=True,
+                ).first()
+
+                if not attendance:
+                    raise ValueError('You do not have an active check-in session to check out from.')
+
+                attendance.checkout()
+                # Consume the token last; a rollback after this releases it below.
+                if locked_session is not None:
+                    locked_session.used = True
+                    locked_session.save(update_fields=['used'])
+                elif signed_token.mark_used():
+                    token_consumed = True
+                else:
+                    raise ValueError(AttendanceService.INVALID_QR_MESSAGE)
+        except Exception:
+            if token_consumed:
+                signed_token.release()
+            raise
+        return attendance
 
     @staticmethod
     def process_self_check_in(user, token, latitude, longitude):
-        """Process a tokenized, geofenced self check-in request."""
-        session, member = AttendanceService.validate_qr_session(token, user, 'checkin')
-        active_sub = AttendanceService._validate_active_subscription(member)
-        distance_meters = AttendanceService._validate_geolocation(
+        """
+        Process a tokenized, geofenced self check-in request on a fused fast path.
+
+        The geofence runs first because it needs no database, and signed tokens
+        are verified in memory. Everything else happens in one transaction: lock
+        the QR session (session mode only), lock the active subscription, insert
+        the attendance row and consume the token. The open-attendance partial
+        unique constraint stands in for the member lock and duplicate lookup;
+        a violation is reported with the usual message after rollback.
+        """
+        from .models import Attendance, CheckInSession, Subscription
+
+        geofence_match = AttendanceService._validate_geolocation(
             latitude,
             longitude,
             'You must be physically near the gym to check in.',
         )
-        attendance = AttendanceService._create_attendance_record(
-            member,
-            session_token=session.pk,
-            session_action=session.action,
-        )
+        distance_meters = geofence_match.distance_meters
+
+        member = getattr(user, 'member', None)
+        if member is None:
+            raise ValueError('Only members can use QR attendance.')
+
+        signed_token = None
+        if SignedQRToken.is_signed_value(token):
+            if not AttendanceService.signed_qr_tokens_enabled():
+                raise ValueError(AttendanceService.INVALID_QR_MESSAGE)
+            try:
+                signed_token = SignedQRToken.parse(token)
+            except signing.BadSignature as exc:
+                raise ValueError(AttendanceService.INVALID_QR_MESSAGE) from exc
+            if (
+                signed_token.action != CheckInSession.ACTION_CHECKIN
+                or signed_token.member_id != member.pk
+                or signed_token.used
+            ):
+                raise ValueError(AttendanceService.INVALID_QR_MESSAGE)
+            if signed_token.is_expired():
+                raise ValueError(AttendanceService.EXPIRED_QR_MESSAGE)
+
+        expired_subscription = None
+        token_consumed = False
+        try:
+            with transaction.atomic():
+                if signed_token is None:
+                    try:
+                        session = CheckInSession.objects.select_for_update().get(
+                            pk=token,
+                            action=CheckInSession.ACTION_CHECKIN,
+                            member=member,
+                        )
+                    except (CheckInSession.DoesNotExist, ValidationError, ValueError, TypeError) as exc:
+                        raise ValueError(AttendanceService.INVALID_QR_MESSAGE) from exc
+
+                    if session.used:
+                        raise ValueError(AttendanceService.INVALID_QR_MESSAGE)
+
+                    if session.is_expired():
+                        raise ValueError(AttendanceService.EXPIRED_QR_MESSAGE)
+
+                active_sub = Subscription.objects.select_for_update(of=('self',)).select_related('plan').filter(
+                    member=member,
+                    status='active',
+                ).first()
+                if not active_sub:
+                    raise AttendanceService._no_subscription_error(member)
+
+                if active_sub.end_date < timezone.localdate():
+                    # Commit the expiry, then reject the check-in below
+                    active_sub.status = 'expired'
+                    active_sub.save(update_fields=['status'])
+                    expired_subscription = active_sub
+                else:
+                    attendance = Attendance.objects.create(
+                        member=member,
+                        location_id=geofence_match.key,
+                        channel=Attendance.CHANNEL_QR,
+                        check_in_latitude=AttendanceService._to_coordinate(latitude),
+                        check_in_longitude=AttendanceService._to_coordinate(longitude),
+                        check_in_distance_meters=distance_meters,
+                    )
+
+                    AttendanceRollupService.record_check_in(attendance)
+                    OccupancyService.record_check_in(attendance)
+
+                    # Consume the token last; a rollback after this releases it below.
+                    if signed_token is None:
+                        CheckInSession.objects.filter(pk=session.pk).update(used=True)
+                    elif signed_token.mark_used():
+                        token_consumed = True
+                    else:
+                        # A concurrent request consumed the token first; roll back this check-in.
+                        raise ValueError(AttendanceService.INVALID_QR_MESSAGE)
+        except Exception as exc:
+            if token_consumed:
+                signed_token.release()
+            if not isinstance(exc, IntegrityError):
+                raise
+            open_attendance = Attendance.objects.filter(member=member, check_out__isnull=True).first()
+            if open_attendance is None:
+                raise
+            raise AttendanceService._already_checked_in_error(member, open_attendance) from exc
+
+        if expired_subscription is not None:
+            raise AttendanceService._expired_subscription_error(member, expired_subscription)
+
         return attendance, active_sub, distance_meters
 
     @staticmethod
@@ -566,8 +1043,11 @@ class AttendanceService:
             latitude,
             longitude,
             'You must be physically near the gym to check out.',
-        )
-        attendance = AttendanceService._checkout_attendance_record(member, session.pk)
+        ).distance_meters
+        if isinstance(session, SignedQRToken):
+            attendance = AttendanceService._checkout_attendance_record(member, signed_token=session)
+        else:
+            attendance = AttendanceService._checkout_attendance_record(member, session_token=session.pk)
         return attendance, distance_meters
     
     @staticmethod
@@ -598,6 +1078,124 @@ class AttendanceService:
         """
         AttendanceService._validate_active_subscription(member)
         return AttendanceService._create_attendance_record(member)
+
+    @staticmethod
+    def bulk_check_in(member_ids) -> List[Dict[str, Any]]:
+        """
+        Check in a group of members (e.g. a class arriving together) in one transaction.
+
+        Members are locked in a single statement ordered by primary key, so
+        overlapping batches and single check-ins acquire locks in the same order
+        and cannot deadlock. Active subscriptions and open sessions are each
+        loaded with one query and the attendance rows are inserted with
+        bulk_create. Ineligible members are reported instead of failing the batch.
+
+        Args:
+            member_ids: Iterable of member primary keys
+
+        Returns:
+            list: One dict per requested member, in request order, with
+            ``member_id``, ``member_name``, ``checked_in``, ``message`` and
+            ``attendance`` (None unless checked in)
+
+        Raises:
+            ValueError: If no members or more than BULK_CHECK_IN_LIMIT are given
+        """
+        from .models import Attendance, Subscription
+
+        requested = list(dict.fromkeys(int(member_id) for member_id in member_ids))
+        if not requested:
+            raise ValueError('Select at least one member to check in.')
+        if len(requested) > AttendanceService.BULK_CHECK_IN_LIMIT:
+            raise ValueError(
+                f'A group check-in is limited to {AttendanceService.BULK_CHECK_IN_LIMIT} members.'
+            )
+
+        today = timezone.localdate()
+        errors = {}
+        with transaction.atomic():
+            members = {
+                member.pk: member
+                for member in Member.objects.select_for_update(of=('self',))
+                .select_related('user')
+                .filter(pk__in=requested)
+                .order_by('pk')
+            }
+            subscriptions = {
+                subscription.member_id: subscription
+                for subscription in Subscription.objects.select_for_update()
+                .filter(member_id__in=members, status='active')
+                .order_by('pk')
+            }
+            open_attendance = {
+                attendance.member_id: attendance
+                for attendance in Attendance.objects.filter(member_id__in=members, check_out__isnull=True)
+            }
+
+            lapsed_subscriptions = {}
+            pending = []
+            for member_id in requested:
+                member = members.get(member_id)
+                subscription = subscriptions.get(member_id)
+                if member is None:
+                    errors[member_id] = 'Member not found.'
+                elif subscription is None:
+                    errors[member_id] = str(AttendanceService._no_subscription_error(member))
+                elif subscription.end_date < today:
+                    lapsed_subscriptions[subscription.pk] = member_id
+                    errors[member_id] = str(AttendanceService._expired_subscription_error(member, subscription))
+                elif member_id in open_attendance:
+                    errors[member_id] = str(
+                        AttendanceService._already_checked_in_error(member, open_attendance[member_id])
+                    )
+                else:
+                    pending.append(Attendance(member=member))
+
+            if lapsed_subscriptions:
+                Subscription.objects.filter(pk__in=lapsed_subscriptions).update(status='expired')
+                SubscriptionService.sync_current_subscriptions(lapsed_subscriptions.values())
+                DashboardSnapshotService.invalidate('subscriptions')
+
+            try:
+                with transaction.atomic():
+                    created = Attendance.objects.bulk_create(pending)
+            except IntegrityError:
+                # A concurrent QR check-in opened a session for one of these
+                # members; fall back to row-by-row inserts to report which.
+                created = []
+                for attendance in pending:
+                    try:
+                        with transaction.atomic():
+                            attendance.save()
+                    except IntegrityError:
+                        errors[attendance.member_id] = (
+                            f'{attendance.member.user.full_name} already has an open attendance session. '
+                            'Please complete checkout before a new check-in.'
+                        )
+                    else:
+                        created.append(attendance)
+
+            if created:
+                AttendanceRollupService.record_check_ins(created)
+                OccupancyService.record_check_ins(created)
+                DashboardSnapshotService.invalidate('attendance')
+
+        created_by_member = {attendance.member_id: attendance for attendance in created}
+        results = []
+        for member_id in requested:
+            member = members.get(member_id)
+            attendance = created_by_member.get(member_id)
+            results.append({
+                'member_id': member_id,
+                'member_name': member.user.full_name if member else '',
+                'checked_in': attendance is not None,
+                'message': (
+                    f'Checked in at {timezone.localtime(attendance.check_in).strftime("%I:%M %p")}.'
+                    if attendance is not None else errors[member_id]
+                ),
+                'attendance': attendance,
+            })
+        return results
     
     @staticmethod
     def check_out_member(attendance):
@@ -623,6 +1221,415 @@ class AttendanceService:
         return attendance
 
 
+class AttendanceRollupService:
+    """Service maintaining the pre-aggregated AttendanceRollup buckets."""
+
+    REBUILD_BATCH_SIZE = 500
+
+    @staticmethod
+    def get_bucket(attendance) -> Tuple[Any, int]:
+        """Return the (date, hour) rollup bucket an attendance row belongs to."""
+        return attendance.date, timezone.localtime(attendance.check_in).hour
+
+    @staticmethod
+    def _increment_bucket(bucket_date, hour, **deltas):
+        """Atomically add deltas to a rollup bucket, creating it on first use."""
+        from .models import AttendanceRollup
+
+        updates = {field: F(field) + value for field, value in deltas.items()}
+        with transaction.atomic():
+            updated = AttendanceRollup.objects.filter(date=bucket_date, hour=hour).update(**updates)
+            if updated:
+                return
+
+            try:
+                with transaction.atomic():
+                    AttendanceRollup.objects.create(date=bucket_date, hour=hour, **deltas)
+            except IntegrityError:
+                # A concurrent check-in created the bucket first; fold our deltas into it.
+                AttendanceRollup.objects.filter(date=bucket_date, hour=hour).update(**updates)
+
+    @staticmethod
+    def record_check_in(attendance):
+        """Count a new attendance row in its rollup bucket."""
+        from .models import Attendance
+
+        bucket_date, hour = AttendanceRollupService.get_bucket(attendance)
+        is_first_visit_today = not Attendance.objects.filter(
+            member_id=attendance.member_id,
+            date=bucket_date,
+        ).exclude(pk=attendance.pk).exists()
+
+        AttendanceRollupService._increment_bucket(
+            bucket_date,
+            hour,
+            visits=1,
+            unique_members=1 if is_first_visit_today else 0,
+        )
+
+    @staticmethod
+    def record_check_ins(attendances):
+        """Count a batch of new attendance rows with one increment per rollup bucket."""
+        from .models import Attendance
+
+        if not attendances:
+            return
+
+        earlier_visits = set(
+            Attendance.objects.filter(
+                member_id__in={attendance.member_id for attendance in attendances},
+                date__in={attendance.date for attendance in attendances},
+            ).exclude(
+                pk__in=[attendance.pk for attendance in attendances],
+            ).values_list('member_id', 'date')
+        )
+
+        buckets = {}
+        for attendance in attendances:
+            deltas = buckets.setdefault(
+                AttendanceRollupService.get_bucket(attendance),
+                {'visits': 0, 'unique_members': 0},
+            )
+            deltas['visits'] += 1
+            visit_key = (attendance.member_id, attendance.date)
+            if visit_key not in earlier_visits:
+                deltas['unique_members'] += 1
+                earlier_visits.add(visit_key)
+
+        for (bucket_date, hour), deltas in buckets.items():
+            AttendanceRollupService._increment_bucket(bucket_date, hour, **deltas)
+
+    @staticmethod
+    def record_check_out(attendance):
+        """Add a completed visit's duration to the bucket of its check-in hour."""
+        if not attendance.check_out:
+            return
+
+        bucket_date, hour = AttendanceRollupService.get_bucket(attendance)
+        duration_seconds = int((attendance.check_out - attendance.check_in).total_seconds())
+
+        AttendanceRollupService._increment_bucket(
+            bucket_date,
+            hour,
+            completed_visits=1,
+            duration_seconds=max(duration_seconds, 0),
+        )
+
+    @staticmethod
+    def record_check_outs(attendances):
+        """Add a batch of completed visits with one increment per rollup bucket."""
+        buckets = {}
+        for attendance in attendances:
+            if not attendance.check_out:
+                continue
+            deltas = buckets.setdefault(
+                AttendanceRollupService.get_bucket(attendance),
+                {'completed_visits': 0, 'duration_seconds': 0},
+            )
+            deltas['completed_visits'] += 1
+            deltas['duration_seconds'] += max(
+                int((attendance.check_out - attendance.check_in).total_seconds()), 0
+            )
+
+        for (bucket_date, hour), deltas in buckets.items():
+            AttendanceRollupService._increment_bucket(bucket_date, hour, **deltas)
+
+    @staticmethod
+    @transaction.atomic
+    def rebuild(start_date=None, end_date=None) -> int:
+        """
+        Recompute rollup buckets from raw attendance rows.
+
+        Args:
+            start_date: First date to rebuild (defaults to the earliest attendance)
+            end_date: Last date to rebuild (defaults to today)
+
+        Returns:
+            int: Number of rollup buckets written
+        """
+        from .models import Attendance, AttendanceRollup
+
+        if start_date is None:
+            start_date = Attendance.objects.order_by('date').values_list('date', flat=True).first()
+            if start_date is None:
+                return 0
+        if end_date is None:
+            end_date = timezone.localdate()
+
+        AttendanceRollup.objects.filter(date__gte=start_date, date__lte=end_date).delete()
+
+        rows = Attendance.objects.filter(
+            date__gte=start_date,
+            date__lte=end_date,
+        ).order_by('date', 'check_in').values_list('date', 'member_id', 'check_in', 'check_out')
+
+        buckets = {}
+        seen_members = set()
+        current_date = None
+        for visit_date, member_id, check_in, check_out in rows.iterator(chunk_size=2000):
+            if visit_date != current_date:
+                current_date = visit_date
+                seen_members.clear()
+
+            key = (visit_date, timezone.localtime(check_in).hour)
+            bucket = buckets.setdefault(key, AttendanceRollup(date=key[0], hour=key[1]))
+            bucket.visits += 1
+            if member_id not in seen_members:
+                seen_members.add(member_id)
+                bucket.unique_members += 1
+            if check_out:
+                bucket.completed_visits += 1
+                bucket.duration_seconds += max(int((check_out - check_in).total_seconds()), 0)
+
+        AttendanceRollup.objects.bulk_create(
+            buckets.values(),
+            batch_size=AttendanceRollupService.REBUILD_BATCH_SIZE,
+        )
+        return len(buckets)
+
+    @staticmethod
+    def summarize(start_date, end_date, peak_hours_limit: int = 5) -> Dict[str, Any]:
+        """
+        Summarize attendance for a date range from rollup buckets.
+
+        Args:
+            start_date: Range start date
+            end_date: Range end date
+            peak_hours_limit: Number of busiest hours to return
+
+        Returns:
+            dict: Visit totals, average duration, peak hours and daily trend
+        """
+        from .models import AttendanceRollup
+
+        buckets = AttendanceRollup.objects.filter(date__gte=start_date, date__lte=end_date)
+
+        totals = buckets.aggregate(
+            visits=Sum('visits'),
+            completed_visits=Sum('completed_visits'),
+            duration_seconds=Sum('duration_seconds'),
+        )
+        completed_visits = totals['completed_visits'] or 0
+
+        peak_hours = buckets.values('hour').annotate(
+            count=Sum('visits')
+        ).order_by('-count', 'hour')[:peak_hours_limit]
+
+        daily = buckets.values('date').annotate(
+            count=Sum('visits'),
+            unique_members=Sum('unique_members'),
+        ).order_by('date')
+
+        return {
+            'total_visits': totals['visits'] or 0,
+            'avg_duration_hours': (
+                (totals['duration_seconds'] or 0) / completed_visits / 3600
+                if completed_visits else 0
+            ),
+            'peak_hours': list(peak_hours),
+            'daily_attendance': list(daily),
+        }
+
+
+class OccupancyService:
+    """
+    Cached live occupancy: members checked in today and not yet checked out.
+    
+    The count is an atomic cache counter and the present members are a cached
+    map keyed by member id. Both are updated after check-in and checkout
+    commit; the map is replaced by compare-and-set on its version, so
+    concurrent updates retry instead of overwriting each other. Both are rebuilt from the attendance table whenever they are missing or
+    older than GYM_OCCUPANCY_RECONCILE_SECONDS, which bounds any drift from
+    lost updates or writes that bypass the service. Each committed change is
+    also published to the live attendance feed.
+    """
+
+    RECONCILE_SECONDS = getattr(settings, 'GYM_OCCUPANCY_RECONCILE_SECONDS', 60)
+    CACHE_TIMEOUT = 60 * 60 * 24  # Keys are day-scoped; keep them for the whole day
+    CAS_ATTEMPTS = 10  # Tries before a contended update drops the map for reconcile
+    CAS_RETRY_SECONDS = 0.01
+    CAS_CLAIM_SECONDS = 10  # Lifetime of a version claim, bounding a stalled writer
+
+    @staticmethod
+    def get_cache_keys(day) -> Tuple[str, str]:
+        """Return the (count, members) cache keys for a day."""
+        return f"occupancy:{day.isoformat()}:count", f"occupancy:{day.isoformat()}:members"
+
+    @staticmethod
+    def _serialize(attendance) -> Dict[str, Any]:
+        return {
+            'attendance_id': attendance.pk,
+            'member_id': attendance.member_id,
+            'member_name': attendance.member.user.full_name,
+            'check_in': attendance.check_in,
+        }
+
+    @staticmethod
+    def reconcile(day=None) -> Dict[str, Any]:
+        """
+        Rebuild the cached occupancy for a day from the attendance table.
+        
+        Returns:
+            dict: The rebuilt state with ``count`` and ``members``
+        """
+        from .models import Attendance
+
+        day = day or timezone.localdate()
+        open_records = Attendance.objects.filter(
+            date=day,
+            check_out__isnull=True
+        ).select_related('member__user')
+        members = {
+            attendance.member_id: OccupancyService._serialize(attendance)
+            for attendance in open_records
+        }
+        state = {'members': members, 'reconciled_at': timezone.now(), 'version': uuid.uuid4().hex}
+
+        count_key, members_key = OccupancyService.get_cache_keys(day)
+        cache.set_many({count_key: len(members), members_key: state}, OccupancyService.CACHE_TIMEOUT)
+        return {'count': len(members), 'members': members}
+
+    @staticmethod
+    def get_state(day=None) -> Dict[str, Any]:
+        """Return the current ``count`` and ``members`` map, reconciling if stale."""
+        day = day or timezone.localdate()
+        count_key, members_key = OccupancyService.get_cache_keys(day)
+        cached = cache.get_many([count_key, members_key])
+        count = cached.get(count_key)
+        state = cached.get(members_key)
+
+        if count is None or state is None or (
+            timezone.now() - state['reconciled_at']
+        ).total_seconds() > OccupancyService.RECONCILE_SECONDS:
+            return OccupancyService.reconcile(day)
+
+        return {'count': max(count, 0), 'members': state['members']}
+
+    @staticmethod
+    def get_count(day=None) -> int:
+        """Number of members currently in the gym."""
+        return OccupancyService.get_state(day)['count']
+
+    @staticmethod
+    def get_present_members(day=None) -> List[Dict[str, Any]]:
+        """Members currently in the gym, most recent check-in first."""
+        members = OccupancyService.get_state(day)['members'].values()
+        return sorted(members, key=lambda entry: entry['check_in'], reverse=True)
+
+    @staticmethod
+    def _update_members(members_key, entries: Dict[int, Dict[str, Any]], removed=()) -> None:
+        """
+        Add and remove present members with a versioned compare-and-set.
+        
+        A writer may only replace the version it read: cache.add on a claim
+        key for that version succeeds for exactly one writer, and the others
+        re-read the new map and retry. If the map stays contended, it is
+        dropped so the next read reconciles from the database.
+        """
+        for _ in range(OccupancyService.CAS_ATTEMPTS):
+            state = cache.get(members_key)
+            if state is None:
+                return
+            members = {**state['members'], **entries}
+            for member_id in removed:
+                members.pop(member_id, None)
+            claim_key = f"{members_key}:cas:{state.get('version')}"
+            if cache.add(claim_key, True, OccupancyService.CAS_CLAIM_SECONDS):
+                cache.set(
+                    members_key,
+                    {**state, 'members': members, 'version': uuid.uuid4().hex},
+                    OccupancyService.CACHE_TIMEOUT,
+                )
+                return
+            time.sleep(OccupancyService.CAS_RETRY_SECONDS)
+        
+        logger.warning('Occupancy map stayed contended; dropping it for reconcile')
+        cache.delete(members_key)
+
+    @staticmethod
+    def _apply(day, member_id, entry=None, delta: int = 0) -> None:
+        count_key, members_key = OccupancyService.get_cache_keys(day)
+        try:
+            cache.incr(count_key, delta)
+        except ValueError:
+            # Counter not cached yet; the next read reconciles from the database.
+            return
+
+        if entry is not None:
+            OccupancyService._update_members(members_key, {member_id: entry})
+        else:
+            OccupancyService._update_members(members_key, {}, removed=[member_id])
+
+    @staticmethod
+    def record_check_in(attendance) -> None:
+        """Add a member to the present set once the check-in commits."""
+        entry = OccupancyService._serialize(attendance)
+
+        def apply():
+            OccupancyService._apply(attendance.date, attendance.member_id, entry, 1)
+            publish_event({'type': 'check_in', **entry})
+
+        transaction.on_commit(apply)
+
+    @staticmethod
+    def _apply_batch(day, entries: Optional[Dict[int, Dict[str, Any]]] = None, removed=()) -> None:
+        entries = entries or {}
+        count_key, members_key = OccupancyService.get_cache_keys(day)
+        try:
+            cache.incr(count_key, len(entries) - len(removed))
+        except ValueError:
+            return
+
+        OccupancyService._update_members(members_key, entries, removed)
+
+    @staticmethod
+    def record_check_ins(attendances) -> None:
+        """Add a batch of members to the present set with one cache update per day."""
+        by_day = {}
+        for attendance in attendances:
+            by_day.setdefault(attendance.date, {})[attendance.member_id] = OccupancyService._serialize(attendance)
+
+        def apply():
+            for day, entries in by_day.items():
+                OccupancyService._apply_batch(day, entries)
+                for entry in entries.values():
+                    publish_event({'type': 'check_in', **entry})
+
+        transaction.on_commit(apply)
+
+    @staticmethod
+    def _check_out_event(attendance) -> Dict[str, Any]:
+        return {'type': 'check_out', 'attendance_id': attendance.pk, 'member_id': attendance.member_id}
+
+    @staticmethod
+    def record_check_out(attendance) -> None:
+        """Remove a member from the present set once the checkout commits."""
+        event = OccupancyService._check_out_event(attendance)
+
+        def apply():
+            OccupancyService._apply(attendance.date, attendance.member_id, None, -1)
+            publish_event(event)
+
+        transaction.on_commit(apply)
+
+    @staticmethod
+    def record_check_outs(attendances) -> None:
+        """Remove a batch of members from the present set with one cache update per day."""
+        by_day = {}
+        events = []
+        for attendance in attendances:
+            by_day.setdefault(attendance.date, []).append(attendance.member_id)
+            events.append(OccupancyService._check_out_event(attendance))
+
+        def apply():
+            for day, member_ids in by_day.items():
+                OccupancyService._apply_batch(day, removed=member_ids)
+            for event in events:
+                publish_event(event)
+
+        transaction.on_commit(apply)
+
+
 class PaymentService:
     """Service for handling payment operations."""
 
@@ -745,6 +1752,7 @@ class PaymentService:
             locked_payment.status = 'completed'
             locked_payment.completed_at = timezone.now()
             locked_payment.save(update_fields=['status', 'completed_at'])
+            RevenueLedgerService.record_completion(locked_payment)
 
         # Activate subscription if pending, expiring any other active ones first.
         subscription = Subscription.objects.select_for_update().select_related('plan').get(
@@ -763,6 +1771,8 @@ class PaymentService:
             subscription.status = 'active'
             subscription.start_date = start_date
             subscription.end_date = end_date
+            # post_save re-points the member's current subscription, covering
+            # the expiry above too, inside this transaction.
             subscription.save(update_fields=['status', 'start_date', 'end_date'])
         elif subscription.status != 'active':
             raise ValidationError(PaymentService.PENDING_SUBSCRIPTION_ERROR)
@@ -793,6 +1803,7 @@ class PaymentService:
         if reason:
             locked_payment.notes = f"{locked_payment.notes}\nRefund reason: {reason}".strip()
         locked_payment.save(update_fields=['status', 'notes'])
+        RevenueLedgerService.record_reversal(locked_payment)
         
         # Optionally cancel associated subscription
         subscription = Subscription.objects.select_for_update().get(pk=locked_payment.subscription.pk)
@@ -803,10 +1814,139 @@ class PaymentService:
         return locked_payment
 
 
+class RevenueLedgerService:
+    """Service maintaining the materialized RevenueBucket ledger."""
+
+    @staticmethod
+    def _apply(bucket_date, payment_method, amount, count):
+        """Atomically add amount/count to a revenue bucket, creating it on first use."""
+        from .models import RevenueBucket
+
+        updates = {'total': F('total') + amount, 'count': F('count') + count}
+        with transaction.atomic():
+            updated = RevenueBucket.objects.filter(
+                date=bucket_date,
+                payment_method=payment_method,
+            ).update(**updates)
+            if updated:
+                return
+
+            try:
+                with transaction.atomic():
+                    RevenueBucket.objects.create(
+                        date=bucket_date,
+                        payment_method=payment_method,
+                        total=amount,
+                        count=count,
+                    )
+            except IntegrityError:
+                # A concurrent completion created the bucket first; fold into it.
+                RevenueBucket.objects.filter(
+                    date=bucket_date,
+                    payment_method=payment_method,
+                ).update(**updates)
+
+    @staticmethod
+    def record_completion(payment):
+        """Add a newly completed payment to the bucket of its completion day."""
+        if payment.completed_at is None:
+            return
+        RevenueLedgerService._apply(
+            timezone.localdate(payment.completed_at),
+            payment.payment_method,
+            payment.amount,
+            1,
+        )
+
+    @staticmethod
+    def record_reversal(payment):
+        """Remove a previously completed payment (e.g. on refund) from its bucket."""
+        if payment.completed_at is None:
+            return
+        RevenueLedgerService._apply(
+            timezone.localdate(payment.completed_at),
+            payment.payment_method,
+            -payment.amount,
+            -1,
+        )
+
+    @staticmethod
+    @transaction.atomic
+    def rebuild(start_date=None, end_date=None) -> Dict[str, int]:
+        """
+        Rebuild revenue buckets from completed Payment rows.
+
+        Args:
+            start_date: First completion date to rebuild (defaults to earliest bucket/payment)
+            end_date: Last completion date to rebuild (defaults to today)
+
+        Returns:
+            dict: Number of buckets written and number that had drifted
+        """
+        from .models import Payment, RevenueBucket
+
+        payments = Payment.objects.filter(status='completed', completed_at__isnull=False)
+        buckets = RevenueBucket.objects.all()
+        if start_date is not None:
+            payments = payments.filter(completed_at__date__gte=start_date)
+            buckets = buckets.filter(date__gte=start_date)
+        if end_date is not None:
+            payments = payments.filter(completed_at__date__lte=end_date)
+            buckets = buckets.filter(date__lte=end_date)
+
+        previous = {
+            (row['date'], row['payment_method']): (row['total'], row['count'])
+            for row in buckets.filter(count__gt=0).values('date', 'payment_method', 'total', 'count')
+        }
+
+        grouped = payments.annotate(
+            day=TruncDate('completed_at')
+        ).values('day', 'payment_method').annotate(
+            total=Sum('amount'),
+            count=Count('id')
+        )
+        rebuilt = [
+            RevenueBucket(
+                date=row['day'],
+                payment_method=row['payment_method'],
+                total=row['total'],
+                count=row['count'],
+            )
+            for row in grouped
+        ]
+
+        current = {(bucket.date, bucket.payment_method): (bucket.total, bucket.count) for bucket in rebuilt}
+        drifted = sum(
+            1 for key in previous.keys() | current.keys()
+            if previous.get(key) != current.get(key)
+        )
+
+        buckets.delete()
+        RevenueBucket.objects.bulk_create(rebuilt, batch_size=500)
+        DashboardSnapshotService.invalidate('payments')
+
+        return {'buckets_written': len(rebuilt), 'buckets_drifted': drifted}
+
+    @staticmethod
+    def get_buckets(start_date, end_date):
+        """Return non-empty revenue buckets within an inclusive completion-date range."""
+        from .models import RevenueBucket
+
+        return RevenueBucket.objects.filter(
+            date__gte=start_date,
+            date__lte=end_date,
+            count__gt=0,
+        )
+
+
 class NotificationService:
     """Service for handling expiry notifications and alerts."""
     
     EXPIRY_ALERT_DAYS = [7, 3, 1]  # Days before expiry to send alerts
+    NOTIFICATION_BATCH_SIZE = 500  # Rows per dedup lookup / bulk insert
+    EMAIL_TEMPLATE_NAME = 'gym_management/emails/notification.html'
+    
+    _email_template = None
     
     @staticmethod
     def get_expiring_subscriptions(days_before: int) -> List:
@@ -838,6 +1978,24 @@ class NotificationService:
         }
         return mapping.get(days_before, 'general')
     
+    @staticmethod
+    def build_expiry_content(subscription, days_before: int) -> Tuple[str, str]:
+        """Build the (title, message) pair for an expiry notification."""
+        if days_before == 0:
+            title = "Your Subscription Has Expired"
+            message = (
+                f"Your {subscription.plan.name} subscription has expired. "
+                f"Please renew to continue enjoying our facilities."
+            )
+        else:
+            day_word = "day" if days_before == 1 else "days"
+            title = f"Subscription Expiring in {days_before} {day_word}"
+            message = (
+                f"Your {subscription.plan.name} subscription will expire on {subscription.end_date}. "
+                f"Renew now to avoid interruption to your gym access."
+            )
+        return title, message
+    
     @staticmethod
     def notification_already_sent(member, subscription, notification_type: str) -> bool:
         """Check if notification was already sent for this subscription/type combo."""
@@ -874,20 +2032,7 @@ class NotificationService:
             logger.info(f"Notification {notification_type} already sent to {subscription.member.user.email}")
             return None
         
-        # Build notification content
-        if days_before == 0:
-            title = "Your Subscription Has Expired"
-            message = (
-                f"Your {subscription.plan.name} subscription has expired. "
-                f"Please renew to continue enjoying our facilities."
-            )
-        else:
-            day_word = "day" if days_before == 1 else "days"
-            title = f"Subscription Expiring in {days_before} {day_word}"
-            message = (
-                f"Your {subscription.plan.name} subscription will expire on {subscription.end_date}. "
-                f"Renew now to avoid interruption to your gym access."
-            )
+        title, message = NotificationService.build_expiry_content(subscription, days_before)
         
         notification = Notification.objects.create(
             member=subscription.member,
@@ -901,181 +2046,233 @@ class NotificationService:
         logger.info(f"Created {notification_type} notification for {subscription.member.user.email}")
         return notification
     
+    @staticmethod
+    def get_email_template():
+        """Return the compiled notification email template, loading it once per process."""
+        if NotificationService._email_template is None:
+            NotificationService._email_template = get_template(NotificationService.EMAIL_TEMPLATE_NAME)
+        return NotificationService._email_template
+    
+    @staticmethod
+    def build_outbound_email(notification):
+        """Render a notification into an unsaved OutboundEmail row."""
+        from .models import OutboundEmail
+        
+        member = notification.member
+        context = {
+            'member_name': member.user.full_name,
+            'notification': notification,
+            'subscription': notification.subscription,
+        }
+        
+        return OutboundEmail(
+            notification=notification,
+            to_email=member.user.email,
+            from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@mscube.com'),
+            subject=notification.title,
+            body_text=f"{notification.title}\n\n{notification.message}",
+            body_html=NotificationService.get_email_template().render(context),
+        )
+    
+    @staticmethod
+    def queue_email_notifications(notifications) -> int:
+        """
+        Enqueue notification emails for delivery by the email worker.
+        
+        Notifications that were already emailed, or that already have a
+        pending or in-flight queue row, are skipped.
+        
+        Args:
+            notifications: Iterable of Notification instances
+            
+        Returns:
+            int: Number of emails queued
+        """
+        from .models import OutboundEmail
+        
+        pending = [notification for notification in notifications if not notification.email_sent]
+        queued = 0
+        
+        for offset in range(0, len(pending), NotificationService.NOTIFICATION_BATCH_SIZE):
+            chunk = pending[offset:offset + NotificationService.NOTIFICATION_BATCH_SIZE]
+            already_queued = set(
+                OutboundEmail.objects.filter(
+                    notification_id__in=[notification.pk for notification in chunk],
+                    status__in=['pending', 'sending'],
+                ).values_list('notification_id', flat=True)
+            )
+            emails = [
+                NotificationService.build_outbound_email(notification)
+                for notification in chunk
+                if notification.pk not in already_queued
+            ]
+            OutboundEmail.objects.bulk_create(emails)
+            queued += len(emails)
+        
+        return queued
+    
     @staticmethod
     def send_email_notification(notification) -> bool:
         """
-        Send email notification.
+        Queue an email notification for delivery.
         
         Args:
             notification: Notification instance
             
         Returns:
-            bool: True if email sent successfully
+            bool: True if the email is sent or queued
         """
         if notification.email_sent:
             return True
         
-        try:
-            member = notification.member
-            context = {
-                'member_name': member.user.full_name,
-                'notification': notification,
-                'subscription': notification.subscription,
-            }
-            
-            # Render email template
-            html_message = render_to_string('gym_management/emails/notification.html', context)
-            plain_message = f"{notification.title}\n\n{notification.message}"
+        NotificationService.queue_email_notifications([notification])
+        return True
+    
+    @staticmethod
+    def collect_expiry_candidates() -> List[Tuple[Any, int]]:
+        """
+        Stage 1: fetch every subscription due an expiry alert in a single query.
+        
+        Covers each window in EXPIRY_ALERT_DAYS plus subscriptions that ended
+        yesterday (the 'expired' alert).
+        
+        Returns:
+            list: (subscription, days_before) pairs; days_before is 0 for expired
+        """
+        from .models import Subscription
+        
+        today = timezone.localdate()
+        window_by_end_date = {
+            today + timedelta(days=days): days
+            for days in NotificationService.EXPIRY_ALERT_DAYS
+        }
+        yesterday = today - timedelta(days=1)
+        
+        subscriptions = Subscription.objects.filter(
+            Q(status='active', end_date__in=list(window_by_end_date))
+            | Q(status__in=['active', 'expired'], end_date=yesterday)
+        ).select_related('member__user', 'plan').order_by('pk')
+        
+        return [
+            (subscription, 0 if subscription.end_date == yesterday else window_by_end_date[subscription.end_date])
+            for subscription in subscriptions
+        ]
+    
+    @staticmethod
+    def create_expiry_notifications_bulk(candidates, channel: str = 'both') -> List:
+        """
+        Stage 2: drop candidates already notified and bulk-insert the rest.
+        
+        Args:
+            candidates: (subscription, days_before) pairs from collect_expiry_candidates
+            channel: Notification channel for the new rows
             
-            send_mail(
-                subject=notification.title,
-                message=plain_message,
-                from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@mscube.com'),
-                recipient_list=[member.user.email],
-                html_message=html_message,
-                fail_silently=False,
+        Returns:
+            list: Newly created Notification instances
+        """
+        from .models import Notification
+        
+        batch_size = NotificationService.NOTIFICATION_BATCH_SIZE
+        subscription_ids = [subscription.pk for subscription, _ in candidates]
+        notification_types = {
+            NotificationService.get_notification_type(days) for _, days in candidates
+        }
+        
+        already_sent = set()
+        for offset in range(0, len(subscription_ids), batch_size):
+            already_sent.update(
+                Notification.objects.filter(
+                    subscription_id__in=subscription_ids[offset:offset + batch_size],
+                    notification_type__in=notification_types,
+                ).values_list('subscription_id', 'notification_type')
             )
+        
+        pending = []
+        for subscription, days in candidates:
+            notification_type = NotificationService.get_notification_type(days)
+            key = (subscription.pk, notification_type)
+            if key in already_sent:
+                continue
+            already_sent.add(key)
             
-            notification.mark_email_sent()
-            logger.info(f"Email sent to {member.user.email} for {notification.notification_type}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Failed to send email to {notification.member.user.email}: {e}")
-            return False
+            title, message = NotificationService.build_expiry_content(subscription, days)
+            pending.append(Notification(
+                member=subscription.member,
+                subscription=subscription,
+                notification_type=notification_type,
+                channel=channel,
+                title=title,
+                message=message,
+            ))
+        
+        created = []
+        for offset in range(0, len(pending), batch_size):
+            with transaction.atomic():
+                created.extend(
+                    Notification.objects.bulk_create(pending[offset:offset + batch_size])
+                )
+        return created
     
     @staticmethod
-    def process_expiry_notifications():
+    def dispatch_email_notifications(notifications) -> int:
+        """
+        Stage 3: queue emails for notifications whose channel includes email.
+        
+        Returns:
+            int: Number of emails queued for the email worker
+        """
+        return NotificationService.queue_email_notifications([
+            notification for notification in notifications
+            if notification.channel in ['email', 'both']
+        ])
+    
+    @staticmethod
+    def process_expiry_notifications(
+        send_emails: bool = True,
+        channel: str = 'both',
+        expire: bool = True,
+        batch_size: Optional[int] = None,
+    ):
         """
         Background task to process all expiry notifications.
         Should be run daily via cron/celery.
         
+        Args:
+            send_emails: Queue emails for the new notifications
+            channel: Channel for newly created notifications
+            expire: Run expire_due_subscriptions first; pass False when the
+                caller has already run it
+            batch_size: Subscriptions expired per transaction
+        
         Returns:
-            dict: Statistics of notifications processed
+            dict: Statistics of subscriptions expired and notifications processed
         """
-        from .models import Notification
-        
         stats = {
+            'expired': 0,
             'notifications_created': 0,
-            'emails_sent': 0,
-            'errors': 0,
+            'emails_queued': 0,
         }
         
-        # Prefetch all existing notifications to avoid N+1 queries
-        all_notification_keys = set()
-        for days in NotificationService.EXPIRY_ALERT_DAYS:
-            subscriptions = NotificationService.get_expiring_subscriptions(days)
-            subscription_ids = list(subscriptions.values_list('id', flat=True))
-            
-            if subscription_ids:
-                notification_type = NotificationService.get_notification_type(days)
-                
-                # Fetch existing notifications in bulk
-                existing_notifications = Notification.objects.filter(
-                    subscription_id__in=subscription_ids,
-                    notification_type=notification_type
-                ).values_list('member_id', 'subscription_id', 'notification_type')
-                
-                # Build a set of (member_id, subscription_id, notification_type) tuples
-                for notif in existing_notifications:
-                    all_notification_keys.add(notif)
-        
-        # Process each alert window
-        for days in NotificationService.EXPIRY_ALERT_DAYS:
-            subscriptions = NotificationService.get_expiring_subscriptions(days)
-            notification_type = NotificationService.get_notification_type(days)
-            
-            for subscription in subscriptions:
-                try:
-                    # Check in-memory if notification already sent
-                    key = (subscription.member_id, subscription.id, notification_type)
-                    if key in all_notification_keys:
-                        logger.info(f"Notification {notification_type} already sent to {subscription.member.user.email}")
-                        continue
-                    
-                    # Create notification directly (skip duplicate check since we did it above)
-                    if days == 0:
-                        title = "Your Subscription Has Expired"
-                        message = (
-                            f"Your {subscription.plan.name} subscription has expired. "
-                            f"Please renew to continue enjoying our facilities."
-                        )
-                    else:
-                        day_word = "day" if days == 1 else "days"
-                        title = f"Subscription Expiring in {days} {day_word}"
-                        message = (
-                            f"Your {subscription.plan.name} subscription will expire on {subscription.end_date}. "
-                            f"Renew now to avoid interruption to your gym access."
-                        )
-                    
-                    notification = Notification.objects.create(
-                        member=subscription.member,
-                        subscription=subscription,
-                        notification_type=notification_type,
-                        channel='both',
-                        title=title,
-                        message=message
-                    )
-                    
-                    stats['notifications_created'] += 1
-                    all_notification_keys.add(key)  # Add to set to prevent duplicates in same run
-                    
-                    # Send email if channel includes email
-                    if notification.channel in ['email', 'both']:
-                        if NotificationService.send_email_notification(notification):
-                            stats['emails_sent'] += 1
-                        else:
-                            stats['errors'] += 1
-                            
-                except Exception as e:
-                    logger.error(f"Error processing notification for {subscription}: {e}")
-                    stats['errors'] += 1
-        
-        # Also process expired subscriptions (0 days)
-        expired_subs = NotificationService.get_expiring_subscriptions(-1)  # Yesterday = expired
-        expired_sub_ids = list(expired_subs.values_list('id', flat=True))
-        
-        if expired_sub_ids:
-            # Fetch existing expired notifications in bulk
-            existing_expired = Notification.objects.filter(
-                subscription_id__in=expired_sub_ids,
-                notification_type='expired'
-            ).values_list('member_id', 'subscription_id', 'notification_type')
-            
-            for notif in existing_expired:
-                all_notification_keys.add(notif)
-        
-        for subscription in expired_subs:
-            try:
-                # Update subscription status
-                if subscription.status == 'active':
-                    subscription.status = 'expired'
-                    subscription.save(update_fields=['status'])
-                
-                # Check if notification already sent
-                key = (subscription.member_id, subscription.id, 'expired')
-                if key in all_notification_keys:
-                    continue
-                
-                notification = Notification.objects.create(
-                    member=subscription.member,
-                    subscription=subscription,
-                    notification_type='expired',
-                    channel='both',
-                    title="Your Subscription Has Expired",
-                    message=(
-                        f"Your {subscription.plan.name} subscription has expired. "
-                        f"Please renew to continue enjoying our facilities."
-                    )
-                )
-                
-                stats['notifications_created'] += 1
-                if NotificationService.send_email_notification(notification):
-                    stats['emails_sent'] += 1
-                    
-            except Exception as e:
-                logger.error(f"Error processing expired notification for {subscription}: {e}")
-                stats['errors'] += 1
+        # Lapsed subscriptions are expired, with their 'expired' notifications,
+        # by the batched expiry engine first.
+        if expire:
+            for batch in SubscriptionService.expire_due_subscriptions(
+                batch_size=batch_size,
+                channel=channel,
+                send_emails=send_emails,
+            ):
+                stats['expired'] += batch['expired']
+                stats['notifications_created'] += batch['notifications_created']
+                stats['emails_queued'] += batch['emails_queued']
+        
+        # Remaining alerts: upcoming expiries, plus subscriptions that ended
+        # yesterday but were expired elsewhere (e.g. at check-in).
+        candidates = NotificationService.collect_expiry_candidates()
+        notifications = NotificationService.create_expiry_notifications_bulk(candidates, channel=channel)
+        stats['notifications_created'] += len(notifications)
+        
+        if send_emails:
+            stats['emails_queued'] += NotificationService.dispatch_email_notifications(notifications)
         
         logger.info(f"Expiry notification processing complete: {stats}")
         return stats
@@ -1110,6 +2307,175 @@ class NotificationService:
         queryset.update(is_read=True, read_at=timezone.now())
 
 
+class EmailQueueService:
+    """
+    Service for delivering the persistent outbound email queue.
+    
+    Workers claim due rows with SELECT ... FOR UPDATE SKIP LOCKED, so any
+    number of `run_email_worker` processes can drain the queue in parallel
+    without sending the same email twice.
+    """
+    
+    EMAIL_BATCH_SIZE = getattr(settings, 'NOTIFICATION_EMAIL_BATCH_SIZE', 100)  # Messages per SMTP connection
+    MAX_ATTEMPTS = getattr(settings, 'EMAIL_QUEUE_MAX_ATTEMPTS', 5)
+    RETRY_BASE_SECONDS = getattr(settings, 'EMAIL_QUEUE_RETRY_BASE_SECONDS', 60)
+    RETRY_MAX_SECONDS = getattr(settings, 'EMAIL_QUEUE_RETRY_MAX_SECONDS', 3600)
+    LOCK_TIMEOUT_SECONDS = getattr(settings, 'EMAIL_QUEUE_LOCK_TIMEOUT_SECONDS', 600)
+    
+    @staticmethod
+    def get_retry_delay(attempts: int) -> timedelta:
+        """Exponential backoff delay after the given number of failed attempts."""
+        seconds = EmailQueueService.RETRY_BASE_SECONDS * (2 ** max(attempts - 1, 0))
+        return timedelta(seconds=min(seconds, EmailQueueService.RETRY_MAX_SECONDS))
+    
+    @staticmethod
+    def claim_batch(worker_id: str, batch_size: int = None) -> List:
+        """
+        Claim up to ``batch_size`` due emails for this worker.
+        
+        Rows locked by another worker are skipped. Rows left in ``sending`` by
+        a worker that died are reclaimed once LOCK_TIMEOUT_SECONDS has passed.
+        
+        Returns:
+            list: Claimed OutboundEmail instances
+        """
+        from .models import OutboundEmail
+        
+        batch_size = batch_size or EmailQueueService.EMAIL_BATCH_SIZE
+        now = timezone.now()
+        stale_before = now - timedelta(seconds=EmailQueueService.LOCK_TIMEOUT_SECONDS)
+        
+        with transaction.atomic():
+            claimed_ids = list(
+                OutboundEmail.objects.select_for_update(skip_locked=True).filter(
+                    Q(status='pending', next_attempt_at__lte=now) |
+                    Q(status='sending', locked_at__lt=stale_before)
+                ).order_by('next_attempt_at', 'id').values_list('pk', flat=True)[:batch_size]
+            )
+            if not claimed_ids:
+                return []
+            
+            OutboundEmail.objects.filter(pk__in=claimed_ids).update(
+                status='sending',
+                locked_at=now,
+                locked_by=worker_id,
+                attempts=F('attempts') + 1,
+            )
+        
+        return list(OutboundEmail.objects.filter(pk__in=claimed_ids).order_by('next_attempt_at', 'id'))
+    
+    @staticmethod
+    def build_message(outbound_email, connection=None) -> EmailMultiAlternatives:
+        """Build the multipart message for a queued email."""
+        message = EmailMultiAlternatives(
+            subject=outbound_email.subject,
+            body=outbound_email.body_text,
+            from_email=outbound_email.from_email,
+            to=[outbound_email.to_email],
+            connection=connection,
+        )
+        if outbound_email.body_html:
+            message.attach_alternative(outbound_email.body_html, 'text/html')
+        return message
+    
+    @staticmethod
+    def deliver_batch(emails) -> Dict[str, int]:
+        """
+        Send claimed emails over a single pooled connection and record the outcome.
+        
+        A broken connection is reopened once before the message counts as
+        failed. Delivered rows and their notifications are marked sent with one
+        UPDATE each; failed rows are rescheduled with exponential backoff, or
+        marked ``failed`` after MAX_ATTEMPTS.
+        
+        Args:
+            emails: OutboundEmail instances claimed by this worker
+            
+        Returns:
+            dict: Counts of emails sent, retried and failed
+        """
+        from .models import Notification, OutboundEmail
+        
+        stats = {'emails_sent': 0, 'retried': 0, 'failed': 0}
+        if not emails:
+            return stats
+        
+        sent_emails = []
+        failed_emails = []
+        connection = get_connection(fail_silently=False)
+        
+        try:
+            # Open once so every message reuses it; an unopened SMTP backend
+            # would connect and log in again inside each send_messages().
+            try:
+                connection.open()
+            except Exception as e:
+                logger.warning(f"Could not open email connection: {e}; sending per message")
+            
+            for outbound_email in emails:
+                try:
+                    message = EmailQueueService.build_message(outbound_email, connection)
+                    try:
+                        connection.send_messages([message])
+                    except (SMTPServerDisconnected, ConnectionError):
+                        logger.warning(f"SMTP connection dropped while emailing {outbound_email.to_email}; reconnecting")
+                        connection.close()
+                        connection.open()
+                        connection.send_messages([message])
+                except Exception as e:
+                    logger.error(f"Failed to send email to {outbound_email.to_email}: {e}")
+                    outbound_email.last_error = str(e)
+                    failed_emails.append(outbound_email)
+                    continue
+                
+                sent_emails.append(outbound_email)
+        finally:
+            connection.close()
+        
+        now = timezone.now()
+        if sent_emails:
+            OutboundEmail.objects.filter(pk__in=[email.pk for email in sent_emails]).update(
+                status='sent', sent_at=now, locked_at=None, last_error=''
+            )
+            notification_ids = [email.notification_id for email in sent_emails if email.notification_id]
+            if notification_ids:
+                Notification.objects.filter(pk__in=notification_ids, email_sent=False).update(
+                    email_sent=True, email_sent_at=now
+                )
+            stats['emails_sent'] = len(sent_emails)
+        
+        for outbound_email in failed_emails:
+            outbound_email.locked_at = None
+            if outbound_email.attempts >= EmailQueueService.MAX_ATTEMPTS:
+                outbound_email.status = 'failed'
+                stats['failed'] += 1
+            else:
+                outbound_email.status = 'pending'
+                outbound_email.next_attempt_at = now + EmailQueueService.get_retry_delay(outbound_email.attempts)
+                stats['retried'] += 1
+        if failed_emails:
+            OutboundEmail.objects.bulk_update(
+                failed_emails, ['status', 'next_attempt_at', 'locked_at', 'last_error']
+            )
+        
+        return stats
+    
+    @staticmethod
+    def process_batch(worker_id: str, batch_size: int = None) -> Dict[str, int]:
+        """
+        Claim and deliver one batch of due emails.
+        
+        Returns:
+            dict: Counts of emails claimed, sent, retried and failed
+        """
+        emails = EmailQueueService.claim_batch(worker_id, batch_size)
+        stats = EmailQueueService.deliver_batch(emails)
+        stats['claimed'] = len(emails)
+        if emails:
+            logger.info(f"Email worker {worker_id} processed batch: {stats}")
+        return stats
+
+
 class EsewaPaymentService:
     """Service for eSewa payment gateway integration."""
     
@@ -1392,6 +2758,9 @@ class EsewaPaymentService:
 
 class MemberService:
     """Service for member lifecycle management including deactivation."""
+
+    MEMBER_SEARCH_LIMIT = getattr(settings, 'GYM_MEMBER_SEARCH_LIMIT', 20)
+    MEMBER_SEARCH_MAX_LIMIT = 50
     
     @staticmethod
     @transaction.atomic
@@ -1489,7 +2858,7 @@ class MemberService:
             return False, 'Member account is inactive.'
         
         # Check if member has active subscription
-        has_active_sub = member.subscriptions.filter(status='active').exists()
+        has_active_sub = member.current_subscription_status == 'active'
         if not has_active_sub:
             return False, 'No active subscription.'
         
@@ -1520,12 +2889,306 @@ class MemberService:
             return False, 'Member account is inactive.'
         
         # Check if member already has an active subscription
-        has_active_sub = member.subscriptions.filter(status='active').exists()
+        has_active_sub = member.current_subscription_status == 'active'
         if has_active_sub:
             return False, 'already has an active subscription.'
         
         return True, ''
 
+    @staticmethod
+    def _prefix_upper_bound(prefix: str) -> str:
+        """Smallest string greater than every string starting with ``prefix``."""
+        return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+    @staticmethod
+    def search_members(query: str, page: int = 1, limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Prefix-match active members by name for type-ahead pickers.
+
+        The match runs on UPPER(full_name) as a range (>= prefix, < next prefix)
+        so it is served by the users_full_name_upper_idx expression index and
+        stops after ``limit`` rows, instead of scanning or loading the roster.
+        A purely numeric query also matches the member id.
+
+        Args:
+            query: Typed prefix
+            page: 1-based page number
+            limit: Results per page, capped at MEMBER_SEARCH_MAX_LIMIT
+
+        Returns:
+            tuple: (results, has_more) where each result has ``id``, ``name``
+            and ``subscription_status`` ('active' or 'none')
+        """
+        from django.db.models.functions import Upper
+
+        prefix = ' '.join(query.split()).upper()
+        if not prefix:
+            return [], False
+
+        limit = min(limit or MemberService.MEMBER_SEARCH_LIMIT, MemberService.MEMBER_SEARCH_MAX_LIMIT)
+        offset = (max(page, 1) - 1) * limit
+
+        name_match = Q(
+            name_key__gte=prefix,
+            name_key__lt=MemberService._prefix_upper_bound(prefix),
+            name_key__startswith=prefix,
+        )
+        if prefix.isdigit():
+            name_match |= Q(pk=int(prefix))
+
+        rows = list(
+            Member.objects.annotate(name_key=Upper('user__full_name'))
+            .filter(name_match)
+            .order_by('name_key', 'pk')
+            .values('pk', 'user__full_name', 'current_subscription_status')[offset:offset + limit + 1]
+        )
+
+        results = [
+            {
+                'id': row['pk'],
+                'name': row['user__full_name'],
+                'subscription_status': 'active' if row['current_subscription_status'] == 'active' else 'none',
+            }
+            for row in rows[:limit]
+        ]
+        return results, len(rows) > limit
+
+
+
+class MemberSearchService:
+    """
+    Indexed substring search over member name, email and phone.
+
+    Each member carries a normalized ``search_text`` column kept in step by
+    User/Member signals. The backend-specific index over it is created after
+    migrations run, because it cannot be expressed portably as a model index:
+    - SQLite: an FTS5 table with the trigram tokenizer (rowid = member id)
+    - PostgreSQL: a pg_trgm GIN index, which serves the LIKE '%term%' filter
+    Other backends, and terms shorter than a trigram, fall back to LIKE on
+    the column.
+    """
+
+    FTS_TABLE = 'member_search_fts'
+    TRIGRAM_INDEX = 'members_search_text_trgm_idx'
+    MIN_INDEXED_LENGTH = 3
+    REBUILD_BATCH_SIZE = 1000
+
+    @staticmethod
+    def build_search_text(user) -> str:
+        """Normalized text a member is found by: lower-cased name, email and phone."""
+        parts = (user.full_name, user.email, user.phone)
+        return ' '.join(' '.join(part.split()) for part in parts if part).lower()
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        return ' '.join((query or '').split()).lower()
+
+    @staticmethod
+    def ensure_backend(using: str = 'default') -> bool:
+        """
+        Create the backend search index if it does not exist yet.
+
+        Returns:
+            bool: True if an index was created and has been populated
+        """
+        from django.db import connections
+
+        connection = connections[using]
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                if MemberSearchService.FTS_TABLE in connection.introspection.table_names(cursor):
+                    # A flush empties the members table but not the FTS table.
+                    cursor.execute(
+                        f"DELETE FROM {MemberSearchService.FTS_TABLE} "
+                        f"WHERE rowid NOT IN (SELECT id FROM {Member._meta.db_table})"
+                    )
+                    return False
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE {MemberSearchService.FTS_TABLE} "
+                    "USING fts5(search_text, tokenize='trigram')"
+                )
+                cursor.execute(
+                    f"INSERT INTO {MemberSearchService.FTS_TABLE} (rowid, search_text) "
+                    f"SELECT id, search_text FROM {Member._meta.db_table}"
+                )
+                return True
+            if connection.vendor == 'postgresql':
+                cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS {MemberSearchService.TRIGRAM_INDEX} "
+                    f"ON {Member._meta.db_table} USING gin (search_text gin_trgm_ops)"
+                )
+        return False
+
+    @staticmethod
+    def index_member(member_id: int, search_text: str) -> None:
+        """Store a member's search text in the column and, on SQLite, the FTS table."""
+        from django.db import connection
+
+        Member.all_objects.filter(pk=member_id).update(search_text=search_text)
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {MemberSearchService.FTS_TABLE} WHERE rowid = %s", [member_id])
+                cursor.execute(
+                    f"INSERT INTO {MemberSearchService.FTS_TABLE} (rowid, search_text) VALUES (%s, %s)",
+                    [member_id, search_text],
+                )
+
+    @staticmethod
+    def remove_member(member_id: int) -> None:
+        from django.db import connection
+
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {MemberSearchService.FTS_TABLE} WHERE rowid = %s", [member_id])
+
+    @staticmethod
+    def rebuild(only_missing: bool = False, batch_size: Optional[int] = None) -> Iterator[int]:
+        """
+        Recompute search text for members in primary-key batches.
+
+        Needed after bulk writes that bypass signals (queryset.update() on
+        users) and once after the column is added. Yields the number of
+        members indexed per batch.
+
+        Args:
+            only_missing: Only index members whose search text is empty
+            batch_size: Members per batch
+        """
+        batch_size = batch_size or MemberSearchService.REBUILD_BATCH_SIZE
+        queryset = Member.all_objects.select_related('user').order_by('pk')
+        if only_missing:
+            queryset = queryset.filter(search_text='')
+
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                return
+            with transaction.atomic():
+                for member in batch:
+                    MemberSearchService.index_member(
+                        member.pk, MemberSearchService.build_search_text(member.user)
+                    )
+            last_pk = batch[-1].pk
+            yield len(batch)
+
+    @staticmethod
+    def matching_member_ids(query: str):
+        """
+        Subquery of ids of members whose name, email or phone contains ``query``.
+
+        Returns None for a blank query; otherwise a value usable with ``__in``.
+        """
+        from django.db import connection
+        from django.db.models.expressions import RawSQL
+
+        term = MemberSearchService.normalize_query(query)
+        if not term:
+            return None
+        if connection.vendor == 'sqlite' and len(term) >= MemberSearchService.MIN_INDEXED_LENGTH:
+            phrase = '"{}"'.format(term.replace('"', '""'))
+            return RawSQL(
+                f"SELECT rowid FROM {MemberSearchService.FTS_TABLE} WHERE search_text MATCH %s",
+                [phrase],
+            )
+        return Member.all_objects.filter(search_text__contains=term).values('pk')
+
+    @staticmethod
+    def filter_queryset(queryset, query: str, member_field: str = 'pk'):
+        """Restrict ``queryset`` to rows whose ``member_field`` is a matching member."""
+        member_ids = MemberSearchService.matching_member_ids(query)
+        if member_ids is None:
+            return queryset
+        return queryset.filter(**{f'{member_field}__in': member_ids})
+
+
+class MemberChoiceService:
+    """
+    Cached member choices for the subscription forms, labelled and ordered by status.
+
+    A member's status is the first of pending, active, expired, cancelled they
+    hold a subscription in, else 'No Subscription'. The whole roster is built
+    with one query (members joined once to subscriptions, counted per status)
+    and cached until a member, user or subscription changes, so rendering a
+    form costs no per-member queries.
+    """
+
+    CACHE_KEY = 'member_choices:subscription_status'
+    CACHE_TIMEOUT = getattr(settings, 'GYM_MEMBER_CHOICES_CACHE_SECONDS', 3600)
+    STATUS_PRECEDENCE = ('pending', 'active', 'expired', 'cancelled')
+    STATUS_LABELS = {
+        'pending': 'Pending',
+        'active': 'Active',
+        'expired': 'Expired',
+        'cancelled': 'Cancelled',
+    }
+    NO_SUBSCRIPTION_LABEL = 'No Subscription'
+
+    @staticmethod
+    def _build(queryset) -> Dict[int, Tuple[int, str, str]]:
+        """Map member id -> (status rank, full name, status label) in one grouped query."""
+        precedence = MemberChoiceService.STATUS_PRECEDENCE
+        rows = queryset.annotate(**{
+            f'{status}_count': Count('subscriptions', filter=Q(subscriptions__status=status))
+            for status in precedence
+        }).values_list('pk', 'user__full_name', *(f'{status}_count' for status in precedence))
+
+        entries = {}
+        for member_id, full_name, *counts in rows:
+            rank = next((index for index, count in enumerate(counts) if count), len(precedence))
+            label = (
+                MemberChoiceService.STATUS_LABELS[precedence[rank]] if rank < len(precedence)
+                else MemberChoiceService.NO_SUBSCRIPTION_LABEL
+            )
+            entries[member_id] = (rank, full_name, label)
+        return entries
+
+    @staticmethod
+    def get_entries() -> Dict[int, Tuple[int, str, str]]:
+        """Status entries for every active member, from cache when possible."""
+        entries = cache.get(MemberChoiceService.CACHE_KEY)
+        if entries is None:
+            entries = MemberChoiceService._build(Member.objects.all())
+            cache.set(MemberChoiceService.CACHE_KEY, entries, MemberChoiceService.CACHE_TIMEOUT)
+        return entries
+
+    @staticmethod
+    def get_entry(member_id: int) -> Optional[Tuple[int, str, str]]:
+        """Entry for one member; inactive members are not cached and cost one query."""
+        entry = MemberChoiceService.get_entries().get(member_id)
+        if entry is None:
+            entry = MemberChoiceService._build(Member.all_objects.filter(pk=member_id)).get(member_id)
+        return entry
+
+    @staticmethod
+    def get_choices(extra_member_id=None) -> List[Tuple[int, str]]:
+        """
+        (member id, "Name (Status)") pairs ordered by status then name.
+
+        Args:
+            extra_member_id: Also include this member even if inactive (the
+                member of the subscription being edited)
+        """
+        entries = MemberChoiceService.get_entries()
+        if extra_member_id and extra_member_id not in entries:
+            entry = MemberChoiceService.get_entry(extra_member_id)
+            if entry is not None:
+                entries = {**entries, extra_member_id: entry}
+        ordered = sorted(entries.items(), key=lambda item: (item[1][0], item[1][1]))
+        return [(member_id, f"{full_name} ({label})") for member_id, (_, full_name, label) in ordered]
+
+    @staticmethod
+    def invalidate() -> None:
+        """
+        Drop the cached choices now and again once the transaction commits.
+
+        The immediate delete makes the change visible to this transaction; the
+        deferred one drops anything a concurrent request cached from the
+        pre-commit state.
+        """
+        cache.delete(MemberChoiceService.CACHE_KEY)
+        transaction.on_commit(lambda: cache.delete(MemberChoiceService.CACHE_KEY))
 
 class AnalyticsService:
     """Service for generating analytics and reports."""
@@ -1542,47 +3205,39 @@ class AnalyticsService:
         Returns:
             dict: Revenue statistics
         """
-        from .models import Payment
-        
         today = timezone.localdate()
         if end_date is None:
             end_date = today
         if start_date is None:
             start_date = today - timedelta(days=30)
         
-        # Base queryset
-        payments = Payment.objects.filter(
-            status='completed',
-            completed_at__date__gte=start_date,
-            completed_at__date__lte=end_date
-        )
+        # Base queryset (materialized day/method buckets, not raw payments)
+        buckets = RevenueLedgerService.get_buckets(start_date, end_date)
         
         # Total revenue
-        total_revenue = payments.aggregate(
-            total=Sum('amount'),
-            count=Count('id')
+        total_revenue = buckets.aggregate(
+            total=Sum('total'),
+            count=Sum('count')
         )
         
         # Revenue by payment method
-        revenue_by_method = payments.values('payment_method').annotate(
-            total=Sum('amount'),
-            count=Count('id')
+        revenue_by_method = buckets.values('payment_method').annotate(
+            total=Sum('total'),
+            count=Sum('count')
         ).order_by('-total')
         
         # Daily revenue trend
-        daily_revenue = payments.annotate(
-            date=TruncDate('completed_at')
-        ).values('date').annotate(
-            total=Sum('amount'),
-            count=Count('id')
+        daily_revenue = buckets.values('date').annotate(
+            total=Sum('total'),
+            count=Sum('count')
         ).order_by('date')
         
         # Monthly revenue (for charts)
-        monthly_revenue = payments.annotate(
-            month=TruncMonth('completed_at')
+        monthly_revenue = buckets.annotate(
+            month=TruncMonth('date')
         ).values('month').annotate(
-            total=Sum('amount'),
-            count=Count('id')
+            total=Sum('total'),
+            count=Sum('count')
         ).order_by('month')
         
         return {
@@ -1663,7 +3318,7 @@ class AnalyticsService:
         members_without_sub = Member.objects.filter(
             is_active=True
         ).exclude(
-            subscriptions__status='active'
+            current_subscription_status='active'
         ).count()
         
         return {
@@ -1698,14 +3353,15 @@ class AnalyticsService:
         if start_date is None:
             start_date = today - timedelta(days=30)
         
-        # Base queryset
+        # Raw rows are only needed for member-level breakdowns
         attendance = Attendance.objects.filter(
             date__gte=start_date,
             date__lte=end_date
         )
         
-        # Total visits
-        total_visits = attendance.count()
+        # Counts, peak hours, daily trend and durations come from rollup buckets
+        rollup = AttendanceRollupService.summarize(start_date, end_date)
+        total_visits = rollup['total_visits']
         
         # Unique visitors
         unique_visitors = attendance.values('member').distinct().count()
@@ -1714,29 +3370,9 @@ class AnalyticsService:
         days_count = (end_date - start_date).days + 1
         avg_visits_per_day = total_visits / days_count if days_count else 0
         
-        # Peak hours
-        peak_hours = attendance.annotate(
-            hour=ExtractHour('check_in')
-        ).values('hour').annotate(
-            count=Count('id')
-        ).order_by('-count')[:5]
-        
-        # Daily trend
-        daily_attendance = attendance.values('date').annotate(
-            count=Count('id'),
-            unique_members=Count('member', distinct=True)
-        ).order_by('date')
-        
-        # Average duration (for completed visits)
-        completed_visits = attendance.filter(check_out__isnull=False)
-        avg_duration = completed_visits.annotate(
-            duration=F('check_out') - F('check_in')
-        ).aggregate(avg=Avg('duration'))
-        
-        avg_duration_hours = (
-            avg_duration['avg'].total_seconds() / 3600
-            if avg_duration['avg'] else 0
-        )
+        peak_hours = rollup['peak_hours']
+        daily_attendance = rollup['daily_attendance']
+        avg_duration_hours = rollup['avg_duration_hours']
         
         # Top members by attendance
         top_members = attendance.values(
@@ -1753,8 +3389,8 @@ class AnalyticsService:
         
         inactive_count = Member.objects.filter(
             is_active=True,
-            subscriptions__status='active'
-        ).exclude(id__in=active_member_ids).distinct().count()
+            current_subscription_status='active'
+        ).exclude(id__in=active_member_ids).count()
         
         return {
             'start_date': start_date,
@@ -1792,14 +3428,159 @@ class AnalyticsService:
         # Members with active subscriptions but no recent visits
         return Member.objects.filter(
             is_active=True,
-            subscriptions__status='active'
+            current_subscription_status='active'
         ).exclude(
             id__in=active_member_ids
-        ).select_related('user').distinct()
+        ).select_related('user')
+
+
+class DashboardSnapshotService:
+    """
+    Cached admin dashboard metrics.
+    
+    The snapshot is split into sections so a write only invalidates the
+    metrics it affects: a check-in drops the attendance section but leaves the
+    revenue and subscription figures cached. All sections are read with one
+    cache round trip; missing sections are recomputed and written back.
+    """
+    
+    SECTIONS = ('people', 'subscriptions', 'payments', 'attendance')
+    CACHE_TIMEOUT = getattr(settings, 'DASHBOARD_CACHE_TIMEOUT_SECONDS', 300)
+    
+    @staticmethod
+    def get_cache_key(section: str, day=None) -> str:
+        """Cache key for a dashboard section; day-scoped so figures roll over at midnight."""
+        day = day or timezone.localdate()
+        return f"dashboard:{section}:{day.isoformat()}"
+    
+    @staticmethod
+    def compute_section(section: str, today) -> Dict[str, Any]:
+        """Run the queries for a single dashboard section."""
+        from accounts.models import Staff, Trainer
+        from .models import Attendance, Payment, Subscription
+        
+        if section == 'people':
+            # Total registered members, including inactive ones
+            return {
+                'total_members': Member.all_objects.count(),
+                'total_trainers': Trainer.objects.filter(is_active=True).count(),
+                'total_staff': Staff.objects.filter(is_active=True).count(),
+            }
+        
+        if section == 'subscriptions':
+            next_week = today + timedelta(days=7)
+            return {
+                'active_subscriptions': Subscription.objects.filter(status='active').count(),
+                'recent_subscriptions': list(
+                    Subscription.objects.select_related('member__user', 'plan').order_by('-created_at')[:5]
+                ),
+                'expiring_soon': list(
+                    Subscription.objects.filter(
+                        status='active',
+                        end_date__gte=today,
+                        end_date__lte=next_week
+                    ).select_related('member__user', 'plan').order_by('end_date')
+                ),
+            }
+        
+        if section == 'payments':
+            revenue_data = RevenueLedgerService.get_buckets(today.replace(day=1), today).aggregate(
+                total=Sum('total'),
+                count=Sum('count')
+            )
+            return {
+                'revenue_this_month': revenue_data['total'] or 0,
+                'payments_this_month': revenue_data['count'] or 0,
+                'recent_payments': list(
+                    Payment.objects.select_related(
+                        'subscription__member__user', 'subscription__plan'
+                    ).order_by('-initiated_at')[:5]
+                ),
+            }
+        
+        if section == 'attendance':
+            return {
+                'attendance_today': Attendance.objects.filter(date=today).count(),
+                'recent_attendance': list(
+                    Attendance.objects.select_related('member__user').order_by('-check_in')[:10]
+                ),
+            }
+        
+        raise ValueError(f"Unknown dashboard section: {section}")
+    
+    @staticmethod
+    def get_snapshot() -> Dict[str, Any]:
+        """
+        Return all dashboard metrics, recomputing only the sections missing from cache.
+        
+        Returns:
+            dict: Template context values for the admin dashboard
+        """
+        today = timezone.localdate()
+        keys = {
+            section: DashboardSnapshotService.get_cache_key(section, today)
+            for section in DashboardSnapshotService.SECTIONS
+        }
+        cached = cache.get_many(keys.values())
+        
+        snapshot = {}
+        missing = {}
+        for section, key in keys.items():
+            data = cached.get(key)
+            if data is None:
+                data = DashboardSnapshotService.compute_section(section, today)
+                missing[key] = data
+            snapshot.update(data)
+        
+        if missing:
+            cache.set_many(missing, DashboardSnapshotService.CACHE_TIMEOUT)
+        
+        return snapshot
+    
+    @staticmethod
+    def invalidate(*sections: str) -> None:
+        """
+        Drop cached dashboard sections once the current transaction commits.
+        
+        Deferring to commit keeps a concurrent dashboard load from caching data
+        that is about to change.
+        """
+        keys = [DashboardSnapshotService.get_cache_key(section) for section in sections]
+        transaction.on_commit(lambda: cache.delete_many(keys))
 
 
 class ExportService:
-    """Service for exporting reports to various formats."""
+    """Service for exporting reports to various formats.
+
+    CSV exports are generators: rows are read with ``values_list`` in chunks and
+    encoded one line at a time, so they can be fed straight into a
+    ``StreamingHttpResponse`` without buffering the whole file.
+    """
+    
+    EXPORT_CHUNK_SIZE = 2000
+    
+    class _EchoBuffer:
+        """File-like object whose write() returns the value instead of storing it."""
+        
+        def write(self, value):
+            return value
+    
+    @staticmethod
+    def stream_csv(fieldnames: List[str], rows: Iterable[Iterable[Any]]) -> Iterator[str]:
+        """
+        Encode a header and rows as CSV, one line per yielded string.
+        
+        Args:
+            fieldnames: Header row
+            rows: Iterable of row sequences (may be a generator)
+            
+        Yields:
+            str: One CSV-encoded line
+        """
+        writer = csv.writer(ExportService._EchoBuffer())
+        yield writer.writerow(fieldnames)
+        for row in rows:
+            yield writer.writerow(row)
     
     @staticmethod
     def export_to_csv(data: List[Dict], filename: str, fieldnames: List[str] = None) -> io.StringIO:
@@ -1830,7 +3611,11 @@ class ExportService:
         return output
     
     @staticmethod
-    def export_payments_csv(start_date=None, end_date=None) -> io.StringIO:
+    def _format_datetime(value, fmt: str = '%Y-%m-%d %H:%M') -> str:
+        return value.strftime(fmt) if value else ''
+    
+    @staticmethod
+    def export_payments_csv(start_date=None, end_date=None) -> Iterator[str]:
         """
         Export payment records to CSV.
         
@@ -1838,8 +3623,8 @@ class ExportService:
             start_date: Filter start date
             end_date: Filter end date
             
-        Returns:
-            StringIO object with CSV content
+        Yields:
+            str: CSV lines, header first
         """
         from .models import Payment
         
@@ -1849,84 +3634,107 @@ class ExportService:
         if start_date is None:
             start_date = today - timedelta(days=30)
         
+        method_labels = dict(Payment.PAYMENT_METHOD_CHOICES)
+        status_labels = dict(Payment.STATUS_CHOICES)
+        
         payments = Payment.objects.filter(
             initiated_at__date__gte=start_date,
             initiated_at__date__lte=end_date
-        ).select_related(
-            'subscription__member__user', 'subscription__plan'
-        ).order_by('-initiated_at')
-        
-        data = []
-        for payment in payments:
-            data.append({
-                'Transaction ID': payment.transaction_id,
-                'Date': payment.initiated_at.strftime('%Y-%m-%d %H:%M'),
-                'Member': payment.subscription.member.user.full_name,
-                'Email': payment.subscription.member.user.email,
-                'Plan': payment.subscription.plan.name,
-                'Amount': str(payment.amount),
-                'Method': payment.get_payment_method_display(),
-                'Status': payment.get_status_display(),
-                'Completed At': payment.completed_at.strftime('%Y-%m-%d %H:%M') if payment.completed_at else '',
-            })
+        ).order_by('-initiated_at').values_list(
+            'transaction_id',
+            'initiated_at',
+            'subscription__member__user__full_name',
+            'subscription__member__user__email',
+            'subscription__plan__name',
+            'amount',
+            'payment_method',
+            'status',
+            'completed_at',
+        )
+        
+        def rows():
+            for (transaction_id, initiated_at, full_name, email, plan_name,
+                 amount, method, status, completed_at) in payments.iterator(chunk_size=ExportService.EXPORT_CHUNK_SIZE):
+                yield (
+                    transaction_id,
+                    ExportService._format_datetime(initiated_at),
+                    full_name,
+                    email,
+                    plan_name,
+                    str(amount),
+                    method_labels.get(method, method),
+                    status_labels.get(status, status),
+                    ExportService._format_datetime(completed_at),
+                )
         
-        return ExportService.export_to_csv(data, 'payments.csv')
+        return ExportService.stream_csv(
+            ['Transaction ID', 'Date', 'Member', 'Email', 'Plan', 'Amount', 'Method', 'Status', 'Completed At'],
+            rows(),
+        )
     
     @staticmethod
-    def export_members_csv(include_subscription: bool = True) -> io.StringIO:
+    def export_members_csv(include_subscription: bool = True) -> Iterator[str]:
         """
         Export member records to CSV.
         
         Args:
             include_subscription: Include current subscription info
             
-        Returns:
-            StringIO object with CSV content
+        Yields:
+            str: CSV lines, header first
         """
-        from .models import Subscription
+        from django.db.models import FilteredRelation
+        
+        fieldnames = [
+            'ID', 'Full Name', 'Email', 'Phone', 'Date of Birth', 'Address',
+            'Emergency Contact', 'Joined Date', 'Active', 'Deactivated At',
+        ]
+        columns = [
+            'id', 'user__full_name', 'user__email', 'user__phone', 'date_of_birth', 'address',
+            'emergency_contact', 'joined_date', 'is_active', 'deactivated_at',
+        ]
         
         # Export all members (including inactive) for administrative purposes
-        members = Member.all_objects.select_related('user')
+        members = Member.all_objects.order_by('pk')
         
         if include_subscription:
-            from django.db.models import Prefetch
-            members = members.prefetch_related(
-                Prefetch(
-                    'subscriptions',
-                    queryset=Subscription.objects.filter(status='active').select_related('plan'),
-                    to_attr='active_subs'
-                )
+            # At most one active subscription per member (DB constraint), so a
+            # filtered LEFT JOIN keeps one row per member.
+            members = members.annotate(
+                active_sub=FilteredRelation('subscriptions', condition=Q(subscriptions__status='active'))
             )
-        
-        data = []
-        for member in members:
-            row = {
-                'ID': member.id,
-                'Full Name': member.user.full_name,
-                'Email': member.user.email,
-                'Phone': member.user.phone or '',
-                'Date of Birth': str(member.date_of_birth) if member.date_of_birth else '',
-                'Address': member.address,
-                'Emergency Contact': member.emergency_contact,
-                'Joined Date': str(member.joined_date),
-                'Active': 'Yes' if member.is_active else 'No',
-                'Deactivated At': str(member.deactivated_at) if member.deactivated_at else '',
-            }
-            
-            if include_subscription:
-                active_sub = member.active_subs[0] if member.active_subs else None
-                row.update({
-                    'Subscription Plan': active_sub.plan.name if active_sub else 'None',
-                    'Subscription Status': active_sub.status if active_sub else 'N/A',
-                    'Subscription Expiry': str(active_sub.end_date) if active_sub else '',
-                })
-            
-            data.append(row)
-        
-        return ExportService.export_to_csv(data, 'members.csv')
+            fieldnames += ['Subscription Plan', 'Subscription Status', 'Subscription Expiry']
+            columns += ['active_sub__plan__name', 'active_sub__status', 'active_sub__end_date']
+        
+        def rows():
+            for values in members.values_list(*columns).iterator(chunk_size=ExportService.EXPORT_CHUNK_SIZE):
+                (member_id, full_name, email, phone, date_of_birth, address,
+                 emergency_contact, joined_date, is_active, deactivated_at) = values[:10]
+                row = [
+                    member_id,
+                    full_name,
+                    email,
+                    phone or '',
+                    str(date_of_birth) if date_of_birth else '',
+                    address,
+                    emergency_contact,
+                    str(joined_date),
+                    'Yes' if is_active else 'No',
+                    str(deactivated_at) if deactivated_at else '',
+                ]
+                if include_subscription:
+                    plan_name, sub_status, sub_end_date = values[10:]
+                    row += [
+                        plan_name or 'None',
+                        sub_status or 'N/A',
+                        str(sub_end_date) if sub_end_date else '',
+                    ]
+                yield row
+        
+        return ExportService.stream_csv(fieldnames, rows())
     
     @staticmethod
-    def export_attendance_csv(start_date=None, end_date=None) -> io.StringIO:
+    def export_attendance_csv(start_date=None, end_date=None) -> Iterator[str]:
         """
         Export attendance records to CSV.
         
@@ -1934,8 +3742,8 @@ class ExportService:
             start_date: Filter start date
             end_date: Filter end date
             
-        Returns:
-            StringIO object with CSV content
+        Yields:
+            str: CSV lines, header first
         """
         from .models import Attendance
         
@@ -1948,23 +3756,38 @@ class ExportService:
         attendance = Attendance.objects.filter(
             date__gte=start_date,
             date__lte=end_date
-        ).select_related('member__user').order_by('-check_in')
-        
-        data = []
-        for record in attendance:
-            data.append({
-                'Date': str(record.date),
-                'Member': record.member.user.full_name,
-                'Email': record.member.user.email,
-                'Check In': record.check_in.strftime('%H:%M:%S'),
-                'Check Out': record.check_out.strftime('%H:%M:%S') if record.check_out else '',
-                'Duration (hours)': record.duration() or '',
-            })
+        ).order_by('-check_in').values_list(
+            'date',
+            'member__user__full_name',
+            'member__user__email',
+            'check_in',
+            'check_out',
+        )
+        
+        def rows():
+            for visit_date, full_name, email, check_in, check_out in attendance.iterator(
+                chunk_size=ExportService.EXPORT_CHUNK_SIZE
+            ):
+                duration = (
+                    round((check_out - check_in).total_seconds() / 3600, 2)
+                    if check_out else None
+                )
+                yield (
+                    str(visit_date),
+                    full_name,
+                    email,
+                    ExportService._format_datetime(check_in, '%H:%M:%S'),
+                    ExportService._format_datetime(check_out, '%H:%M:%S'),
+                    duration or '',
+                )
         
-        return ExportService.export_to_csv(data, 'attendance.csv')
+        return ExportService.stream_csv(
+            ['Date', 'Member', 'Email', 'Check In', 'Check Out', 'Duration (hours)'],
+            rows(),
+        )
     
     @staticmethod
-    def export_revenue_report_csv(start_date=None, end_date=None) -> io.StringIO:
+    def export_revenue_report_csv(start_date=None, end_date=None) -> Iterator[str]:
         """
         Export revenue report to CSV.
         
@@ -1972,18 +3795,16 @@ class ExportService:
             start_date: Report start date
             end_date: Report end date
             
-        Returns:
-            StringIO object with CSV content
+        Yields:
+            str: CSV lines, header first
         """
         report = AnalyticsService.get_revenue_report(start_date, end_date)
         
         # Export daily revenue as CSV
-        data = []
-        for day in report['daily_revenue']:
-            data.append({
-                'Date': str(day['date']),
-                'Revenue': str(day['total']),
-                'Transactions': day['count'],
-            })
-        
-        return ExportService.export_to_csv(data, 'revenue_report.csv')
+        return ExportService.stream_csv(
+            ['Date', 'Revenue', 'Transactions'],
+            (
+                (str(day['date']), str(day['total']), day['count'])
+                for day in report['daily_revenue']
+            ),
+        )
@@ -0,0 +1,97 @@
+"""
+Signal handlers for gym management models.
+
+Keeps the cached admin dashboard snapshot in step with writes: each model only
+invalidates the dashboard section whose figures it feeds. Branch edits reload
+the in-process geofence engine, user/member edits refresh the member
+search index, and subscription saves re-point the member's current
+subscription.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import Member, Staff, Trainer, User
+from .models import Attendance, GymLocation, Payment, Subscription
+from .services import (
+    DashboardSnapshotService, GeofenceService, MemberChoiceService, MemberSearchService, SubscriptionService,
+)
+
+SEARCHABLE_USER_FIELDS = frozenset({'full_name', 'email', 'phone'})
+
+
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+@receiver(post_save, sender=Trainer)
+@receiver(post_delete, sender=Trainer)
+@receiver(post_save, sender=Staff)
+@receiver(post_delete, sender=Staff)
+def invalidate_dashboard_people(sender, **kwargs):
+    """Member, trainer and staff changes affect the headcount figures."""
+    DashboardSnapshotService.invalidate('people')
+    if sender is Member:
+        MemberChoiceService.invalidate()
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_dashboard_subscriptions(sender, **kwargs):
+    """Subscription changes affect the active count, recent list and expiring list."""
+    DashboardSnapshotService.invalidate('subscriptions')
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def sync_member_current_subscription(sender, instance, **kwargs):
+    """Re-point the member's denormalized current subscription in the saving transaction."""
+    SubscriptionService.sync_current_subscriptions([instance.member_id])
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def invalidate_dashboard_payments(sender, **kwargs):
+    """Payment changes affect monthly revenue and the recent payments list."""
+    DashboardSnapshotService.invalidate('payments')
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def invalidate_dashboard_attendance(sender, **kwargs):
+    """Check-ins and check-outs affect today's count and the recent attendance list."""
+    DashboardSnapshotService.invalidate('attendance')
+
+
+@receiver(post_save, sender=GymLocation)
+@receiver(post_delete, sender=GymLocation)
+def reload_geofences(sender, **kwargs):
+    """Branch changes take effect on the next check-in in this process."""
+    GeofenceService.invalidate()
+
+
+@receiver(post_save, sender=User)
+def reindex_member_search_for_user(sender, instance, update_fields=None, **kwargs):
+    """Name, email and phone edits change what the user's member profile is found by."""
+    if update_fields is not None and not SEARCHABLE_USER_FIELDS.intersection(update_fields):
+        return  # e.g. last_login on every sign-in
+    member_id = Member.all_objects.filter(user_id=instance.pk).values_list('pk', flat=True).first()
+    if member_id is not None:
+        MemberSearchService.index_member(member_id, MemberSearchService.build_search_text(instance))
+        MemberChoiceService.invalidate()  # Labels carry the member's name
+
+
+@receiver(post_save, sender=Member)
+def index_new_member_for_search(sender, instance, created, **kwargs):
+    """New members become searchable; later member edits do not touch the indexed fields."""
+    if created:
+        MemberSearchService.index_member(instance.pk, MemberSearchService.build_search_text(instance.user))
+
+
+@receiver(post_delete, sender=Member)
+def remove_member_from_search(sender, instance, **kwargs):
+    MemberSearchService.remove_member(instance.pk)
+
+
+def ensure_member_search_index(using='default', **kwargs):
+    """post_migrate: create the backend search index and fill in unindexed members."""
+    MemberSearchService.ensure_backend(using)
+    for _ in MemberSearchService.rebuild(only_missing=True):
+        pass
@@ -1,15 +1,31 @@
+import asyncio
+import csv
+import io
+import json
+import math
+import os
+import smtplib
+import tempfile
 from datetime import timedelta
 from decimal import Decimal
 from urllib.parse import parse_qs, urlparse
 from unittest.mock import patch
 
+from asgiref.sync import sync_to_async
 from django import forms
+from django.contrib import admin
 from django.contrib.auth import get_user_model
 from django.contrib.messages import get_messages
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail import get_connection
 from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db import IntegrityError
-from django.db.models import ProtectedError
-from django.test import TestCase, override_settings
+from django.db.models import ProtectedError, Sum
+from django.http import Http404
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 
@@ -18,9 +34,19 @@ from .forms import (
 	PaymentAdminForm, PaymentCreateForm,
 	SubscriptionAdminForm, SubscriptionBaseForm, SubscriptionCreateForm, SubscriptionForm, SubscriptionUpdateForm,
 )
-from .models import Attendance, CheckInSession, MembershipPlan, Payment, Subscription
-from .services import AttendanceService, PaymentService, SubscriptionService
-from .views import SubscriptionCreateView, SubscriptionUpdateView
+from .models import (
+	Attendance, AttendanceRollup, CheckInSession, GymLocation, MembershipPlan, Notification, OutboundEmail, Payment, RevenueBucket,
+	Subscription,
+)
+from .services import (
+	AnalyticsService, AttendanceRollupService, AttendanceService, DashboardSnapshotService, EmailQueueService,
+	ExportService, GeofenceService, MemberChoiceService, MemberSearchService, MemberService, NotificationService, OccupancyService, PaymentService, RevenueLedgerService, SubscriptionService,
+)
+from .utils import location
+from .utils.location import GeofenceEngine, batch_geofence_check, calculate_distance_meters
+from .utils.pagination import capped_count, encode_cursor, keyset_paginate
+from .utils.qr_tokens import SignedQRToken
+from .views import SubscriptionCreateView, SubscriptionListView, SubscriptionUpdateView
 
 User = get_user_model()
 
@@ -518,10 +544,10 @@ class SubscriptionCreationFormOrderingTests(TestCase):
 
 	def test_subscription_create_form_orders_and_labels_members_by_subscription_status(self):
 		form = SubscriptionCreateForm()
-		members = list(form.fields['member'].queryset)
+		member_ids = [value for value, _ in form.fields['member'].choices if value]
 
 		self.assertEqual(
-			[member.pk for member in members[:4]],
+			member_ids[:4],
 			[
 				self.pending_member.pk,
 				self.active_member.pk,
@@ -538,6 +564,42 @@ class SubscriptionCreationFormOrderingTests(TestCase):
 			'Active Member (Active)',
 		)
 
+	def test_rendering_member_choices_costs_constant_queries(self):
+		cache.delete(MemberChoiceService.CACHE_KEY)
+		SubscriptionCreateForm().as_p()  # Warm the cached choices
+		for index in range(5):
+			self._create_member(f'Extra Member {index}', f'extra_member_{index}')
+
+		with self.assertNumQueries(2):  # Rebuilt choices after the roster changed, plus the plan options
+			html = SubscriptionCreateForm().as_p()
+		self.assertIn('Extra Member 4 (No Subscription)', html)
+		with self.assertNumQueries(1):  # Plan options only
+			SubscriptionCreateForm().as_p()
+
+	def test_choices_follow_subscription_changes(self):
+		SubscriptionCreateForm().as_p()
+		Subscription.objects.create(
+			member=self.cancelled_member,
+			plan=self.plan,
+			start_date=timezone.localdate(),
+			end_date=timezone.localdate() + timedelta(days=30),
+			status='pending',
+		)
+		choices = dict(SubscriptionCreateForm().fields['member'].choices)
+
+		self.assertEqual(choices[self.cancelled_member.pk], 'Cancelled Member (Pending)')
+
+	def test_admin_form_includes_inactive_member_of_edited_subscription(self):
+		subscription = Subscription.objects.get(member=self.expired_member)
+		Member.all_objects.filter(pk=self.expired_member.pk).update(is_active=False)
+		MemberChoiceService.invalidate()
+
+		form = SubscriptionAdminForm(instance=subscription)
+		choices = dict(form.fields['member'].choices)
+
+		self.assertEqual(choices[self.expired_member.pk], 'Expired Member (Expired)')
+		self.assertNotIn(self.expired_member.pk, dict(SubscriptionCreateForm().fields['member'].choices))
+
 
 class SubscriptionDateConsistencyTests(TestCase):
 	"""Validates start_date widget and shared form usage for subscription create/update."""
@@ -915,6 +977,19 @@ class QRSelfServiceHardeningTests(TestCase):
 		self.assertEqual(Attendance.objects.filter(member=self.member).count(), 1)
 		self.assertTrue(CheckInSession.objects.get(pk=token).used)
 
+		attendance = Attendance.objects.get(member=self.member)
+		self.assertEqual(attendance.channel, Attendance.CHANNEL_QR)
+		self.assertEqual(attendance.check_in_latitude, Decimal('27.700000'))
+		self.assertEqual(attendance.check_in_longitude, Decimal('85.333300'))
+		self.assertAlmostEqual(attendance.check_in_distance_meters, response.context['distance_meters'], places=2)
+
+	def test_staff_check_in_records_staff_channel_without_coordinates(self):
+		attendance = AttendanceService.check_in_member(self.member)
+
+		self.assertEqual(attendance.channel, Attendance.CHANNEL_STAFF)
+		self.assertIsNone(attendance.check_in_latitude)
+		self.assertIsNone(attendance.check_in_distance_meters)
+
 	def test_check_in_outside_gym_radius_is_rejected(self):
 		token = self._generate_token('gym_management:self_checkin')
 		response = self.client.post(
@@ -1008,4 +1083,1605 @@ class QRSelfServiceHardeningTests(TestCase):
 		self.assertEqual(response.status_code, 200)
 		self.assertTrue(response.context['checkout_success'])
 		self.assertIsNotNone(attendance.check_out)
-		self.assertTrue(CheckInSession.objects.get(pk=token).used)
\ No newline at end of file
+		self.assertTrue(CheckInSession.objects.get(pk=token).used)
+
+	def test_geofence_rejects_before_touching_the_database(self):
+		GeofenceService.get_engine()
+		with self.assertNumQueries(0):
+			with self.assertRaisesMessage(ValueError, 'You must be physically near the gym to check in.'):
+				AttendanceService.process_self_check_in(
+					self.user,
+					'00000000-0000-0000-0000-000000000000',
+					self.far_payload['latitude'],
+					self.far_payload['longitude'],
+				)
+
+	def test_lapsed_subscription_is_expired_and_check_in_rejected(self):
+		subscription = Subscription.objects.get(member=self.member)
+		Subscription.objects.filter(pk=subscription.pk).update(end_date=timezone.localdate() - timedelta(days=1))
+		token = self._generate_token('gym_management:self_checkin')
+
+		response = self.client.post(
+			reverse('gym_management:self_checkin_confirm'),
+			{'token': token, **self.nearby_payload},
+		)
+
+		subscription.refresh_from_db()
+		self.assertIn('subscription expired on', response.context['error_message'])
+		self.assertEqual(subscription.status, 'expired')
+		self.assertFalse(Attendance.objects.filter(member=self.member).exists())
+		self.assertFalse(CheckInSession.objects.get(pk=token).used)
+
+
+@override_settings(
+	GYM_LATITUDE=27.7000,
+	GYM_LONGITUDE=85.3333,
+	GYM_RADIUS_METERS=100.0,
+	GYM_QR_SESSION_TTL_SECONDS=60,
+	GYM_QR_TOKEN_MODE='signed',
+)
+class SignedQRTokenTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.user = User.objects.create_user(
+			email='signed-qr-member@example.com',
+			username='signed_qr_member',
+			password='testpass123',
+			full_name='Signed QR Member',
+			is_verified=True,
+		)
+		self.member = Member.objects.create(user=self.user)
+		plan = MembershipPlan.objects.create(
+			name='Signed QR Plan',
+			description='Plan for signed QR token tests',
+			price=Decimal('1800.00'),
+			duration_days=30,
+		)
+		Subscription.objects.create(
+			member=self.member,
+			plan=plan,
+			start_date=timezone.localdate(),
+			end_date=timezone.localdate() + timedelta(days=30),
+			status='active',
+		)
+		self.client.force_login(self.user)
+		self.nearby_payload = {'latitude': '27.7000', 'longitude': '85.3333'}
+		self.far_payload = {'latitude': '27.7100', 'longitude': '85.3433'}
+
+	def tearDown(self):
+		cache.clear()
+
+	def _generate_token(self, route_name):
+		response = self.client.get(reverse(route_name))
+		self.assertEqual(response.status_code, 302)
+		return parse_qs(urlparse(response['Location']).query)['token'][0]
+
+	def test_signed_check_in_needs_no_session_row_and_blocks_replay(self):
+		token = self._generate_token('gym_management:self_checkin')
+		self.assertFalse(CheckInSession.objects.exists())
+
+		first_response = self.client.post(
+			reverse('gym_management:self_checkin_confirm'),
+			{'token': token, **self.nearby_payload},
+		)
+		self.assertTrue(first_response.context['check_in_success'])
+
+		Attendance.objects.filter(member=self.member).update(check_out=timezone.now())
+		second_response = self.client.post(
+			reverse('gym_management:self_checkin_confirm'),
+			{'token': token, **self.nearby_payload},
+		)
+		self.assertEqual(second_response.context['error_message'], AttendanceService.INVALID_QR_MESSAGE)
+		self.assertEqual(Attendance.objects.filter(member=self.member).count(), 1)
+		self.assertFalse(CheckInSession.objects.exists())
+
+	def test_rejected_check_in_leaves_token_usable(self):
+		token = self._generate_token('gym_management:self_checkin')
+
+		response = self.client.post(
+			reverse('gym_management:self_checkin_confirm'),
+			{'token': token, **self.far_payload},
+		)
+		self.assertEqual(response.context['error_message'], 'You must be physically near the gym to check in.')
+
+		response = self.client.post(
+			reverse('gym_management:self_checkin_confirm'),
+			{'token': token, **self.nearby_payload},
+		)
+		self.assertTrue(response.context['check_in_success'])
+
+	def test_check_in_that_rolls_back_leaves_token_usable(self):
+		token = self._generate_token('gym_management:self_checkin')
+
+		with patch.object(AttendanceRollupService, 'record_check_in', side_effect=RuntimeError('rollup down')):
+			with self.assertRaises(RuntimeError):
+				AttendanceService.process_self_check_in(self.user, token, '27.7000', '85.3333')
+		self.assertFalse(Attendance.objects.filter(member=self.member).exists())
+		self.assertFalse(SignedQRToken.parse(token).used)
+
+		attendance, _, _ = AttendanceService.process_self_check_in(self.user, token, '27.7000', '85.3333')
+		self.assertEqual(attendance.member, self.member)
+		self.assertTrue(SignedQRToken.parse(token).used)
+
+	def test_signed_tokens_are_rejected_outside_signed_mode(self):
+		checkin = SignedQRToken.issue(self.member.pk, 'checkin', 60).value
+		checkout = SignedQRToken.issue(self.member.pk, 'checkout', 60).value
+
+		with override_settings(GYM_QR_TOKEN_MODE='session'):
+			with self.assertRaisesMessage(ValueError, AttendanceService.INVALID_QR_MESSAGE):
+				AttendanceService.process_self_check_in(self.user, checkin, '27.7000', '85.3333')
+			with self.assertRaisesMessage(ValueError, AttendanceService.INVALID_QR_MESSAGE):
+				AttendanceService.validate_qr_session(checkout, self.user, 'checkout')
+
+		self.assertFalse(Attendance.objects.filter(member=self.member).exists())
+		self.assertFalse(SignedQRToken.parse(checkin).used)
+
+	def test_release_returns_a_consumed_token(self):
+		signed = SignedQRToken.issue(self.member.pk, 'checkin', 60)
+
+		self.assertTrue(signed.mark_used())
+		signed.release()
+		self.assertFalse(signed.used)
+		self.assertTrue(signed.mark_used())
+
+	def test_tampered_wrong_action_and_expired_tokens_are_rejected(self):
+		token = self._generate_token('gym_management:self_checkin')
+		expired = SignedQRToken.issue(self.member.pk, 'checkin', -1).value
+		cases = [
+			(token[:-1] + ('A' if token[-1] != 'A' else 'B'), 'gym_management:self_checkin_confirm', AttendanceService.INVALID_QR_MESSAGE),
+			(token, 'gym_management:self_checkout_confirm', AttendanceService.INVALID_QR_MESSAGE),
+			(expired, 'gym_management:self_checkin_confirm', AttendanceService.EXPIRED_QR_MESSAGE),
+		]
+
+		for value, route_name, message in cases:
+			response = self.client.post(reverse(route_name), {'token': value, **self.nearby_payload})
+			self.assertEqual(response.context['error_message'], message)
+		self.assertFalse(Attendance.objects.filter(member=self.member).exists())
+
+	def test_signed_check_out(self):
+		attendance = Attendance.objects.create(member=self.member)
+		token = self._generate_token('gym_management:self_checkout')
+
+		response = self.client.post(
+			reverse('gym_management:self_checkout_confirm'),
+			{'token': token, **self.nearby_payload},
+		)
+
+		attendance.refresh_from_db()
+		self.assertTrue(response.context['checkout_success'])
+		self.assertIsNotNone(attendance.check_out)
+
+
+class AttendanceRollupTests(TestCase):
+	def setUp(self):
+		member_user = User.objects.create_user(
+			email='member-rollup@test.com',
+			username='member_rollup',
+			password='testpass123',
+			full_name='Member Rollup',
+			is_verified=True,
+		)
+		self.member = Member.objects.create(user=member_user)
+		self.plan = MembershipPlan.objects.create(
+			name='Rollup Plan',
+			description='Plan for rollup tests',
+			price=Decimal('900.00'),
+			duration_days=30,
+		)
+		Subscription.objects.create(
+			member=self.member,
+			plan=self.plan,
+			start_date=timezone.localdate(),
+			end_date=timezone.localdate() + timedelta(days=30),
+			status='active',
+		)
+
+	def test_check_in_and_check_out_update_rollup_bucket(self):
+		attendance = AttendanceService.check_in_member(self.member)
+		bucket = AttendanceRollup.objects.get()
+		self.assertEqual((bucket.visits, bucket.unique_members, bucket.completed_visits), (1, 1, 0))
+
+		AttendanceService.check_out_member(attendance)
+		AttendanceService.check_in_member(self.member)
+
+		bucket = AttendanceRollup.objects.get(date=attendance.date)
+		self.assertEqual(bucket.visits, 2)
+		self.assertEqual(bucket.unique_members, 1)
+		self.assertEqual(bucket.completed_visits, 1)
+
+	def test_failed_rollup_update_rolls_back_check_out(self):
+		attendance = AttendanceService.check_in_member(self.member)
+
+		with patch.object(AttendanceRollupService, 'record_check_out', side_effect=RuntimeError('rollup down')):
+			with self.assertRaises(RuntimeError):
+				Attendance.objects.get(pk=attendance.pk).checkout()
+
+		attendance.refresh_from_db()
+		self.assertIsNone(attendance.check_out)
+		self.assertEqual(AttendanceRollup.objects.get().completed_visits, 0)
+
+	def test_rebuild_matches_incremental_counters(self):
+		attendance = AttendanceService.check_in_member(self.member)
+		AttendanceService.check_out_member(attendance)
+		incremental = list(AttendanceRollup.objects.values_list('date', 'hour', 'visits', 'unique_members', 'completed_visits'))
+
+		AttendanceRollup.objects.all().delete()
+		self.assertEqual(AttendanceRollupService.rebuild(), 1)
+
+		rebuilt = list(AttendanceRollup.objects.values_list('date', 'hour', 'visits', 'unique_members', 'completed_visits'))
+		self.assertEqual(rebuilt, incremental)
+
+	def test_attendance_analytics_reads_from_rollup(self):
+		AttendanceService.check_in_member(self.member)
+		analytics = AnalyticsService.get_attendance_analytics()
+
+		self.assertEqual(analytics['total_visits'], 1)
+		self.assertEqual(analytics['unique_visitors'], 1)
+		self.assertEqual(analytics['daily_attendance'][0]['count'], 1)
+		self.assertEqual(len(analytics['peak_hours']), 1)
+
+
+class RevenueLedgerTests(TestCase):
+	def setUp(self):
+		member_user = User.objects.create_user(
+			email='member-ledger@test.com',
+			username='member_ledger',
+			password='testpass123',
+			full_name='Member Ledger',
+			is_verified=True,
+		)
+		self.member = Member.objects.create(user=member_user)
+		self.plan = MembershipPlan.objects.create(
+			name='Ledger Plan',
+			description='Plan for revenue ledger tests',
+			price=Decimal('1500.00'),
+			duration_days=30,
+		)
+
+	def test_complete_and_refund_payment_update_bucket(self):
+		subscription, payment = SubscriptionService.create_subscription_with_payment(
+			self.member, self.plan, payment_method='cash',
+		)
+		bucket = RevenueBucket.objects.get(payment_method='cash')
+		self.assertEqual((bucket.total, bucket.count), (Decimal('1500.00'), 1))
+
+		report = AnalyticsService.get_revenue_report()
+		self.assertEqual(report['total_revenue'], Decimal('1500.00'))
+		self.assertEqual(report['total_transactions'], 1)
+
+		PaymentService.refund_payment(payment, reason='Test refund')
+		bucket.refresh_from_db()
+		self.assertEqual((bucket.total, bucket.count), (Decimal('0'), 0))
+		self.assertEqual(AnalyticsService.get_revenue_report()['total_transactions'], 0)
+
+	def test_completing_already_completed_payment_is_not_double_counted(self):
+		subscription, payment = SubscriptionService.create_subscription_with_payment(
+			self.member, self.plan, payment_method='cash',
+		)
+		PaymentService.complete_payment(payment)
+		self.assertEqual(RevenueBucket.objects.get().count, 1)
+
+	def _change_status_in_admin(self, payment, status):
+		model_admin = admin.site._registry[Payment]
+		request = RequestFactory().post('/')
+		form = model_admin.get_form(request, payment, change=True)(
+			data={'status': status, 'notes': payment.notes, 'esewa_transaction_code': '', 'esewa_ref_id': ''},
+			instance=payment,
+		)
+		self.assertTrue(form.is_valid(), form.errors)
+		model_admin.save_model(request, form.save(commit=False), form, change=True)
+
+	def test_admin_refund_reverses_bucket_and_cancels_subscription(self):
+		subscription, payment = SubscriptionService.create_subscription_with_payment(
+			self.member, self.plan, payment_method='cash',
+		)
+
+		self._change_status_in_admin(payment, 'refunded')
+
+		bucket = RevenueBucket.objects.get(payment_method='cash')
+		self.assertEqual((bucket.total, bucket.count), (Decimal('0'), 0))
+		payment.refresh_from_db()
+		subscription.refresh_from_db()
+		self.assertEqual(payment.status, 'refunded')
+		self.assertEqual(subscription.status, 'cancelled')
+
+	def test_admin_marking_completed_payment_failed_reverses_bucket(self):
+		subscription, payment = SubscriptionService.create_subscription_with_payment(
+			self.member, self.plan, payment_method='cash',
+		)
+
+		self._change_status_in_admin(payment, 'failed')
+
+		bucket = RevenueBucket.objects.get(payment_method='cash')
+		self.assertEqual((bucket.total, bucket.count), (Decimal('0'), 0))
+		payment.refresh_from_db()
+		self.assertEqual(payment.status, 'failed')
+		self.assertEqual(AnalyticsService.get_revenue_report()['total_revenue'], 0)
+
+	def test_rebuild_reports_and_repairs_drift(self):
+		SubscriptionService.create_subscription_with_payment(self.member, self.plan, payment_method='card')
+		RevenueBucket.objects.update(total=Decimal('1.00'))
+
+		stats = RevenueLedgerService.rebuild()
+
+		self.assertEqual(stats, {'buckets_written': 1, 'buckets_drifted': 1})
+		self.assertEqual(RevenueBucket.objects.get().total, Decimal('1500.00'))
+
+
+class StreamingExportTests(TestCase):
+	def setUp(self):
+		self.staff_user = User.objects.create_user(
+			email='staff-export@test.com',
+			username='staff_export',
+			password='testpass123',
+			full_name='Staff Export',
+			is_verified=True,
+		)
+		Staff.objects.create(user=self.staff_user, department='Front Desk')
+
+		member_user = User.objects.create_user(
+			email='member-export@test.com',
+			username='member_export',
+			password='testpass123',
+			full_name='Member Export',
+			is_verified=True,
+		)
+		self.member = Member.objects.create(user=member_user)
+		self.plan = MembershipPlan.objects.create(
+			name='Export Plan',
+			description='Plan for export tests',
+			price=Decimal('700.00'),
+			duration_days=30,
+		)
+		self.subscription = Subscription.objects.create(
+			member=self.member,
+			plan=self.plan,
+			start_date=timezone.localdate(),
+			end_date=timezone.localdate() + timedelta(days=30),
+			status='active',
+		)
+
+	def test_attendance_export_streams_csv_lines(self):
+		attendance = AttendanceService.check_in_member(self.member)
+		AttendanceService.check_out_member(attendance)
+		self.client.force_login(self.staff_user)
+
+		response = self.client.get(reverse('gym_management:export_attendance'))
+
+		self.assertEqual(response.status_code, 200)
+		self.assertTrue(response.streaming)
+		lines = b''.join(response.streaming_content).decode().splitlines()
+		self.assertEqual(lines[0], 'Date,Member,Email,Check In,Check Out,Duration (hours)')
+		self.assertEqual(len(lines), 2)
+		self.assertIn('member-export@test.com', lines[1])
+
+	def test_members_export_includes_active_subscription_columns(self):
+		lines = ''.join(ExportService.export_members_csv(include_subscription=True)).splitlines()
+
+		self.assertTrue(lines[0].endswith('Subscription Plan,Subscription Status,Subscription Expiry'))
+		self.assertEqual(len(lines), 2)
+		self.assertTrue(lines[1].endswith(f'Export Plan,active,{self.subscription.end_date}'))
+
+	def test_payments_export_uses_display_labels(self):
+		Payment.objects.create(subscription=self.subscription, amount=Decimal('700.00'), payment_method='esewa')
+
+		lines = ''.join(ExportService.export_payments_csv()).splitlines()
+
+		self.assertEqual(len(lines), 2)
+		self.assertIn(',eSewa,Pending,', lines[1])
+
+
+class ExpiryNotificationPipelineTests(TestCase):
+	def setUp(self):
+		self.plan = MembershipPlan.objects.create(
+			name='Expiry Plan',
+			description='Plan for expiry pipeline tests',
+			price=Decimal('600.00'),
+			duration_days=30,
+		)
+		today = timezone.localdate()
+		self.subscriptions = {}
+		for days in [7, 3, 1, -1, 10]:
+			user = User.objects.create_user(
+				email=f'member-expiry{days}@test.com',
+				username=f'member_expiry{days}',
+				password='testpass123',
+				full_name=f'Member Expiry {days}',
+				is_verified=True,
+			)
+			member = Member.objects.create(user=user)
+			self.subscriptions[days] = Subscription.objects.create(
+				member=member,
+				plan=self.plan,
+				start_date=today - timedelta(days=30),
+				end_date=today + timedelta(days=days),
+				status='active',
+			)
+
+	def test_pipeline_creates_one_notification_per_window_and_is_idempotent(self):
+		stats = NotificationService.process_expiry_notifications()
+
+		self.assertEqual(stats['expired'], 1)
+		self.assertEqual(stats['notifications_created'], 4)
+		self.assertEqual(stats['emails_queued'], 4)
+		self.assertEqual(len(mail.outbox), 0)
+		self.assertEqual(OutboundEmail.objects.filter(status='pending').count(), 4)
+		self.assertEqual(
+			set(Notification.objects.values_list('notification_type', flat=True)),
+			{'expiry_7_days', 'expiry_3_days', 'expiry_1_day', 'expired'},
+		)
+		self.subscriptions[-1].refresh_from_db()
+		self.assertEqual(self.subscriptions[-1].status, 'expired')
+		self.assertFalse(Notification.objects.filter(subscription=self.subscriptions[10]).exists())
+
+		second_run = NotificationService.process_expiry_notifications()
+		self.assertEqual(second_run['notifications_created'], 0)
+		self.assertEqual(Notification.objects.count(), 4)
+
+	def test_command_skip_emails_creates_dashboard_notifications(self):
+		call_command('process_expiry_notifications', '--skip-emails', stdout=io.StringIO())
+
+		self.assertEqual(Notification.objects.filter(channel='dashboard').count(), 4)
+		self.assertEqual(len(mail.outbox), 0)
+
+	def _lapsed_subscription(self, days_ago):
+		user = User.objects.create_user(
+			email=f'member-lapsed{days_ago}@test.com',
+			username=f'member_lapsed{days_ago}',
+			password='testpass123',
+			full_name=f'Member Lapsed {days_ago}',
+			is_verified=True,
+		)
+		member = Member.objects.create(user=user)
+		return Subscription.objects.create(
+			member=member,
+			plan=self.plan,
+			start_date=timezone.localdate() - timedelta(days=60),
+			end_date=timezone.localdate() - timedelta(days=days_ago),
+			status='active',
+		)
+
+	def test_expiry_runs_in_batches_with_side_effects(self):
+		lapsed = [self._lapsed_subscription(days_ago) for days_ago in (5, 20)]
+
+		batches = list(SubscriptionService.expire_due_subscriptions(batch_size=1))
+
+		self.assertEqual([batch['expired'] for batch in batches], [1, 1, 1])
+		self.assertEqual(sum(batch['emails_queued'] for batch in batches), 3)
+		for subscription in lapsed + [self.subscriptions[-1]]:
+			subscription.refresh_from_db()
+			self.assertEqual(subscription.status, 'expired')
+			self.assertTrue(Notification.objects.filter(subscription=subscription, notification_type='expired').exists())
+			subscription.member.refresh_from_db()
+			self.assertEqual(subscription.member.current_subscription_status, 'expired')
+		self.assertEqual(Subscription.objects.filter(status='active').count(), 4)
+
+	def test_interrupted_expiry_resumes_without_duplicates(self):
+		lapsed = [self._lapsed_subscription(days_ago) for days_ago in (5, 20)]
+
+		run = SubscriptionService.expire_due_subscriptions(batch_size=1)
+		next(run)
+		run.close()
+		self.assertEqual(Subscription.objects.filter(pk__in=[s.pk for s in lapsed], status='active').count(), 2)
+
+		self.assertEqual(SubscriptionService.check_and_expire_subscriptions(), 2)
+		self.assertEqual(SubscriptionService.check_and_expire_subscriptions(), 0)
+		self.assertEqual(Notification.objects.filter(notification_type='expired').count(), 3)
+
+	def test_command_runs_one_expiry_loop_with_its_batch_size(self):
+		self._lapsed_subscription(5)
+
+		with patch.object(
+			SubscriptionService,
+			'expire_due_subscriptions',
+			wraps=SubscriptionService.expire_due_subscriptions,
+		) as expire_due_subscriptions:
+			call_command('process_expiry_notifications', '--batch-size', '1', stdout=io.StringIO())
+
+		expire_due_subscriptions.assert_called_once_with(batch_size=1)
+		self.assertEqual(Subscription.objects.filter(status='expired').count(), 2)
+		self.assertEqual(Notification.objects.count(), 5)
+
+	def test_manual_trigger_reports_expiry_notifications_and_emails(self):
+		superuser = User.objects.create_superuser(
+			email='expiry-superuser@test.com',
+			full_name='Expiry Superuser',
+			password='testpass123',
+			username='expiry_superuser',
+		)
+		self.client.force_login(superuser)
+
+		with self.assertLogs('security.audit', level='INFO') as audit_logs:
+			response = self.client.post(reverse('gym_management:run_expiry_notifications'))
+
+		self.assertEqual(response.status_code, 302)
+		self.assertEqual(
+			[str(message) for message in get_messages(response.wsgi_request)],
+			['Processed expiry notifications: 1 subscriptions expired, 4 notifications created, 4 emails queued.'],
+		)
+		self.assertIn('expired=1 | notifications=4 | emails_queued=4', audit_logs.output[0])
+
+	def test_command_rejects_invalid_batch_size(self):
+		with self.assertRaises(CommandError):
+			call_command('process_expiry_notifications', '--batch-size', '0', stdout=io.StringIO())
+
+
+class EmailQueueTests(TestCase):
+	def setUp(self):
+		self.notifications = []
+		for index in range(3):
+			user = User.objects.create_user(
+				email=f'member-mail{index}@test.com',
+				username=f'member_mail{index}',
+				password='testpass123',
+				full_name=f'Member Mail {index}',
+				is_verified=True,
+			)
+			member = Member.objects.create(user=user)
+			self.notifications.append(Notification.objects.create(
+				member=member,
+				notification_type='general',
+				channel='email',
+				title=f'Notice {index}',
+				message='Gym closes early today.',
+			))
+
+	def test_queue_skips_notifications_already_queued(self):
+		self.assertEqual(NotificationService.queue_email_notifications(self.notifications), 3)
+		self.assertEqual(NotificationService.queue_email_notifications(self.notifications), 0)
+
+		self.assertEqual(OutboundEmail.objects.count(), 3)
+		self.assertEqual(len(mail.outbox), 0)
+
+	def test_worker_sends_batches_over_one_connection_each(self):
+		NotificationService.queue_email_notifications(self.notifications)
+
+		with patch('gym_management.services.get_connection', wraps=get_connection) as connection_factory:
+			call_command('run_email_worker', '--once', '--batch-size', '2', stdout=io.StringIO())
+
+		self.assertEqual(connection_factory.call_count, 2)
+		self.assertEqual(len(mail.outbox), 3)
+		self.assertTrue(mail.outbox[0].alternatives)
+		self.assertEqual(OutboundEmail.objects.filter(status='sent', sent_at__isnull=False).count(), 3)
+		self.assertEqual(Notification.objects.filter(email_sent=True, email_sent_at__isnull=False).count(), 3)
+
+	@override_settings(
+		EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+		EMAIL_HOST='smtp.test',
+		EMAIL_USE_TLS=False,
+		EMAIL_USE_SSL=False,
+		EMAIL_HOST_USER='',
+	)
+	def test_batch_opens_one_smtp_connection(self):
+		NotificationService.queue_email_notifications(self.notifications)
+
+		with patch('smtplib.SMTP') as smtp_class:
+			stats = EmailQueueService.process_batch('test-worker')
+
+		self.assertEqual(stats['emails_sent'], 3)
+		self.assertEqual(smtp_class.call_count, 1)
+		self.assertEqual(smtp_class.return_value.sendmail.call_count, 3)
+
+	@override_settings(
+		EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+		EMAIL_HOST='smtp.test',
+		EMAIL_USE_TLS=False,
+		EMAIL_USE_SSL=False,
+		EMAIL_HOST_USER='',
+	)
+	def test_worker_reconnects_once_when_smtp_connection_drops(self):
+		NotificationService.queue_email_notifications(self.notifications)
+
+		with patch('smtplib.SMTP') as smtp_class:
+			smtp_class.return_value.sendmail.side_effect = [smtplib.SMTPServerDisconnected('gone'), {}, {}, {}]
+			call_command('run_email_worker', '--once', '--batch-size', '3', stdout=io.StringIO())
+
+		self.assertEqual(smtp_class.call_count, 2)
+		self.assertEqual(OutboundEmail.objects.filter(status='sent').count(), 3)
+
+	def test_admin_retry_leaves_claimed_rows_and_attempts_alone(self):
+		NotificationService.queue_email_notifications(self.notifications)
+		failed, sending, pending = OutboundEmail.objects.order_by('pk')
+		OutboundEmail.objects.filter(pk=failed.pk).update(status='failed', attempts=EmailQueueService.MAX_ATTEMPTS)
+		OutboundEmail.objects.filter(pk=sending.pk).update(status='sending', attempts=1, locked_at=timezone.now())
+
+		model_admin = admin.site._registry[OutboundEmail]
+		with patch.object(model_admin, 'message_user'):
+			model_admin.retry_now(RequestFactory().post('/'), OutboundEmail.objects.all())
+
+		failed.refresh_from_db()
+		sending.refresh_from_db()
+		self.assertEqual((failed.status, failed.attempts), ('pending', EmailQueueService.MAX_ATTEMPTS))
+		self.assertEqual((sending.status, sending.attempts), ('sending', 1))
+		self.assertIsNotNone(sending.locked_at)
+
+	def test_failed_delivery_is_retried_with_backoff_then_marked_failed(self):
+		NotificationService.queue_email_notifications(self.notifications[:1])
+
+		with patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('refused')):
+			stats = EmailQueueService.process_batch('test-worker')
+
+		self.assertEqual(stats['retried'], 1)
+		outbound = OutboundEmail.objects.get()
+		self.assertEqual(outbound.status, 'pending')
+		self.assertEqual(outbound.attempts, 1)
+		self.assertEqual(outbound.last_error, 'refused')
+		self.assertGreater(outbound.next_attempt_at, timezone.now())
+		self.assertEqual(EmailQueueService.claim_batch('test-worker'), [])
+
+		OutboundEmail.objects.update(attempts=EmailQueueService.MAX_ATTEMPTS - 1, next_attempt_at=timezone.now())
+		with patch('django.core.mail.backends.locmem.EmailBackend.send_messages', side_effect=OSError('refused')):
+			stats = EmailQueueService.process_batch('test-worker')
+
+		self.assertEqual(stats['failed'], 1)
+		self.assertEqual(OutboundEmail.objects.get().status, 'failed')
+		self.assertFalse(Notification.objects.get(pk=self.notifications[0].pk).email_sent)
+
+
+class DashboardSnapshotTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.admin_user = User.objects.create_user(
+			email='dashboard-admin@test.com',
+			username='dashboard_admin',
+			password='testpass123',
+			full_name='Dashboard Admin',
+			is_verified=True,
+		)
+		AdminProfile.objects.create(user=self.admin_user, access_level='full')
+		member_user = User.objects.create_user(
+			email='dashboard-member@test.com',
+			username='dashboard_member',
+			password='testpass123',
+			full_name='Dashboard Member',
+			is_verified=True,
+		)
+		self.member = Member.objects.create(user=member_user)
+		self.client.login(username='dashboard_admin', password='testpass123')
+
+	def tearDown(self):
+		cache.clear()
+
+	def test_dashboard_metrics_are_served_from_cache(self):
+		response = self.client.get(reverse('gym_management:admin_dashboard'))
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.context['total_members'], 1)
+		self.assertEqual(response.context['attendance_today'], 0)
+
+		with patch.object(DashboardSnapshotService, 'compute_section') as compute_section:
+			response = self.client.get(reverse('gym_management:admin_dashboard'))
+
+		compute_section.assert_not_called()
+		self.assertEqual(response.context['total_members'], 1)
+
+	def test_attendance_write_only_invalidates_attendance_section(self):
+		DashboardSnapshotService.get_snapshot()
+
+		with self.captureOnCommitCallbacks(execute=True):
+			Attendance.objects.create(member=self.member)
+
+		self.assertIsNone(cache.get(DashboardSnapshotService.get_cache_key('attendance')))
+		self.assertIsNotNone(cache.get(DashboardSnapshotService.get_cache_key('people')))
+		self.assertEqual(DashboardSnapshotService.get_snapshot()['attendance_today'], 1)
+
+	def test_admin_cancel_action_invalidates_subscriptions_section(self):
+		plan = MembershipPlan.objects.create(
+			name='Dashboard Plan',
+			description='Plan for dashboard invalidation tests',
+			price=Decimal('900.00'),
+			duration_days=30,
+		)
+		subscription = Subscription.objects.create(
+			member=self.member,
+			plan=plan,
+			start_date=timezone.localdate(),
+			end_date=timezone.localdate() + timedelta(days=30),
+			status='active',
+		)
+		cache.clear()
+		self.assertEqual(DashboardSnapshotService.get_snapshot()['active_subscriptions'], 1)
+
+		model_admin = admin.site._registry[Subscription]
+		with self.captureOnCommitCallbacks(execute=True), patch.object(model_admin, 'message_user'):
+			model_admin.cancel_subscriptions(
+				RequestFactory().post('/'),
+				Subscription.objects.filter(pk=subscription.pk),
+			)
+
+		self.assertEqual(DashboardSnapshotService.get_snapshot()['active_subscriptions'], 0)
+
+
+class OccupancyTrackerTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.staff_user = User.objects.create_user(
+			email='staff-occupancy@test.com',
+			username='staff_occupancy',
+			password='testpass123',
+			full_name='Staff Occupancy',
+			is_verified=True,
+		)
+		Staff.objects.create(user=self.staff_user, department='Front Desk')
+		member_user = User.objects.create_user(
+			email='member-occupancy@test.com',
+			username='member_occupancy',
+			password='testpass123',
+			full_name='Member Occupancy',
+			is_verified=True,
+		)
+		self.member = Member.objects.create(user=member_user)
+		plan = MembershipPlan.objects.create(
+			name='Occupancy Plan',
+			description='Plan for occupancy tests',
+			price=Decimal('1000.00'),
+			duration_days=30,
+		)
+		Subscription.objects.create(
+			member=self.member,
+			plan=plan,
+			start_date=timezone.localdate(),
+			end_date=timezone.localdate() + timedelta(days=30),
+			status='active',
+		)
+
+	def tearDown(self):
+		cache.clear()
+
+	def test_check_in_and_checkout_update_cached_occupancy(self):
+		self.assertEqual(OccupancyService.get_count(), 0)
+
+		with self.captureOnCommitCallbacks(execute=True):
+			attendance = AttendanceService.check_in_member(self.member)
+
+		with self.assertNumQueries(0):
+			self.assertEqual(OccupancyService.get_count(), 1)
+			present = OccupancyService.get_present_members()
+		self.assertEqual(present[0]['attendance_id'], attendance.pk)
+		self.assertEqual(present[0]['member_name'], 'Member Occupancy')
+
+		with self.captureOnCommitCallbacks(execute=True):
+			AttendanceService.check_out_member(attendance)
+
+		self.assertEqual(OccupancyService.get_count(), 0)
+		self.assertEqual(OccupancyService.get_present_members(), [])
+
+	def test_stale_cache_is_reconciled_from_database(self):
+		OccupancyService.get_count()
+		Attendance.objects.create(member=self.member)
+
+		with patch.object(OccupancyService, 'RECONCILE_SECONDS', -1):
+			self.assertEqual(OccupancyService.get_count(), 1)
+
+	def test_interleaved_updates_keep_both_members(self):
+		day = timezone.localdate()
+		OccupancyService.get_count(day)
+		_, members_key = OccupancyService.get_cache_keys(day)
+		first = {'attendance_id': 1, 'member_id': 101, 'member_name': 'First', 'check_in': timezone.now()}
+		second = {'attendance_id': 2, 'member_id': 102, 'member_name': 'Second', 'check_in': timezone.now()}
+		original_get = cache.get
+		interleaved = []
+
+		def get_then_interleave(key, *args, **kwargs):
+			state = original_get(key, *args, **kwargs)
+			if key == members_key and not interleaved:
+				# Another worker commits its check-in after this one read the map.
+				interleaved.append(True)
+				OccupancyService._apply(day, 102, second, 1)
+			return state
+
+		with patch.object(cache, 'get', side_effect=get_then_interleave):
+			OccupancyService._apply(day, 101, first, 1)
+
+		state = OccupancyService.get_state(day)
+		self.assertEqual(state['count'], 2)
+		self.assertEqual(set(state['members']), {101, 102})
+
+		with patch.object(cache, 'get', side_effect=get_then_interleave):
+			interleaved.clear()
+			OccupancyService._apply(day, 101, None, -1)
+		self.assertEqual(set(OccupancyService.get_state(day)['members']), {102})
+
+	def test_occupancy_endpoint_returns_json(self):
+		with self.captureOnCommitCallbacks(execute=True):
+			AttendanceService.check_in_member(self.member)
+		self.client.login(username='staff_occupancy', password='testpass123')
+
+		response = self.client.get(reverse('gym_management:attendance_occupancy'))
+
+		self.assertEqual(response.status_code, 200)
+		payload = response.json()
+		self.assertEqual(payload['count'], 1)
+		self.assertEqual(payload['members'][0]['member_id'], self.member.pk)
+
+
+class PurgeCheckInSessionsTests(TestCase):
+	def setUp(self):
+		member_user = User.objects.create_user(
+			email='member-purge@test.com',
+			username='member_purge',
+			password='testpass123',
+			full_name='Member Purge',
+			is_verified=True,
+		)
+		self.member = Member.objects.create(user=member_user)
+		now = timezone.now()
+		self.old_expired = [
+			CheckInSession.objects.create(member=self.member, action='checkin', expires_at=now - timedelta(days=2))
+			for _ in range(5)
+		]
+		self.old_used = CheckInSession.objects.create(
+			member=self.member, action='checkout', expires_at=now + timedelta(minutes=1), used=True
+		)
+		CheckInSession.objects.filter(pk=self.old_used.pk).update(created_at=now - timedelta(days=2))
+		self.recent_expired = CheckInSession.objects.create(
+			member=self.member, action='checkin', expires_at=now - timedelta(minutes=5)
+		)
+		self.live = CheckInSession.objects.create(
+			member=self.member, action='checkin', expires_at=now + timedelta(minutes=1)
+		)
+
+	def test_dry_run_deletes_nothing(self):
+		stdout = io.StringIO()
+		call_command('purge_checkin_sessions', '--dry-run', stdout=stdout)
+
+		self.assertIn('would delete 6', stdout.getvalue())
+		self.assertEqual(CheckInSession.objects.count(), 8)
+
+	def test_purge_deletes_old_sessions_in_batches(self):
+		stdout = io.StringIO()
+		call_command('purge_checkin_sessions', '--batch-size', '2', stdout=stdout)
+
+		self.assertIn('Deleted 6 check-in session(s) in 3 batch(es)', stdout.getvalue())
+		self.assertEqual(
+			set(CheckInSession.objects.values_list('pk', flat=True)),
+			{self.recent_expired.pk, self.live.pk},
+		)
+
+
+class GeofenceEngineTests(TestCase):
+	def setUp(self):
+		GeofenceService.invalidate()
+
+	def tearDown(self):
+		GeofenceService.invalidate()
+
+	def test_engine_matches_nearest_containing_branch(self):
+		engine = GeofenceEngine([
+			('thamel', 27.7150, 85.3123, 150.0),
+			('patan', 27.6710, 85.3240, 150.0),
+			('thamel-annex', 27.7155, 85.3125, 150.0),
+		])
+
+		self.assertEqual(engine.match(27.7151, 85.3123).key, 'thamel')
+		self.assertEqual(engine.match(27.6711, 85.3241).key, 'patan')
+		self.assertIsNone(engine.match(27.7000, 85.3000))
+		self.assertIsNone(engine.match(-33.8688, 151.2093))
+
+	def test_bounding_box_never_rejects_a_point_inside_the_radius(self):
+		engine = GeofenceEngine([('edge', 60.0, 10.0, 1000.0)])
+		for bearing in range(0, 360, 15):
+			lat = 60.0 + (999.0 / 111195.0) * math.cos(math.radians(bearing))
+			lon = 10.0 + (999.0 / (111195.0 * math.cos(math.radians(lat)))) * math.sin(math.radians(bearing))
+			self.assertIsNotNone(engine.match(lat, lon), bearing)
+
+	@override_settings(GYM_LATITUDE=27.7000, GYM_LONGITUDE=85.3333, GYM_RADIUS_METERS=100.0)
+	def test_service_uses_branches_and_falls_back_to_settings(self):
+		self.assertIsNone(GeofenceService.match(27.7000, 85.3333).key)
+
+		branch = GymLocation.objects.create(
+			name='Lalitpur Branch', latitude=Decimal('27.671000'), longitude=Decimal('85.324000'), radius_meters=120.0,
+		)
+
+		self.assertEqual(GeofenceService.match(27.6710, 85.3240).key, branch.pk)
+		self.assertIsNone(GeofenceService.match(27.7000, 85.3333))
+
+
+class BatchGeofenceCheckTests(TestCase):
+	FENCES = [
+		('thamel', 27.7150, 85.3123, 150.0),
+		('patan', 27.6710, 85.3240, 150.0),
+	]
+	LATITUDES = [27.7151, 27.6711, 27.7000, -33.8688]
+	LONGITUDES = [85.3123, 85.3241, 85.3000, 151.2093]
+
+	def test_fallback_matches_scalar_distance(self):
+		result = batch_geofence_check(self.LATITUDES, self.LONGITUDES, self.FENCES, use_numpy=False)
+
+		self.assertEqual(list(result.inside), [True, True, False, False])
+		self.assertEqual(result.keys[:2], ['thamel', 'patan'])
+		for lat, lon, distance, key in zip(self.LATITUDES, self.LONGITUDES, result.distances_meters, result.keys):
+			fence = next(f for f in self.FENCES if f[0] == key)
+			self.assertAlmostEqual(distance, calculate_distance_meters(lat, lon, fence[1], fence[2]), places=3)
+
+	def test_numpy_path_matches_fallback(self):
+		if location.np is None:
+			self.skipTest('NumPy is not installed')
+		expected = batch_geofence_check(self.LATITUDES, self.LONGITUDES, self.FENCES, use_numpy=False)
+		result = batch_geofence_check(self.LATITUDES, self.LONGITUDES, self.FENCES, use_numpy=True)
+
+		self.assertEqual(result.inside.tolist(), expected.inside)
+		self.assertEqual(result.keys, expected.keys)
+		for actual, wanted in zip(result.distances_meters.tolist(), expected.distances_meters):
+			self.assertAlmostEqual(actual, wanted, places=3)
+
+	def test_requires_at_least_one_fence(self):
+		with self.assertRaises(ValueError):
+			batch_geofence_check([27.7], [85.3], [])
+
+	@override_settings(GYM_LATITUDE=27.7150, GYM_LONGITUDE=85.3123, GYM_RADIUS_METERS=150.0)
+	def test_audit_command_reports_and_exports_outside_checkins(self):
+		with tempfile.TemporaryDirectory() as directory:
+			source = os.path.join(directory, 'checkins.csv')
+			target = os.path.join(directory, 'outside.csv')
+			with open(source, 'w', newline='') as handle:
+				writer = csv.writer(handle)
+				writer.writerow(['id', 'latitude', 'longitude'])
+				writer.writerow([1, 27.7151, 85.3123])
+				writer.writerow([2, 27.7000, 85.3000])
+				writer.writerow([3, 'bad', 85.3000])
+				writer.writerow([4, 27.7150, 85.3124])
+
+			out = io.StringIO()
+			call_command('audit_checkin_locations', input=source, output=target, chunk_size=2, stdout=out)
+
+			with open(target, newline='') as handle:
+				rows = list(csv.DictReader(handle))
+
+		self.assertIn('Check-ins audited: 3', out.getvalue())
+		self.assertIn('Outside every geofence: 1', out.getvalue())
+		self.assertIn('Skipping line 4', out.getvalue())
+		self.assertEqual([row['id'] for row in rows], ['2'])
+
+	@override_settings(GYM_LATITUDE=27.7150, GYM_LONGITUDE=85.3123, GYM_RADIUS_METERS=150.0)
+	def test_audit_command_reads_stored_qr_check_ins_in_chunks(self):
+		user = User.objects.create_user(
+			email='audit-member@example.com',
+			username='audit_member',
+			password='testpass123',
+			full_name='Audit Member',
+		)
+		member = Member.objects.create(user=user)
+		Attendance.objects.create(
+			member=member, check_out=timezone.now(), channel=Attendance.CHANNEL_QR,
+			check_in_latitude=Decimal('27.715100'), check_in_longitude=Decimal('85.312300'),
+		)
+		outside = Attendance.objects.create(
+			member=member, check_out=timezone.now(), channel=Attendance.CHANNEL_QR,
+			check_in_latitude=Decimal('27.700000'), check_in_longitude=Decimal('85.300000'),
+		)
+		Attendance.objects.create(member=member, check_out=timezone.now())
+
+		with tempfile.TemporaryDirectory() as directory:
+			target = os.path.join(directory, 'outside.csv')
+			out = io.StringIO()
+			call_command('audit_checkin_locations', output=target, chunk_size=1, stdout=out)
+			with open(target, newline='') as handle:
+				rows = list(csv.DictReader(handle))
+
+		self.assertIn('Check-ins audited: 2', out.getvalue())
+		self.assertEqual([row['id'] for row in rows], [str(outside.pk)])
+
+
+class BulkCheckInTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.staff_user = User.objects.create_user(
+			email='staff-bulk@test.com',
+			username='staff_bulk',
+			password='testpass123',
+			full_name='Staff Bulk',
+			is_verified=True,
+		)
+		Staff.objects.create(user=self.staff_user, department='Front Desk')
+		self.plan = MembershipPlan.objects.create(
+			name='Class Plan',
+			description='Plan for bulk check-in tests',
+			price=Decimal('1000.00'),
+			duration_days=30,
+		)
+		self.members = []
+		for index in range(4):
+			user = User.objects.create_user(
+				email=f'bulk-{index}@test.com',
+				username=f'bulk_{index}',
+				password='testpass123',
+				full_name=f'Bulk Member {index}',
+			)
+			self.members.append(Member.objects.create(user=user))
+		today = timezone.localdate()
+		for member in self.members[:3]:
+			Subscription.objects.create(
+				member=member, plan=self.plan, start_date=today, end_date=today + timedelta(days=30), status='active',
+			)
+		self.lapsed = Subscription.objects.get(member=self.members[2])
+		Subscription.objects.filter(pk=self.lapsed.pk).update(end_date=today - timedelta(days=1))
+
+	def tearDown(self):
+		cache.clear()
+
+	def test_bulk_check_in_reports_each_member_and_updates_aggregates(self):
+		AttendanceService.check_in_member(self.members[1])
+		OccupancyService.get_count()
+		member_ids = [member.pk for member in self.members] + [self.members[0].pk, 999999]
+
+		with self.captureOnCommitCallbacks(execute=True):
+			results = AttendanceService.bulk_check_in(member_ids)
+
+		self.assertEqual([result['member_id'] for result in results], member_ids[:4] + [999999])
+		self.assertEqual([result['checked_in'] for result in results], [True, False, False, False, False])
+		self.assertIn('already checked in', results[1]['message'])
+		self.assertIn('expired', results[2]['message'])
+		self.assertIn('does not have an active subscription', results[3]['message'])
+		self.assertEqual(results[4]['message'], 'Member not found.')
+
+		self.lapsed.refresh_from_db()
+		self.assertEqual(self.lapsed.status, 'expired')
+		self.assertEqual(Attendance.objects.filter(check_out__isnull=True).count(), 2)
+		self.assertEqual(OccupancyService.get_count(), 2)
+		self.assertEqual(AttendanceRollup.objects.aggregate(total=Sum('visits'))['total'], 2)
+
+	def test_bulk_check_in_query_count_does_not_grow_with_group_size(self):
+		today = timezone.localdate()
+		Subscription.objects.create(
+			member=self.members[3], plan=self.plan, start_date=today, end_date=today + timedelta(days=30), status='active',
+		)
+		member_ids = [self.members[0].pk, self.members[1].pk, self.members[3].pk]
+
+		# Lock members, load subscriptions and open sessions, one INSERT, one
+		# rollup lookup and bucket write, plus savepoints - regardless of size.
+		with self.assertNumQueries(15):
+			results = AttendanceService.bulk_check_in(member_ids)
+		self.assertTrue(all(result['checked_in'] for result in results))
+
+	def test_bulk_check_in_view_renders_result_table(self):
+		self.client.login(username='staff_bulk', password='testpass123')
+
+		response = self.client.post(
+			reverse('gym_management:attendance_bulk_checkin'),
+			{'member_ids': [self.members[0].pk, self.members[3].pk]},
+		)
+
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.context['checked_in_count'], 1)
+		self.assertContains(response, 'Bulk Member 0')
+		self.assertContains(response, 'Skipped')
+
+
+class AutoCheckoutStaleAttendanceTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		self.members = []
+		for index in range(3):
+			user = User.objects.create_user(
+				email=f'stale-{index}@test.com',
+				username=f'stale_{index}',
+				password='testpass123',
+				full_name=f'Stale Member {index}',
+			)
+			self.members.append(Member.objects.create(user=user))
+
+		now = timezone.now()
+		self.stale = []
+		for member, notes in zip(self.members[:2], ['', 'Forgot towel']):
+			attendance = Attendance.objects.create(member=member, notes=notes)
+			Attendance.objects.filter(pk=attendance.pk).update(check_in=now - timedelta(hours=20))
+			self.stale.append(attendance)
+		self.fresh = Attendance.objects.create(member=self.members[2])
+
+	def tearDown(self):
+		cache.clear()
+
+	def test_closes_only_stale_sessions_with_capped_checkout_and_marker(self):
+		AttendanceRollupService.rebuild()
+		self.assertEqual(OccupancyService.get_count(), 3)
+		out = io.StringIO()
+
+		with self.captureOnCommitCallbacks(execute=True):
+			call_command('auto_checkout_stale_attendance', older_than_hours=12, visit_hours=2, batch_size=1, stdout=out)
+
+		self.assertIn('Closed 2 attendance session(s) in 2 batch(es)', out.getvalue())
+		for attendance in self.stale:
+			attendance.refresh_from_db()
+			self.assertEqual(attendance.check_out - attendance.check_in, timedelta(hours=2))
+			self.assertTrue(attendance.notes.endswith(AttendanceService.AUTO_CHECKOUT_NOTE))
+		self.assertEqual(self.stale[0].notes, AttendanceService.AUTO_CHECKOUT_NOTE)
+		self.assertTrue(self.stale[1].notes.startswith('Forgot towel\n'))
+
+		self.fresh.refresh_from_db()
+		self.assertIsNone(self.fresh.check_out)
+
+		totals = AttendanceRollup.objects.aggregate(completed=Sum('completed_visits'), seconds=Sum('duration_seconds'))
+		self.assertEqual(totals['completed'], 2)
+		self.assertEqual(totals['seconds'], 2 * 2 * 3600)
+		with self.assertNumQueries(0):
+			self.assertEqual(OccupancyService.get_count(), 1)
+
+	def test_dry_run_and_invalid_window(self):
+		out = io.StringIO()
+		call_command('auto_checkout_stale_attendance', dry_run=True, stdout=out)
+		self.assertIn('would close 2 attendance session(s)', out.getvalue())
+		self.assertEqual(Attendance.objects.filter(check_out__isnull=True).count(), 3)
+
+		with self.assertRaises(CommandError):
+			call_command('auto_checkout_stale_attendance', older_than_hours=1, visit_hours=2)
+
+
+class AttendanceApiTests(TransactionTestCase):
+	# The API runs ORM calls on its own thread pool, which cannot see TestCase's uncommitted rows.
+	def setUp(self):
+		cache.clear()
+		self.staff_user = User.objects.create_user(
+			email='kiosk@test.com',
+			username='kiosk',
+			password='testpass123',
+			full_name='Kiosk Device',
+			is_verified=True,
+		)
+		Staff.objects.create(user=self.staff_user, department='Front Desk')
+		member_user = User.objects.create_user(
+			email='turnstile-member@test.com',
+			username='turnstile_member',
+			password='testpass123',
+			full_name='Turnstile Member',
+		)
+		self.member = Member.objects.create(user=member_user)
+		plan = MembershipPlan.objects.create(
+			name='Turnstile Plan',
+			description='Plan for attendance API tests',
+			price=Decimal('1000.00'),
+			duration_days=30,
+		)
+		Subscription.objects.create(
+			member=self.member,
+			plan=plan,
+			start_date=timezone.localdate(),
+			end_date=timezone.localdate() + timedelta(days=30),
+			status='active',
+		)
+
+	def tearDown(self):
+		cache.clear()
+
+	def _post(self, route_name, payload):
+		return self.client.post(reverse(route_name), data=json.dumps(payload), content_type='application/json')
+
+	def test_check_in_and_check_out_return_compact_json(self):
+		self.client.force_login(self.staff_user)
+
+		response = self._post('gym_management:api_attendance_check_in', {'member_id': self.member.pk})
+		self.assertEqual(response.status_code, 201)
+		payload = response.json()
+		self.assertTrue(payload['ok'])
+		self.assertEqual(payload['member_name'], 'Turnstile Member')
+		self.assertIsNone(payload['check_out'])
+
+		response = self._post('gym_management:api_attendance_check_in', {'member_id': self.member.pk})
+		self.assertEqual(response.status_code, 409)
+		self.assertIn('already checked in', response.json()['error'])
+
+		response = self._post('gym_management:api_attendance_check_out', {'member_id': self.member.pk})
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.json()['attendance_id'], payload['attendance_id'])
+		self.assertIsNotNone(Attendance.objects.get(pk=payload['attendance_id']).check_out)
+
+	def test_rejects_anonymous_members_and_bad_payloads(self):
+		response = self._post('gym_management:api_attendance_check_in', {'member_id': self.member.pk})
+		self.assertEqual(response.status_code, 401)
+
+		self.client.force_login(self.member.user)
+		response = self._post('gym_management:api_attendance_check_in', {'member_id': self.member.pk})
+		self.assertEqual(response.status_code, 403)
+
+		self.client.force_login(self.staff_user)
+		self.assertEqual(self._post('gym_management:api_attendance_check_in', {'member': 'x'}).status_code, 400)
+		self.assertEqual(self._post('gym_management:api_attendance_check_in', {'member_id': 999999}).status_code, 404)
+		self.assertEqual(self._post('gym_management:api_attendance_check_out', {'member_id': self.member.pk}).status_code, 409)
+		self.assertEqual(self.client.get(reverse('gym_management:api_attendance_check_in')).status_code, 405)
+
+
+class AttendanceLiveFeedTests(TransactionTestCase):
+	# The feed takes its snapshot on the DB thread pool, which cannot see TestCase's uncommitted rows.
+	def setUp(self):
+		cache.clear()
+		self.staff_user = User.objects.create_user(
+			email='live-staff@test.com',
+			username='live_staff',
+			password='testpass123',
+			full_name='Live Staff',
+			is_verified=True,
+		)
+		Staff.objects.create(user=self.staff_user, department='Front Desk')
+		member_user = User.objects.create_user(
+			email='live-member@test.com',
+			username='live_member',
+			password='testpass123',
+			full_name='Live Member',
+		)
+		self.member = Member.objects.create(user=member_user)
+		plan = MembershipPlan.objects.create(
+			name='Live Plan',
+			description='Plan for live feed tests',
+			price=Decimal('1000.00'),
+			duration_days=30,
+		)
+		Subscription.objects.create(
+			member=self.member,
+			plan=plan,
+			start_date=timezone.localdate(),
+			end_date=timezone.localdate() + timedelta(days=30),
+			status='active',
+		)
+
+	def tearDown(self):
+		cache.clear()
+
+	async def test_feed_streams_snapshot_then_committed_changes(self):
+		await self.async_client.aforce_login(self.staff_user)
+
+		response = await self.async_client.get(reverse('gym_management:attendance_live_feed'))
+		self.assertEqual(response['Content-Type'], 'text/event-stream')
+		stream = response.streaming_content
+
+		snapshot = await asyncio.wait_for(anext(stream), 5)
+		self.assertIn(b'event: snapshot', snapshot)
+		self.assertIn(b'"count": 0', snapshot)
+
+		attendance = await sync_to_async(AttendanceService.check_in_member)(self.member)
+		check_in = await asyncio.wait_for(anext(stream), 5)
+		self.assertIn(b'event: check_in', check_in)
+		self.assertIn(b'Live Member', check_in)
+
+		await sync_to_async(AttendanceService.check_out_member)(attendance)
+		check_out = await asyncio.wait_for(anext(stream), 5)
+		self.assertIn(b'event: check_out', check_out)
+		await stream.aclose()
+
+	def test_feed_requires_staff_and_asgi(self):
+		self.assertEqual(self.client.get(reverse('gym_management:attendance_live_feed')).status_code, 401)
+
+		self.client.force_login(self.member.user)
+		self.assertEqual(self.client.get(reverse('gym_management:attendance_live_feed')).status_code, 403)
+
+		self.client.force_login(self.staff_user)
+		self.assertEqual(self.client.get(reverse('gym_management:attendance_live_feed')).status_code, 501)
+
+
+class MemberSearchTests(TestCase):
+	def setUp(self):
+		self.staff_user = User.objects.create_user(
+			email='staff-search@test.com',
+			username='staff_search',
+			password='testpass123',
+			full_name='Staff Search',
+			is_verified=True,
+		)
+		Staff.objects.create(user=self.staff_user, department='Front Desk')
+		plan = MembershipPlan.objects.create(
+			name='Search Plan',
+			description='Plan for member search tests',
+			price=Decimal('1000.00'),
+			duration_days=30,
+		)
+		self.members = {}
+		for name in ('Anita Rai', 'anil Thapa', 'Anjali Shrestha', 'Bikash Gurung', 'Annapurna Lama'):
+			user = User.objects.create_user(
+				email=f"{name.split()[0].lower()}@test.com",
+				username=name.split()[0].lower(),
+				password='testpass123',
+				full_name=name,
+			)
+			self.members[name] = Member.objects.create(user=user)
+		today = timezone.localdate()
+		Subscription.objects.create(
+			member=self.members['Anita Rai'], plan=plan, start_date=today,
+			end_date=today + timedelta(days=30), status='active',
+		)
+
+	def test_prefix_match_is_case_insensitive_and_ordered_by_name(self):
+		results, has_more = MemberService.search_members('an')
+
+		self.assertEqual(
+			[result['name'] for result in results],
+			['anil Thapa', 'Anita Rai', 'Anjali Shrestha', 'Annapurna Lama'],
+		)
+		self.assertFalse(has_more)
+		statuses = {result['name']: result['subscription_status'] for result in results}
+		self.assertEqual(statuses['Anita Rai'], 'active')
+		self.assertEqual(statuses['anil Thapa'], 'none')
+		self.assertEqual(MemberService.search_members('  ANI  ')[0][1]['name'], 'Anita Rai')
+		self.assertEqual(MemberService.search_members('rai'), ([], False))
+		self.assertEqual(MemberService.search_members('   '), ([], False))
+
+	def test_pages_through_matches(self):
+		first, first_more = MemberService.search_members('an', page=1, limit=3)
+		second, second_more = MemberService.search_members('an', page=2, limit=3)
+
+		self.assertEqual(len(first), 3)
+		self.assertTrue(first_more)
+		self.assertEqual([result['name'] for result in second], ['Annapurna Lama'])
+		self.assertFalse(second_more)
+
+	def test_numeric_query_matches_member_id(self):
+		member = self.members['Bikash Gurung']
+
+		results, _ = MemberService.search_members(str(member.pk))
+
+		self.assertEqual([result['id'] for result in results], [member.pk])
+
+	def test_search_endpoint_requires_staff_and_returns_json(self):
+		url = reverse('gym_management:member_search')
+
+		self.client.force_login(self.members['Anita Rai'].user)
+		self.assertNotEqual(self.client.get(url, {'q': 'an'}).status_code, 200)
+
+		self.client.force_login(self.staff_user)
+		response = self.client.get(url, {'q': 'bik', 'page': 'x'})
+
+		self.assertEqual(response.status_code, 200)
+		self.assertEqual(response.json(), {
+			'results': [{
+				'id': self.members['Bikash Gurung'].pk,
+				'name': 'Bikash Gurung',
+				'subscription_status': 'none',
+			}],
+			'page': 1,
+			'has_more': False,
+		})
+
+
+class KeysetPaginationTests(TestCase):
+	def setUp(self):
+		self.admin_user = User.objects.create_user(
+			email='keyset-admin@test.com',
+			username='keyset_admin',
+			password='testpass123',
+			full_name='Keyset Admin',
+			is_verified=True,
+		)
+		AdminProfile.objects.create(user=self.admin_user, can_manage_payments=True)
+		plan = MembershipPlan.objects.create(
+			name='Keyset Plan',
+			description='Plan for keyset pagination tests',
+			price=Decimal('1000.00'),
+			duration_days=30,
+		)
+		user = User.objects.create_user(
+			email='keyset-member@test.com',
+			username='keyset_member',
+			password='testpass123',
+			full_name='Keyset Member',
+		)
+		member = Member.objects.create(user=user)
+		today = timezone.localdate()
+		subscriptions = [
+			Subscription.objects.create(
+				member=member, plan=plan, start_date=today, end_date=today + timedelta(days=30), status='expired',
+			)
+			for _ in range(5)
+		]
+		# Three rows share a timestamp so the pk tie-breaker decides their order.
+		base = timezone.now() - timedelta(days=1)
+		for index, subscription in enumerate(subscriptions):
+			Subscription.objects.filter(pk=subscription.pk).update(created_at=base + timedelta(minutes=min(index, 2)))
+		self.expected = list(Subscription.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+
+	def test_walks_forward_and_back_without_gaps_or_repeats(self):
+		queryset = Subscription.objects.all()
+		pages = [keyset_paginate(queryset, 'created_at', 2)]
+		while pages[-1].has_next:
+			pages.append(keyset_paginate(queryset, 'created_at', 2, after=pages[-1].next_cursor))
+
+		self.assertEqual([obj.pk for page in pages for obj in page], self.expected)
+		self.assertEqual([len(page) for page in pages], [2, 2, 1])
+		self.assertFalse(pages[0].has_previous)
+
+		back = keyset_paginate(queryset, 'created_at', 2, before=pages[-1].previous_cursor)
+		self.assertEqual([obj.pk for obj in back], self.expected[2:4])
+		self.assertTrue(back.has_previous)
+		first = keyset_paginate(queryset, 'created_at', 2, before=back.previous_cursor)
+		self.assertEqual([obj.pk for obj in first], self.expected[:2])
+		self.assertFalse(first.has_previous)
+
+	def test_rejects_malformed_cursor(self):
+		for cursor in ('not-a-cursor', encode_cursor(timezone.now(), 1)[:-3] + '!!!'):
+			with self.assertRaises(Http404):
+				keyset_paginate(Subscription.objects.all(), 'created_at', 2, after=cursor)
+
+	def test_capped_count(self):
+		self.assertEqual(capped_count(Subscription.objects.all(), 3), (3, True))
+		self.assertEqual(capped_count(Subscription.objects.all(), 5), (5, False))
+
+	@override_settings(GYM_LIST_COUNT_CAP=4)
+	def test_list_view_links_pages_by_cursor(self):
+		self.client.force_login(self.admin_user)
+		url = reverse('gym_management:subscription_list')
+
+		with patch.object(SubscriptionListView, 'paginate_by', 2):
+			response = self.client.get(url, {'status': 'expired'})
+			self.assertEqual([sub.pk for sub in response.context['subscriptions']], self.expected[:2])
+			self.assertTrue(response.context['is_paginated'])
+			self.assertEqual(response.context['result_count'], 4)
+			self.assertTrue(response.context['result_count_capped'])
+			self.assertContains(response, '4+')
+			next_cursor = response.context['page_obj'].next_cursor
+			self.assertContains(response, f'?status=expired&amp;after={next_cursor}')
+
+			response = self.client.get(url, {'status': 'expired', 'after': next_cursor})
+			self.assertEqual([sub.pk for sub in response.context['subscriptions']], self.expected[2:4])
+
+			self.assertEqual(self.client.get(url, {'after': 'garbage'}).status_code, 404)
+
+
+class MemberFullTextSearchTests(TestCase):
+	def setUp(self):
+		self.admin_user = User.objects.create_user(
+			email='fts-admin@test.com',
+			username='fts_admin',
+			password='testpass123',
+			full_name='Search Admin',
+			is_verified=True,
+		)
+		AdminProfile.objects.create(user=self.admin_user, can_manage_users=True)
+		self.members = {}
+		for name, phone in (('Sita Shrestha', '+9779841000001'), ('Hari Prasad', '+9779852000002'), ('Gita Rai', None)):
+			username = name.split()[0].lower()
+			user = User.objects.create_user(
+				email=f'{username}@example.com',
+				username=username,
+				password='testpass123',
+				full_name=name,
+				phone=phone,
+			)
+			self.members[name] = Member.objects.create(user=user)
+
+	def search(self, query):
+		return set(MemberSearchService.filter_queryset(Member.objects.all(), query).values_list('pk', flat=True))
+
+	def test_matches_substrings_of_name_email_and_phone(self):
+		sita = self.members['Sita Shrestha'].pk
+		hari = self.members['Hari Prasad'].pk
+		gita = self.members['Gita Rai'].pk
+
+		self.assertEqual(self.search('RESTH'), {sita})
+		self.assertEqual(self.search('  sita   shre '), {sita})
+		self.assertEqual(self.search('hari@example'), {hari})
+		self.assertEqual(self.search('98520'), {hari})
+		self.assertEqual(self.search('ita'), {sita, gita})
+		self.assertEqual(self.search('ai'), {gita})  # below trigram length
+		self.assertEqual(self.search('"rai'), set())
+		self.assertEqual(self.search('zzz'), set())
+		self.assertEqual(
+			MemberSearchService.filter_queryset(Member.objects.all(), '  ').count(), Member.objects.count()
+		)
+
+	def test_user_edits_keep_index_in_sync(self):
+		member = self.members['Gita Rai']
+		user = member.user
+		user.full_name = 'Gita Thapa'
+		user.save()
+
+		self.assertEqual(self.search('thapa'), {member.pk})
+		self.assertEqual(self.search('gita rai'), set())
+
+		User.objects.filter(pk=user.pk).update(full_name='Gita Karki')
+		user.last_login = timezone.now()
+		with self.assertNumQueries(1):
+			user.save(update_fields=['last_login'])
+		self.assertEqual(self.search('karki'), set())
+
+		call_command('rebuild_member_search_index', stdout=io.StringIO())
+		self.assertEqual(self.search('karki'), {member.pk})
+
+	def test_deleted_member_leaves_index(self):
+		member = self.members['Hari Prasad']
+		member_id = member.pk
+		member.delete()
+		Member.all_objects.create(user=User.objects.get(username='hari'))
+
+		self.assertNotIn(member_id, self.search('prasad'))
+		self.assertEqual(len(self.search('prasad')), 1)
+
+	def test_member_and_attendance_lists_use_search(self):
+		sita = self.members['Sita Shrestha']
+		Attendance.objects.create(member=sita, check_out=timezone.now())
+		Attendance.objects.create(member=self.members['Gita Rai'], check_out=timezone.now())
+		self.client.force_login(self.admin_user)
+
+		response = self.client.get(reverse('gym_management:member_list'), {'search': 'shrestha'})
+		self.assertEqual([member.pk for member in response.context['members']], [sita.pk])
+
+		response = self.client.get(reverse('gym_management:attendance_list'), {'search': '9841'})
+		self.assertEqual([record.member_id for record in response.context['attendance_records']], [sita.pk])
+
+
+class CurrentSubscriptionPointerTests(TestCase):
+	def setUp(self):
+		self.plan = MembershipPlan.objects.create(
+			name='Pointer Plan',
+			description='Plan for current subscription pointer tests',
+			price=Decimal('1500.00'),
+			duration_days=30,
+		)
+		user = User.objects.create_user(
+			email='pointer-member@test.com',
+			username='pointer_member',
+			password='testpass123',
+			full_name='Pointer Member',
+		)
+		self.member = Member.objects.create(user=user)
+
+	def pointer(self):
+		return Member.all_objects.filter(pk=self.member.pk).values_list(
+			'current_subscription_id', 'current_subscription_status', 'current_subscription_end_date',
+		).get()
+
+	def activate(self, subscription):
+		payment = Payment.objects.create(
+			subscription=subscription, amount=self.plan.price, payment_method='cash', status='pending',
+		)
+		PaymentService.complete_payment(payment)
+		subscription.refresh_from_db()
+		return subscription
+
+	def test_pointer_follows_subscription_lifecycle(self):
+		self.assertEqual(self.pointer(), (None, '', None))
+
+		first = SubscriptionService.create_subscription(self.member, self.plan)
+		self.assertEqual(self.pointer(), (first.pk, 'pending', first.end_date))
+
+		first = self.activate(first)
+		self.assertEqual(self.pointer(), (first.pk, 'active', first.end_date))
+
+		# A pending renewal does not displace the active subscription.
+		renewal = Subscription.objects.create(
+			member=self.member, plan=self.plan, start_date=first.end_date, end_date=first.end_date + timedelta(days=30),
+		)
+		self.assertEqual(self.pointer()[:2], (first.pk, 'active'))
+
+		renewal = self.activate(renewal)
+		self.assertEqual(self.pointer(), (renewal.pk, 'active', renewal.end_date))
+		first.refresh_from_db()
+		self.assertEqual(first.status, 'expired')
+
+		Subscription.objects.filter(pk=renewal.pk).update(end_date=timezone.localdate() - timedelta(days=1))
+		self.assertEqual(SubscriptionService.check_and_expire_subscriptions(), 1)
+		self.assertEqual(self.pointer(), (renewal.pk, 'expired', timezone.localdate() - timedelta(days=1)))
+
+	def test_member_save_with_update_fields_keeps_pointer(self):
+		stale = Member.objects.get(pk=self.member.pk)
+		subscription = self.activate(SubscriptionService.create_subscription(self.member, self.plan))
+
+		stale.emergency_contact = 'Updated contact'
+		stale.save(update_fields=['emergency_contact', 'updated_at'])
+
+		self.assertEqual(self.pointer()[:2], (subscription.pk, 'active'))
+		self.assertEqual(Member.objects.get(pk=self.member.pk).emergency_contact, 'Updated contact')
+
+	def test_active_subscription_reads_pointer(self):
+		member = Member.objects.get(pk=self.member.pk)
+		with self.assertNumQueries(0):
+			self.assertIsNone(SubscriptionService.get_active_subscription(member))
+
+		subscription = self.activate(SubscriptionService.create_subscription(self.member, self.plan))
+		member = Member.objects.get(pk=self.member.pk)
+		with self.assertNumQueries(1):
+			self.assertEqual(SubscriptionService.get_active_subscription(member), subscription)
+		self.assertEqual(list(Member.objects.active().with_active_subscription()), [member])
+		self.assertEqual(MemberService.can_member_subscribe(member), (False, 'already has an active subscription.'))
+
+	def test_checker_reports_and_fixes_stale_pointers(self):
+		subscription = self.activate(SubscriptionService.create_subscription(self.member, self.plan))
+		Subscription.objects.filter(pk=subscription.pk).update(status='cancelled')
+
+		out = io.StringIO()
+		call_command('check_current_subscriptions', stdout=out)
+		self.assertIn('found 1 stale pointer(s)', out.getvalue())
+		self.assertEqual(self.pointer()[1], 'active')
+
+		out = io.StringIO()
+		call_command('check_current_subscriptions', '--fix', stdout=out)
+		self.assertIn('fixed 1 stale pointer(s)', out.getvalue())
+		self.assertEqual(self.pointer()[:2], (subscription.pk, 'cancelled'))
+
+		with self.assertRaises(CommandError):
+			call_command('check_current_subscriptions', '--batch-size', '0')
@@ -25,8 +25,14 @@ from .views import (
     AttendanceListView,
     AttendanceReportView,
     AttendanceQRView,
+    AttendanceOccupancyView,
+    MemberSearchView,
+    AttendanceBulkCheckInView,
     attendance_checkin,
     attendance_checkout,
+    attendance_api_check_in,
+    attendance_api_check_out,
+    attendance_live_feed,
     # Phase 2: eSewa
     EsewaPaymentInitiateView,
     esewa_success_callback,
@@ -104,9 +110,15 @@ urlpatterns = [
     # Attendance
     path('attendance/', AttendanceListView.as_view(), name='attendance_list'),
     path('attendance/qr/', AttendanceQRView.as_view(), name='attendance_qr'),
+    path('attendance/occupancy/', AttendanceOccupancyView.as_view(), name='attendance_occupancy'),
+    path('attendance/live/', attendance_live_feed, name='attendance_live_feed'),
+    path('members/search/', MemberSearchView.as_view(), name='member_search'),
     path('attendance/report/', AttendanceReportView.as_view(), name='attendance_report'),
     path('attendance/checkin/', attendance_checkin, name='attendance_checkin'),
+    path('attendance/checkin/bulk/', AttendanceBulkCheckInView.as_view(), name='attendance_bulk_checkin'),
     path('attendance/<int:attendance_id>/checkout/', attendance_checkout, name='attendance_checkout'),
+    path('api/attendance/check-in/', attendance_api_check_in, name='api_attendance_check_in'),
+    path('api/attendance/check-out/', attendance_api_check_out, name='api_attendance_check_out'),
     
     # Analytics & Reports
     path('reports/revenue/', RevenueReportView.as_view(), name='revenue_report'),
@@ -0,0 +1,48 @@
+"""Run blocking ORM work from async views on a bounded thread pool."""
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+_executor = None
+_executor_lock = Lock()
+
+
+def get_db_executor():
+    """Shared pool sized by GYM_ATTENDANCE_API_THREADS, created on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'GYM_ATTENDANCE_API_THREADS', 8),
+                    thread_name_prefix='gym-db',
+                )
+    return _executor
+
+
+def _call_with_connection_cleanup(func, *args, **kwargs):
+    # Pool threads never see request_started/request_finished, so recycle
+    # their connections here the way Django does around each request.
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_db_pool(func, *args, **kwargs):
+    """
+    Await ``func(*args, **kwargs)`` on the bounded database thread pool.
+
+    Unlike the default thread-sensitive ``sync_to_async``, calls from
+    concurrent requests run in parallel, but never on more than
+    GYM_ATTENDANCE_API_THREADS threads (and so database connections).
+    """
+    return await sync_to_async(
+        _call_with_connection_cleanup,
+        thread_sensitive=False,
+        executor=get_db_executor(),
+    )(func, *args, **kwargs)
@@ -0,0 +1,139 @@
+"""
+Publish/subscribe bus for live attendance events.
+
+Committed check-ins and check-outs are published from synchronous service
+code; async server-sent-event views subscribe and stream them to open staff
+dashboards. The in-process bus only reaches viewers connected to the same
+worker process, so deployments running several ASGI workers should enable
+USE_REDIS, which switches to Redis pub/sub.
+"""
+import asyncio
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'gym_management:attendance_events'
+
+
+class LocalSubscription:
+    """Bounded queue of events for one subscriber on its own event loop."""
+
+    MAX_PENDING = 100  # A viewer this far behind misses events until it reconnects
+
+    def __init__(self, bus):
+        self._bus = bus
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=self.MAX_PENDING)
+
+    async def open(self):
+        """Nothing to set up; the bus already delivers to this queue."""
+
+    def offer(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass
+
+    async def get(self):
+        return await self.queue.get()
+
+    async def close(self):
+        self._bus.unsubscribe(self)
+
+
+class LocalEventBus:
+    """Fan events out to subscribers in this process; safe to publish from any thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def subscribe(self):
+        subscription = LocalSubscription(self)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # The subscriber's event loop has shut down.
+                self.unsubscribe(subscription)
+
+
+class RedisSubscription:
+    """Async Redis pub/sub subscription to the attendance channel."""
+
+    def __init__(self, url):
+        import redis.asyncio as redis_asyncio
+
+        self._client = redis_asyncio.Redis.from_url(url)
+        self._pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+
+    async def open(self):
+        """Subscribe to the channel; events published from here on are delivered."""
+        await self._pubsub.subscribe(CHANNEL)
+
+    async def get(self):
+        while True:
+            message = await self._pubsub.get_message(timeout=1.0)
+            if message is not None and message['type'] == 'message':
+                return json.loads(message['data'])
+
+    async def close(self):
+        await self._pubsub.aclose()
+        await self._client.aclose()
+
+
+class RedisEventBus:
+    """Publish through Redis so every ASGI worker's viewers receive each event."""
+
+    def __init__(self, url):
+        import redis
+
+        self._url = url
+        self._client = redis.Redis.from_url(url)
+
+    def subscribe(self):
+        return RedisSubscription(self._url)
+
+    def publish(self, event):
+        self._client.publish(CHANNEL, json.dumps(event, cls=DjangoJSONEncoder))
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_event_bus():
+    """Return the process-wide bus: Redis when USE_REDIS is on, in-process otherwise."""
+    global _bus
+    if _bus is None:
+        with _bus_lock:
+            if _bus is None:
+                if getattr(settings, 'USE_REDIS', False):
+                    _bus = RedisEventBus(settings.CACHES['default']['LOCATION'])
+                else:
+                    _bus = LocalEventBus()
+    return _bus
+
+
+def publish_event(event):
+    """Publish an event, never letting a bus failure break the caller's write path."""
+    try:
+        get_event_bus().publish(event)
+    except Exception:  # noqa: BLE001 - live feed is best-effort
+        logger.warning('Failed to publish live attendance event', exc_info=True)
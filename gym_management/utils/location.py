@@ -1,9 +1,19 @@
 import math
+from collections import defaultdict
+from typing import NamedTuple, Optional
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; batch helpers fall back to pure Python
+    np = None
+
+EARTH_RADIUS_METERS = 6371000
+METERS_PER_DEGREE_LATITUDE = EARTH_RADIUS_METERS * math.pi / 180
 
 
 def calculate_distance_meters(lat1, lon1, lat2, lon2):
     """Calculate the great-circle distance between two coordinates in meters."""
-    earth_radius_meters = 6371000
+    earth_radius_meters = EARTH_RADIUS_METERS
 
     lat1_rad = math.radians(lat1)
     lon1_rad = math.radians(lon1)
@@ -18,4 +28,165 @@ def calculate_distance_meters(lat1, lon1, lat2, lon2):
         + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon / 2) ** 2
     )
     arc = 2 * math.atan2(math.sqrt(haversine), math.sqrt(1 - haversine))
-    return earth_radius_meters * arc
\ No newline at end of file
+    return earth_radius_meters * arc
+
+
+class GeofenceMatch(NamedTuple):
+    """A geofence that contains a point, and the point's distance from its centre."""
+
+    key: object
+    distance_meters: float
+
+
+class GeofenceEngine:
+    """
+    Point-in-geofence lookup across many gym branches.
+
+    Each fence gets a conservative lat/lon bounding box and is registered in
+    every grid cell its box overlaps. A lookup only visits the fences in the
+    point's cell, rejects most of them with four comparisons, and runs the
+    haversine only for boxes that contain the point, so its cost stays flat as
+    branches are added.
+    """
+
+    CELL_DEGREES = 0.05  # ~5.5 km of latitude per grid cell
+    BOX_MARGIN = 1.01  # Slack for the difference between box and great-circle geometry
+
+    def __init__(self, fences):
+        """
+        Args:
+            fences: Iterable of (key, latitude, longitude, radius_meters)
+        """
+        self._cells = defaultdict(list)
+        self.size = 0
+
+        for key, latitude, longitude, radius_meters in fences:
+            latitude = float(latitude)
+            longitude = float(longitude)
+            radius_meters = float(radius_meters)
+
+            lat_delta = radius_meters * self.BOX_MARGIN / METERS_PER_DEGREE_LATITUDE
+            # The circle is widest in longitude on its pole-ward edge
+            cos_edge = math.cos(math.radians(min(abs(latitude) + lat_delta, 89.999)))
+            lon_delta = lat_delta / cos_edge
+            fence = (
+                key, latitude, longitude, radius_meters,
+                latitude - lat_delta, latitude + lat_delta,
+                longitude - lon_delta, longitude + lon_delta,
+            )
+
+            for lat_cell in range(self._cell(fence[4]), self._cell(fence[5]) + 1):
+                for lon_cell in range(self._cell(fence[6]), self._cell(fence[7]) + 1):
+                    self._cells[(lat_cell, lon_cell)].append(fence)
+            self.size += 1
+
+    @classmethod
+    def _cell(cls, degrees):
+        return math.floor(degrees / cls.CELL_DEGREES)
+
+    def match(self, latitude, longitude) -> Optional[GeofenceMatch]:
+        """Return the nearest fence containing the point, or None."""
+        best = None
+        cell = (self._cell(latitude), self._cell(longitude))
+
+        for key, fence_lat, fence_lon, radius, lat_min, lat_max, lon_min, lon_max in self._cells.get(cell, ()):
+            if not (lat_min <= latitude <= lat_max and lon_min <= longitude <= lon_max):
+                continue
+            distance = calculate_distance_meters(latitude, longitude, fence_lat, fence_lon)
+            if distance <= radius and (best is None or distance < best.distance_meters):
+                best = GeofenceMatch(key, distance)
+
+        return best
+
+
+class BatchGeofenceResult(NamedTuple):
+    """Per-point results of a batch geofence check, in input order."""
+
+    distances_meters: object  # Distance to the nearest fence centre
+    inside: object  # Whether the point is within any fence's radius
+    keys: list  # Key of the nearest fence
+
+
+def calculate_distances_meters(latitudes, longitudes, latitude, longitude, use_numpy=None):
+    """
+    Great-circle distances from many points to one coordinate in a single call.
+
+    Uses NumPy when it is installed (returning an array) and a pure-Python
+    loop otherwise (returning a list); pass ``use_numpy=False`` to force the
+    fallback.
+    """
+    if use_numpy is None:
+        use_numpy = np is not None
+
+    if not use_numpy:
+        return [
+            calculate_distance_meters(lat, lon, latitude, longitude)
+            for lat, lon in zip(latitudes, longitudes)
+        ]
+
+    lat1 = np.radians(np.asarray(latitudes, dtype=float))
+    lon1 = np.radians(np.asarray(longitudes, dtype=float))
+    lat2 = math.radians(latitude)
+    lon2 = math.radians(longitude)
+
+    haversine = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * math.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    arc = 2 * np.arctan2(np.sqrt(haversine), np.sqrt(1 - haversine))
+    return EARTH_RADIUS_METERS * arc
+
+
+def batch_geofence_check(latitudes, longitudes, fences, use_numpy=None) -> BatchGeofenceResult:
+    """
+    Check many points against a set of geofences in one vectorized pass.
+
+    Args:
+        latitudes: Sequence of point latitudes
+        longitudes: Sequence of point longitudes, same length
+        fences: Sequence of (key, latitude, longitude, radius_meters)
+        use_numpy: Force (True) or disable (False) NumPy; defaults to availability
+
+    Returns:
+        BatchGeofenceResult: NumPy arrays when NumPy is used, lists otherwise
+    """
+    if use_numpy is None:
+        use_numpy = np is not None
+    fences = [(key, float(lat), float(lon), float(radius)) for key, lat, lon, radius in fences]
+    if not fences:
+        raise ValueError('At least one geofence is required.')
+
+    if use_numpy:
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+        # One row of distances per fence: shape (fences, points)
+        distances = np.vstack([
+            calculate_distances_meters(latitudes, longitudes, lat, lon, use_numpy=True)
+            for _, lat, lon, _ in fences
+        ])
+        radii = np.array([radius for _, _, _, radius in fences])[:, np.newaxis]
+        nearest = distances.argmin(axis=0)
+        return BatchGeofenceResult(
+            distances_meters=distances.min(axis=0),
+            inside=(distances <= radii).any(axis=0),
+            keys=[fences[index][0] for index in nearest.tolist()],
+        )
+
+    nearest_distances = []
+    inside = []
+    keys = []
+    for point_lat, point_lon in zip(latitudes, longitudes):
+        best_distance = None
+        best_key = None
+        is_inside = False
+        for key, lat, lon, radius in fences:
+            distance = calculate_distance_meters(float(point_lat), float(point_lon), lat, lon)
+            is_inside = is_inside or distance <= radius
+            if best_distance is None or distance < best_distance:
+                best_distance = distance
+                best_key = key
+        nearest_distances.append(best_distance)
+        inside.append(is_inside)
+        keys.append(best_key)
+
+    return BatchGeofenceResult(distances_meters=nearest_distances, inside=inside, keys=keys)
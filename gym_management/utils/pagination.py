@@ -0,0 +1,119 @@
+"""
+Keyset (cursor) pagination for long, newest-first lists.
+
+OFFSET paging makes the database walk and discard every earlier row, so deep
+pages get slower in a straight line. Keyset paging instead seeks past the last
+row shown using its ``(timestamp, pk)`` key, which a composite index on those
+columns serves at the same cost on every page. Cursors are opaque to the
+browser but carry no authority: they only position the page inside the
+queryset the view has already filtered.
+"""
+import base64
+import binascii
+
+from django.db.models import Q
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(value, pk):
+    """Encode a ``(timestamp, pk)`` key as a URL-safe cursor."""
+    raw = f'{value.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor from encode_cursor, raising ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        value, pk = raw.rsplit('|', 1)
+        timestamp = parse_datetime(value)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise ValueError('Invalid cursor') from exc
+    if timestamp is None:
+        raise ValueError('Invalid cursor')
+    return timestamp, pk
+
+
+class KeysetPage:
+    """One page of a keyset-paginated list, with cursors to its neighbours."""
+
+    def __init__(self, object_list, field, has_next, has_previous):
+        self.object_list = object_list
+        self.field = field
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def _cursor(self, obj):
+        return encode_cursor(getattr(obj, self.field), obj.pk)
+
+    @property
+    def next_cursor(self):
+        return self._cursor(self.object_list[-1]) if self.has_next else None
+
+    @property
+    def previous_cursor(self):
+        return self._cursor(self.object_list[0]) if self.has_previous else None
+
+
+def keyset_paginate(queryset, field, per_page, after=None, before=None):
+    """
+    Return the KeysetPage of ``queryset`` ordered by ``-field, -pk``.
+
+    ``after`` selects the page following that cursor (older rows), ``before``
+    the page preceding it (newer rows); with neither, the newest page. One
+    extra row is fetched to tell whether another page exists, so no COUNT runs.
+
+    Raises:
+        Http404: If a cursor is malformed
+    """
+    try:
+        after_key = decode_cursor(after) if after else None
+        before_key = decode_cursor(before) if before else None
+    except ValueError:
+        raise Http404('Invalid page cursor.')
+
+    if before_key is not None:
+        value, pk = before_key
+        rows = list(
+            queryset.filter(Q(**{f'{field}__gt': value}) | Q(**{field: value, 'pk__gt': pk}))
+            .order_by(field, 'pk')[:per_page + 1]
+        )
+        if rows:
+            has_previous = len(rows) > per_page
+            return KeysetPage(rows[:per_page][::-1], field, has_next=True, has_previous=has_previous)
+        # Nothing newer any more (rows were deleted); show the newest page.
+
+    ordered = queryset.order_by(f'-{field}', '-pk')
+    if after_key is not None:
+        value, pk = after_key
+        ordered = ordered.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'pk__lt': pk}))
+    rows = list(ordered[:per_page + 1])
+    return KeysetPage(
+        rows[:per_page],
+        field,
+        has_next=len(rows) > per_page,
+        has_previous=after_key is not None,
+    )
+
+
+def capped_count(queryset, cap):
+    """
+    Count ``queryset`` but stop after ``cap`` rows.
+
+    Returns:
+        tuple: (count, is_capped); with is_capped True the real count is
+        greater than ``count``
+    """
+    count = queryset.order_by()[:cap + 1].count()
+    return min(count, cap), count > cap
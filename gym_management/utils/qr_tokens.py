@@ -0,0 +1,96 @@
+"""Stateless, signed QR tokens for self check-in and check-out."""
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core import signing
+from django.core.cache import cache
+from django.utils import timezone
+
+
+class SignedQRToken:
+    """
+    HMAC-signed QR token carrying member id, action, expiry and a nonce.
+
+    Unlike CheckInSession rows, these tokens need no database writes or reads:
+    the signature proves authenticity, the embedded expiry bounds their
+    lifetime, and replays are blocked by recording the nonce in the cache
+    until the token expires.
+    """
+
+    SALT = 'gym_management.attendance.qr'
+    USED_KEY_PREFIX = 'qr-token-used'
+    USED_KEY_GRACE_SECONDS = 5  # Keep the replay marker slightly past expiry
+
+    def __init__(self, value, member_id, action, expires_at, nonce):
+        self.value = value
+        self.member_id = member_id
+        self.action = action
+        self.expires_at = expires_at
+        self.nonce = nonce
+
+    @property
+    def pk(self):
+        """Token string; mirrors CheckInSession.pk so views can treat both alike."""
+        return self.value
+
+    @classmethod
+    def issue(cls, member_id, action, ttl_seconds):
+        """Sign a new token for a member action, valid for ``ttl_seconds``."""
+        nonce = uuid.uuid4().hex
+        expires_at = timezone.now().replace(microsecond=0) + timedelta(seconds=ttl_seconds)
+        value = signing.dumps(
+            {'m': member_id, 'a': action, 'e': int(expires_at.timestamp()), 'n': nonce},
+            salt=cls.SALT,
+        )
+        return cls(value, member_id, action, expires_at, nonce)
+
+    @classmethod
+    def is_signed_value(cls, value):
+        """Signed tokens contain the signer separator; CheckInSession ids are bare UUIDs."""
+        return isinstance(value, str) and ':' in value
+
+    @classmethod
+    def parse(cls, value):
+        """
+        Verify and decode a token string.
+
+        Raises:
+            signing.BadSignature: If the token was tampered with or is malformed
+        """
+        payload = signing.loads(value, salt=cls.SALT)
+        try:
+            return cls(
+                value,
+                int(payload['m']),
+                str(payload['a']),
+                datetime.fromtimestamp(int(payload['e']), tz=dt_timezone.utc),
+                str(payload['n']),
+            )
+        except (KeyError, TypeError, ValueError) as exc:
+            raise signing.BadSignature('Malformed QR token payload.') from exc
+
+    def is_expired(self):
+        """Check if the token has expired."""
+        return self.expires_at <= timezone.now()
+
+    def _used_key(self):
+        return f"{self.USED_KEY_PREFIX}:{self.nonce}"
+
+    @property
+    def used(self):
+        """Whether the token has already been consumed."""
+        return cache.get(self._used_key()) is not None
+
+    def mark_used(self):
+        """
+        Atomically consume the token.
+
+        Returns:
+            bool: False if another request consumed it first
+        """
+        remaining = int((self.expires_at - timezone.now()).total_seconds())
+        return cache.add(self._used_key(), True, timeout=max(remaining, 0) + self.USED_KEY_GRACE_SECONDS)
+
+    def release(self):
+        """Undo mark_used when the transaction that consumed the token rolls back."""
+        cache.delete(self._used_key())
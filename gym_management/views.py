@@ -1,9 +1,13 @@
+import asyncio
 import io
 import json
 import logging
 
 import qrcode
 
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
@@ -13,24 +17,30 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse, reverse_lazy
 from django.db import transaction, IntegrityError
 from django.db.models import Count, Sum, Q, Avg, Prefetch, F
-from django.http import HttpResponseNotAllowed, Http404, HttpResponse, HttpResponseForbidden
+from django.http import HttpResponseNotAllowed, Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.utils.http import url_has_allowed_host_and_scheme
 from django.views.decorators.http import require_POST
 from django.utils.decorators import method_decorator
 from django.utils import timezone
 from django.core.exceptions import PermissionDenied, ValidationError
 from datetime import date, timedelta
+from django_ratelimit.core import is_ratelimited
 from django_ratelimit.decorators import ratelimit
 from accounts.mixins import AdminRequiredMixin, TrainerRequiredMixin, StaffRequiredMixin, MemberRequiredMixin, StaffOrAdminRequiredMixin
-from accounts.models import Member, Trainer, Staff, User
+from accounts.models import Member, User
 from accounts.utils import get_user_role, can_manage_users, can_manage_payments, can_view_reports
 from .models import MembershipPlan, Subscription, Payment, Attendance, Notification
-from .mixins import ObjectOwnershipMixin, get_client_ip
+from .mixins import KeysetPaginationMixin, ObjectOwnershipMixin, get_client_ip
+from .utils.async_db import run_in_db_pool
+from .utils.live_events import get_event_bus
 from .forms import (
     MemberCreateForm, MemberUpdateForm, MembershipPlanForm,
     SubscriptionForm, PaymentCreateForm
 )
-from .services import SubscriptionService, AttendanceService, PaymentService
+from .services import (
+    SubscriptionService, AttendanceService, AttendanceRollupService, DashboardSnapshotService, MemberSearchService,
+    MemberService, OccupancyService, PaymentService,
+)
 
 
 audit_logger = logging.getLogger('security.audit')
@@ -64,48 +74,8 @@ class AdminDashboardView(AdminRequiredMixin, AdminCapabilityMixin, TemplateView)
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
-        # Efficient aggregate queries (total registered members for dashboard metrics)
-        context['total_members'] = Member.all_objects.count()
-        context['total_trainers'] = Trainer.objects.filter(is_active=True).count()
-        context['total_staff'] = Staff.objects.filter(is_active=True).count()
-        context['active_subscriptions'] = Subscription.objects.filter(status='active').count()
-        
-        # Revenue this month (single query)
-        today = timezone.localdate()
-        first_day = today.replace(day=1)
-        revenue_data = Payment.objects.filter(
-            status='completed',
-            completed_at__gte=first_day
-        ).aggregate(
-            total=Sum('amount'),
-            count=Count('id')
-        )
-        context['revenue_this_month'] = revenue_data['total'] or 0
-        context['payments_this_month'] = revenue_data['count']
-        
-        # Today's attendance
-        context['attendance_today'] = Attendance.objects.filter(date=today).count()
-        
-        # Recent activities with optimized select_related
-        context['recent_subscriptions'] = Subscription.objects.select_related(
-            'member__user', 'plan'
-        ).order_by('-created_at')[:5]
-        
-        context['recent_payments'] = Payment.objects.select_related(
-            'subscription__member__user', 'subscription__plan'
-        ).order_by('-initiated_at')[:5]
-        
-        context['recent_attendance'] = Attendance.objects.select_related(
-            'member__user'
-        ).order_by('-check_in')[:10]
-        
-        # Expiring subscriptions (next 7 days) - optimized
-        next_week = today + timedelta(days=7)
-        context['expiring_soon'] = Subscription.objects.filter(
-            status='active',
-            end_date__gte=today,
-            end_date__lte=next_week
-        ).select_related('member__user', 'plan').order_by('end_date')
+        # Counts, revenue, attendance and recent activity come from one cache read
+        context.update(DashboardSnapshotService.get_snapshot())
         
         return context
 
@@ -124,26 +94,22 @@ class MemberListView(AdminRequiredMixin, AdminCapabilityMixin, ListView):
     def get_queryset(self):
         queryset = Member.objects.select_related('user')
         
-        # Search
+        # Search (name, email or phone) through the member search index
         search = self.request.GET.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(user__full_name__icontains=search) |
-                Q(user__email__icontains=search) |
-                Q(user__phone__icontains=search)
-            )
+            queryset = MemberSearchService.filter_queryset(queryset, search)
         
-        # Filter by subscription status
+        # Filter by the denormalized current subscription status
         status = self.request.GET.get('status')
         if status:
             if status == 'active':
-                queryset = queryset.filter(subscriptions__status='active')
+                queryset = queryset.filter(current_subscription_status='active')
             elif status == 'expired':
-                queryset = queryset.filter(subscriptions__status='expired')
+                queryset = queryset.filter(current_subscription_status='expired')
             elif status == 'no_subscription':
-                queryset = queryset.exclude(subscriptions__isnull=False)
+                queryset = queryset.filter(current_subscription_status='')
         
-        return queryset.distinct()
+        return queryset
 
 
 class MemberDetailView(AdminRequiredMixin, AdminCapabilityMixin, ObjectOwnershipMixin, DetailView):
@@ -171,7 +137,7 @@ class MemberDetailView(AdminRequiredMixin, AdminCapabilityMixin, ObjectOwnership
         context['attendance_records'] = member.attendance_records.order_by('-check_in')[:20]
         
         # Current subscription
-        context['current_subscription'] = member.subscriptions.filter(status='active').first()
+        context['current_subscription'] = SubscriptionService.get_active_subscription(member)
         
         # Available plans for quick assignment
         context['available_plans'] = MembershipPlan.objects.filter(is_active=True).order_by('price')
@@ -238,7 +204,7 @@ class MemberUpdateView(AdminRequiredMixin, AdminCapabilityMixin, UpdateView):
         member.user.full_name = form.cleaned_data['full_name']
         member.user.phone = form.cleaned_data.get('phone', '')
         member.user.save()
-        member.save()
+        member.save(update_fields=[*form._meta.fields, 'updated_at'])
         
         messages.success(self.request, f'Member {member.user.full_name} updated successfully!')
         return redirect(self.get_success_url())
@@ -262,7 +228,7 @@ class MemberDeleteView(AdminRequiredMixin, AdminCapabilityMixin, DeleteView):
         member = self.get_object()
         member.is_active = False
         member.user.is_active = False
-        member.save()
+        member.save(update_fields=['is_active', 'updated_at'])
         member.user.save()
         
         messages.success(request, f'Member {member.user.full_name} has been deactivated.')
@@ -342,12 +308,13 @@ class MembershipPlanDeleteView(AdminRequiredMixin, AdminCapabilityMixin, DeleteV
 
 # ==================== SUBSCRIPTIONS ====================
 
-class SubscriptionListView(AdminRequiredMixin, AdminCapabilityMixin, ListView):
+class SubscriptionListView(AdminRequiredMixin, AdminCapabilityMixin, KeysetPaginationMixin, ListView):
     """List all subscriptions with filters."""
     model = Subscription
     template_name = 'gym_management/subscription_list.html'
     context_object_name = 'subscriptions'
     paginate_by = 20
+    keyset_field = 'created_at'
     permission_checker = can_manage_payments
     permission_denied_message = 'You do not have permission to manage subscriptions.'
     
@@ -561,12 +528,13 @@ def assign_subscription_to_member(request, member_id):
 
 # ==================== PAYMENTS ====================
 
-class PaymentListView(AdminRequiredMixin, AdminCapabilityMixin, ListView):
+class PaymentListView(AdminRequiredMixin, AdminCapabilityMixin, KeysetPaginationMixin, ListView):
     """List all payments with filters."""
     model = Payment
     template_name = 'gym_management/payment_list.html'
     context_object_name = 'payments'
     paginate_by = 20
+    keyset_field = 'initiated_at'
     permission_checker = can_manage_payments
     permission_denied_message = 'You do not have permission to manage payments.'
     
@@ -710,23 +678,21 @@ class PaymentDetailView(AdminRequiredMixin, AdminCapabilityMixin, ObjectOwnershi
 
 # ==================== ATTENDANCE ====================
 
-class AttendanceListView(StaffOrAdminRequiredMixin, ListView):
+class AttendanceListView(StaffOrAdminRequiredMixin, KeysetPaginationMixin, ListView):
     """List attendance records with date filters."""
     model = Attendance
     template_name = 'gym_management/attendance_list.html'
     context_object_name = 'attendance_records'
     paginate_by = 50
+    keyset_field = 'check_in'
     
     def get_queryset(self):
         queryset = Attendance.objects.select_related('member__user').all()
         
-        # Search by member name
+        # Search by member name, email or phone through the member search index
         search = self.request.GET.get('search', '').strip()
         if search:
-            queryset = queryset.filter(
-                Q(member__user__full_name__icontains=search) |
-                Q(member__user__email__icontains=search)
-            )
+            queryset = MemberSearchService.filter_queryset(queryset, search, member_field='member_id')
         
         # Filter by date
         date_str = self.request.GET.get('date')
@@ -744,17 +710,44 @@ class AttendanceListView(StaffOrAdminRequiredMixin, ListView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Add active members for check-in dropdown
-        context['active_members'] = Member.objects.select_related('user').order_by('user__full_name')
-        # Currently present count
-        today = timezone.localdate()
-        context['currently_present_count'] = Attendance.objects.filter(
-            date=today,
-            check_out__isnull=True
-        ).count()
+        # Currently present count (cached live occupancy)
+        context['currently_present_count'] = OccupancyService.get_count()
         return context
 
 
+class AttendanceOccupancyView(StaffOrAdminRequiredMixin, View):
+    """Lightweight JSON feed of live occupancy for front-desk screens to poll."""
+
+    def get(self, request):
+        occupancy = OccupancyService.get_state()
+        present = sorted(occupancy['members'].values(), key=lambda entry: entry['check_in'], reverse=True)
+        return JsonResponse({
+            'date': timezone.localdate().isoformat(),
+            'count': occupancy['count'],
+            'members': [
+                {
+                    'attendance_id': entry['attendance_id'],
+                    'member_id': entry['member_id'],
+                    'member_name': entry['member_name'],
+                    'check_in': entry['check_in'].isoformat(),
+                }
+                for entry in present
+            ],
+        })
+
+
+class MemberSearchView(StaffOrAdminRequiredMixin, View):
+    """Paginated type-ahead member search (id, name, subscription status) for check-in pickers."""
+
+    def get(self, request):
+        try:
+            page = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            page = 1
+        results, has_more = MemberService.search_members(request.GET.get('q', ''), page=page)
+        return JsonResponse({'results': results, 'page': page, 'has_more': has_more})
+
+
 class AttendanceQRView(StaffOrAdminRequiredMixin, View):
     """Serve a QR code PNG image encoding the self check-in URL."""
 
@@ -794,7 +787,6 @@ def attendance_checkin(request):
             member = Member.objects.select_related('user').get(id=member_id)
 
             attendance_record = AttendanceService.check_in_member(member)
-            active_sub = member.subscriptions.filter(status='active').first()
             audit_logger.info(
                 'ATTENDANCE_CHECKIN | user=%s | role=%s | member_id=%s | attendance_id=%s | ip=%s',
                 request.user.email,
@@ -804,8 +796,8 @@ def attendance_checkin(request):
                 get_client_ip(request),
             )
             success_message = f'{member.user.full_name} checked in successfully!'
-            if active_sub:
-                success_message = f'{success_message} Subscription expires on {active_sub.end_date}.'
+            if member.current_subscription_status == 'active':
+                success_message = f'{success_message} Subscription expires on {member.current_subscription_end_date}.'
             messages.success(request, success_message)
         
         except Member.DoesNotExist:
@@ -824,6 +816,57 @@ def attendance_checkin(request):
     return redirect('gym_management:attendance_list')
 
 
+@method_decorator(ratelimit(key='user', rate='20/m', method='POST', block=False), name='dispatch')
+class AttendanceBulkCheckInView(StaffOrAdminRequiredMixin, TemplateView):
+    """Check in a whole group (e.g. a class) in one request and show a per-member result table."""
+    template_name = 'gym_management/attendance_bulk_checkin.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['bulk_limit'] = AttendanceService.BULK_CHECK_IN_LIMIT
+        return context
+
+    def post(self, request):
+        if getattr(request, 'limited', False):
+            audit_logger.warning(
+                'RATE_LIMIT_BLOCK | user=%s | role=%s | endpoint=attendance_bulk_checkin | method=%s | path=%s | ip=%s',
+                request.user.email,
+                get_user_role(request.user),
+                request.method,
+                request.path,
+                get_client_ip(request),
+            )
+            messages.error(request, 'Too many check-in attempts. Please wait and try again.')
+            return redirect('gym_management:attendance_bulk_checkin')
+
+        context = self.get_context_data()
+        try:
+            member_ids = [int(member_id) for member_id in request.POST.getlist('member_ids')]
+        except ValueError:
+            messages.error(request, 'Invalid member selection.')
+            return self.render_to_response(context)
+
+        try:
+            results = AttendanceService.bulk_check_in(member_ids)
+        except ValueError as exc:
+            messages.warning(request, str(exc))
+            return self.render_to_response(context)
+
+        checked_in = [result for result in results if result['checked_in']]
+        audit_logger.info(
+            'ATTENDANCE_BULK_CHECKIN | user=%s | role=%s | requested=%s | checked_in=%s | attendance_ids=%s | ip=%s',
+            request.user.email,
+            get_user_role(request.user),
+            len(results),
+            len(checked_in),
+            ','.join(str(result['attendance'].pk) for result in checked_in),
+            get_client_ip(request),
+        )
+        context['results'] = results
+        context['checked_in_count'] = len(checked_in)
+        return self.render_to_response(context)
+
+
 @login_required
 @require_POST
 @ratelimit(key='user', rate='60/m', method='POST', block=False)
@@ -924,6 +967,189 @@ def attendance_checkout(request, attendance_id):
     return redirect('gym_management:attendance_list')
 
 
+# ==================== ATTENDANCE API (ASYNC) ====================
+#
+# Compact JSON endpoints for kiosks and turnstile readers. They run natively
+# under ASGI, render no templates and skip the messages framework; blocking
+# service calls go through a bounded thread pool (GYM_ATTENDANCE_API_THREADS).
+# Clients authenticate with a staff session and send the X-CSRFToken header.
+
+def _attendance_api_error(message, status):
+    return JsonResponse({'ok': False, 'error': message}, status=status)
+
+
+def _authorize_attendance_api(request, user, endpoint):
+    """Return an error response if ``user`` may not call the API right now, else None."""
+    if not has_staff_or_admin_attendance_access(user):
+        return _attendance_api_error('Staff or admin access required.', 403)
+
+    if is_ratelimited(
+        request,
+        group='gym_management.attendance_api',
+        key=lambda group, request: str(user.pk),
+        rate=settings.GYM_ATTENDANCE_API_RATE,
+        method='POST',
+        increment=True,
+    ):
+        audit_logger.warning(
+            'RATE_LIMIT_BLOCK | user=%s | role=%s | endpoint=%s | method=%s | path=%s | ip=%s',
+            user.email,
+            get_user_role(user),
+            endpoint,
+            request.method,
+            request.path,
+            get_client_ip(request),
+        )
+        return _attendance_api_error('Too many requests. Please slow down.', 429)
+    return None
+
+
+def _parse_attendance_api_member_id(request):
+    try:
+        payload = json.loads(request.body or b'{}')
+        return int(payload['member_id'])
+    except (ValueError, TypeError, KeyError):
+        return None
+
+
+def _attendance_api_payload(attendance, member):
+    return {
+        'ok': True,
+        'attendance_id': attendance.pk,
+        'member_id': member.pk,
+        'member_name': member.user.full_name,
+        'check_in': attendance.check_in.isoformat(),
+        'check_out': attendance.check_out.isoformat() if attendance.check_out else None,
+    }
+
+
+def _api_check_in_member(member_id):
+    member = Member.objects.select_related('user').get(pk=member_id)
+    return _attendance_api_payload(AttendanceService.check_in_member(member), member)
+
+
+def _api_check_out_member(member_id):
+    attendance = Attendance.objects.select_related('member__user').filter(
+        member_id=member_id,
+        check_out__isnull=True,
+    ).first()
+    if attendance is None:
+        if not Member.objects.filter(pk=member_id).exists():
+            raise Member.DoesNotExist
+        raise ValueError('Member does not have an open attendance session.')
+    return _attendance_api_payload(AttendanceService.check_out_member(attendance), attendance.member)
+
+
+async def _run_attendance_api(request, endpoint, action, success_status):
+    user = await request.auser()
+    if not user.is_authenticated:
+        return _attendance_api_error('Authentication required.', 401)
+
+    denied = await run_in_db_pool(_authorize_attendance_api, request, user, endpoint)
+    if denied is not None:
+        return denied
+
+    member_id = _parse_attendance_api_member_id(request)
+    if member_id is None:
+        return _attendance_api_error('Request body must be JSON with an integer member_id.', 400)
+
+    try:
+        payload = await run_in_db_pool(action, member_id)
+    except Member.DoesNotExist:
+        return _attendance_api_error('Member not found.', 404)
+    except ValueError as exc:
+        return _attendance_api_error(str(exc), 409)
+    except IntegrityError:
+        return _attendance_api_error('Request conflicted with a concurrent update. Please retry.', 409)
+
+    audit_logger.info(
+        'ATTENDANCE_API | user=%s | endpoint=%s | member_id=%s | attendance_id=%s | ip=%s',
+        user.email,
+        endpoint,
+        member_id,
+        payload['attendance_id'],
+        get_client_ip(request),
+    )
+    return JsonResponse(payload, status=success_status)
+
+
+@require_POST
+async def attendance_api_check_in(request):
+    """Check in ``{"member_id": <id>}``; 201 on success, 409 when the visit is not allowed."""
+    return await _run_attendance_api(request, 'attendance_api_check_in', _api_check_in_member, 201)
+
+
+@require_POST
+async def attendance_api_check_out(request):
+    """Check out the open session of ``{"member_id": <id>}``; 409 when there is none."""
+    return await _run_attendance_api(request, 'attendance_api_check_out', _api_check_out_member, 200)
+
+
+# ==================== LIVE ATTENDANCE FEED (SSE) ====================
+
+LIVE_FEED_KEEPALIVE_SECONDS = 15
+
+
+def _sse_message(event_type, data):
+    return f"event: {event_type}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+def _live_feed_snapshot():
+    occupancy = OccupancyService.get_state()
+    return {
+        'count': occupancy['count'],
+        'members': sorted(occupancy['members'].values(), key=lambda entry: entry['check_in'], reverse=True),
+    }
+
+
+async def attendance_live_feed(request):
+    """
+    Server-sent events stream of check-ins and check-outs for staff screens.
+
+    Sends a ``snapshot`` of who is present (from the cached occupancy), then a
+    ``check_in`` or ``check_out`` event per committed change as published by
+    the attendance services, so open dashboards cost no database queries
+    after connecting. Streams end after GYM_LIVE_FEED_MAX_SECONDS and the
+    browser reconnects. Requires the ASGI server.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return _attendance_api_error('Authentication required.', 401)
+    if not await run_in_db_pool(has_staff_or_admin_attendance_access, user):
+        return _attendance_api_error('Staff or admin access required.', 403)
+    if not isinstance(request, ASGIRequest):
+        # A WSGI server would buffer the endless stream instead of sending it.
+        return _attendance_api_error('The live feed requires the ASGI server.', 501)
+
+    async def stream():
+        loop = asyncio.get_running_loop()
+        subscription = get_event_bus().subscribe()
+        try:
+            # Subscribe before taking the snapshot so no change falls in between.
+            await subscription.open()
+            snapshot = await run_in_db_pool(_live_feed_snapshot)
+            yield 'retry: 3000\n' + _sse_message('snapshot', snapshot)
+
+            deadline = loop.time() + settings.GYM_LIVE_FEED_MAX_SECONDS
+            while (remaining := deadline - loop.time()) > 0:
+                try:
+                    event = await asyncio.wait_for(
+                        subscription.get(),
+                        timeout=min(LIVE_FEED_KEEPALIVE_SECONDS, remaining),
+                    )
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+                yield _sse_message(event['type'], event)
+        finally:
+            await subscription.close()
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 # ==================== MEMBER DASHBOARD ====================
 
 class MemberDashboardView(MemberRequiredMixin, TemplateView):
@@ -935,9 +1161,7 @@ class MemberDashboardView(MemberRequiredMixin, TemplateView):
         member = self.request.user.member
         
         # Current subscription with plan details
-        context['current_subscription'] = member.subscriptions.select_related(
-            'plan'
-        ).filter(status='active').first()
+        context['current_subscription'] = SubscriptionService.get_active_subscription(member)
         
         # Recent attendance (optimized - no N+1)
         context['recent_attendance'] = member.attendance_records.order_by('-check_in')[:10]
@@ -983,9 +1207,7 @@ class MySubscriptionView(MemberRequiredMixin, TemplateView):
         member = self.request.user.member
         
         # Current subscription with plan
-        context['current_subscription'] = member.subscriptions.select_related(
-            'plan'
-        ).filter(status='active').first()
+        context['current_subscription'] = SubscriptionService.get_active_subscription(member)
         
         # Subscription history (optimized)
         context['subscription_history'] = member.subscriptions.select_related(
@@ -1067,11 +1289,8 @@ class TrainerDashboardView(TrainerRequiredMixin, TemplateView):
             'member__user'
         ).order_by('-check_in')[:15]
         
-        # Today's checked-in members
-        context['currently_present'] = Attendance.objects.filter(
-            date=today,
-            check_out__isnull=True
-        ).select_related('member__user').count()
+        # Today's checked-in members (cached live occupancy)
+        context['currently_present'] = OccupancyService.get_count()
         
         # Weekly attendance trend
         week_ago = today - timedelta(days=7)
@@ -1098,33 +1317,19 @@ class StaffDashboardView(StaffRequiredMixin, TemplateView):
             date=today
         ).select_related('member__user').order_by('-check_in')
         
-        # Currently present (not checked out)
-        currently_present_qs = Attendance.objects.filter(
-            date=today,
-            check_out__isnull=True
-        ).select_related('member__user').order_by('-check_in')
-        
-        context['currently_present_list'] = currently_present_qs
-        context['currently_present'] = currently_present_qs.count()
+        # Currently present (not checked out), served from the cached live occupancy
+        occupancy = OccupancyService.get_state()
+        context['currently_present_list'] = sorted(
+            occupancy['members'].values(), key=lambda entry: entry['check_in'], reverse=True
+        )
+        context['currently_present'] = occupancy['count']
         
         # Today's stats
         context['today_checkins'] = Attendance.objects.filter(date=today).count()
         context['total_members'] = Member.all_objects.count()  # Total registered members
         
-        # Active members for dropdown (optimized)
-        context['active_members'] = Member.objects.select_related('user').order_by('user__full_name')
-        
-        # Active members with subscription status (for validation)
-        # Prefetch active subscriptions to avoid N+1
-        active_subscription_prefetch = Prefetch(
-            'subscriptions',
-            queryset=Subscription.objects.filter(status='active').select_related('plan'),
-            to_attr='active_subs'
-        )
-        
-        context['members_with_subscription'] = Member.objects.select_related('user').prefetch_related(
-            active_subscription_prefetch
-        ).order_by('user__full_name')
+        # The check-in picker queries MemberSearchView as staff type instead of
+        # shipping the whole roster in the page.
         
         return context
 
@@ -1169,30 +1374,23 @@ class AttendanceReportView(StaffOrAdminRequiredMixin, TemplateView):
         context['start_date'] = start_date
         context['end_date'] = end_date
         
-        # Stats
+        # Stats (visit counts, peak hours and daily trend come from rollup buckets)
         attendance_records = Attendance.objects.filter(
             date__gte=start_date,
             date__lte=end_date
         )
+        rollup = AttendanceRollupService.summarize(start_date, end_date, peak_hours_limit=3)
         
-        context['total_visits'] = attendance_records.count()
+        context['total_visits'] = rollup['total_visits']
         context['unique_members'] = attendance_records.values('member').distinct().count()
         
         # Average visits per day
         days_diff = (end_date - start_date).days + 1
         context['avg_visits_per_day'] = round(context['total_visits'] / days_diff, 1) if days_diff > 0 else 0
         
-        # Peak hours analysis (group by hour)
-        from django.db.models.functions import ExtractHour
-        peak_hours = attendance_records.annotate(
-            hour=ExtractHour('check_in')
-        ).values('hour').annotate(
-            count=Count('id')
-        ).order_by('-count')[:3]
-        
         context['peak_hours'] = [
             {'hour': f"{ph['hour']}:00", 'count': ph['count']}
-            for ph in peak_hours
+            for ph in rollup['peak_hours']
         ]
         
         # Top members by visits
@@ -1205,11 +1403,7 @@ class AttendanceReportView(StaffOrAdminRequiredMixin, TemplateView):
         context['top_members'] = top_members
         
         # Daily breakdown
-        daily_stats = attendance_records.values('date').annotate(
-            count=Count('id')
-        ).order_by('date')
-        
-        context['daily_stats'] = daily_stats
+        context['daily_stats'] = rollup['daily_attendance']
         
         return context
 
@@ -1505,9 +1699,9 @@ def export_payments_csv(request):
         start_date = today - timedelta(days=30)
         end_date = today
     
-    csv_content = ExportService.export_payments_csv(start_date, end_date)
+    csv_lines = ExportService.export_payments_csv(start_date, end_date)
     
-    response = HttpResponse(csv_content.getvalue(), content_type='text/csv')
+    response = StreamingHttpResponse(csv_lines, content_type='text/csv')
     response['Content-Disposition'] = f'attachment; filename="payments_{start_date}_{end_date}.csv"'
     
     audit_logger.info(
@@ -1529,9 +1723,9 @@ def export_members_csv(request):
     
     include_subscription = request.GET.get('include_subscription', 'true').lower() == 'true'
     
-    csv_content = ExportService.export_members_csv(include_subscription)
+    csv_lines = ExportService.export_members_csv(include_subscription)
     
-    response = HttpResponse(csv_content.getvalue(), content_type='text/csv')
+    response = StreamingHttpResponse(csv_lines, content_type='text/csv')
     response['Content-Disposition'] = 'attachment; filename="members.csv"'
     
     audit_logger.info(
@@ -1562,9 +1756,9 @@ def export_attendance_csv(request):
         start_date = today - timedelta(days=30)
         end_date = today
     
-    csv_content = ExportService.export_attendance_csv(start_date, end_date)
+    csv_lines = ExportService.export_attendance_csv(start_date, end_date)
     
-    response = HttpResponse(csv_content.getvalue(), content_type='text/csv')
+    response = StreamingHttpResponse(csv_lines, content_type='text/csv')
     response['Content-Disposition'] = f'attachment; filename="attendance_{start_date}_{end_date}.csv"'
     
     audit_logger.info(
@@ -1596,9 +1790,9 @@ def export_revenue_csv(request):
         start_date = today - timedelta(days=30)
         end_date = today
     
-    csv_content = ExportService.export_revenue_report_csv(start_date, end_date)
+    csv_lines = ExportService.export_revenue_report_csv(start_date, end_date)
     
-    response = HttpResponse(csv_content.getvalue(), content_type='text/csv')
+    response = StreamingHttpResponse(csv_lines, content_type='text/csv')
     response['Content-Disposition'] = f'attachment; filename="revenue_{start_date}_{end_date}.csv"'
     
     audit_logger.info(
@@ -1824,26 +2018,23 @@ def run_expiry_notifications(request):
     if not request.user.is_superuser:
         raise PermissionDenied('Only superusers can run this command.')
     
-    from .services import NotificationService, SubscriptionService
-    
-    # First expire any past-due subscriptions
-    expired_count = SubscriptionService.check_and_expire_subscriptions()
+    from .services import NotificationService
     
-    # Then process notifications
+    # Expires past-due subscriptions, then creates and queues the notifications
     stats = NotificationService.process_expiry_notifications()
     
     audit_logger.info(
-        'MANUAL_EXPIRY_NOTIFICATIONS | user=%s | expired=%s | notifications=%s | emails=%s | ip=%s',
-        request.user.email, expired_count,
-        stats['notifications_created'], stats['emails_sent'],
+        'MANUAL_EXPIRY_NOTIFICATIONS | user=%s | expired=%s | notifications=%s | emails_queued=%s | ip=%s',
+        request.user.email, stats['expired'],
+        stats['notifications_created'], stats['emails_queued'],
         get_client_ip(request)
     )
     
     messages.success(
         request,
-        f'Processed expiry notifications: {expired_count} subscriptions expired, '
+        f'Processed expiry notifications: {stats["expired"]} subscriptions expired, '
         f'{stats["notifications_created"]} notifications created, '
-        f'{stats["emails_sent"]} emails sent.'
+        f'{stats["emails_queued"]} emails queued.'
     )
     
     return redirect('gym_management:admin_dashboard')
@@ -1902,9 +2093,12 @@ class SelfCheckInConfirmView(MemberRequiredMixin, TemplateView):
 
     def post(self, request, *args, **kwargs):
         token = request.POST.get('token')
-        context = self._build_context(token, **kwargs)
+        # The fused check-in path validates the token itself; skip the preview queries
+        context = self.get_context_data(**kwargs)
+        context['session_token'] = token
 
-        if context.get('error_message'):
+        if not token:
+            context['error_message'] = AttendanceService.INVALID_QR_MESSAGE
             return self.render_to_response(context)
 
         try:
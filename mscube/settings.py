@@ -205,10 +205,23 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 
 # Gym geofencing and QR session settings
+# GYM_LATITUDE / GYM_LONGITUDE / GYM_RADIUS_METERS define the gym until GymLocation branches are added
 GYM_LATITUDE = getenv_float('GYM_LATITUDE', 0.0 if DEBUG else None)
 GYM_LONGITUDE = getenv_float('GYM_LONGITUDE', 0.0 if DEBUG else None)
 GYM_RADIUS_METERS = getenv_float('GYM_RADIUS_METERS', 100.0)
 GYM_QR_SESSION_TTL_SECONDS = getenv_int('GYM_QR_SESSION_TTL_SECONDS', 60)
+# 'session' stores a CheckInSession row per scan; 'signed' issues stateless HMAC-signed tokens (needs USE_REDIS)
+GYM_QR_TOKEN_MODE = os.getenv('GYM_QR_TOKEN_MODE', 'session').strip().lower()
+GYM_QR_SESSION_RETENTION_HOURS = getenv_int('GYM_QR_SESSION_RETENTION_HOURS', 24)  # Kept for audit before purge_checkin_sessions deletes them
+GYM_LOCATION_RELOAD_SECONDS = getenv_int('GYM_LOCATION_RELOAD_SECONDS', 300)  # Branch geofences are cached per process
+GYM_OCCUPANCY_RECONCILE_SECONDS = getenv_int('GYM_OCCUPANCY_RECONCILE_SECONDS', 60)  # Max age of the cached live occupancy
+GYM_AUTO_CHECKOUT_AFTER_HOURS = getenv_int('GYM_AUTO_CHECKOUT_AFTER_HOURS', 12)  # Open sessions older than this are closed by auto_checkout_stale_attendance
+GYM_AUTO_CHECKOUT_VISIT_HOURS = getenv_int('GYM_AUTO_CHECKOUT_VISIT_HOURS', 2)  # Duration recorded for auto-closed visits
+GYM_ATTENDANCE_API_THREADS = getenv_int('GYM_ATTENDANCE_API_THREADS', 8)  # Thread pool (and DB connections) per ASGI worker for the kiosk API
+GYM_ATTENDANCE_API_RATE = os.getenv('GYM_ATTENDANCE_API_RATE', '300/m')  # Per-user request limit for the kiosk API
+GYM_LIVE_FEED_MAX_SECONDS = getenv_int('GYM_LIVE_FEED_MAX_SECONDS', 300)  # SSE streams end after this and the browser reconnects
+GYM_MEMBER_SEARCH_LIMIT = getenv_int('GYM_MEMBER_SEARCH_LIMIT', 20)  # Type-ahead matches returned per page
+GYM_LIST_COUNT_CAP = getenv_int('GYM_LIST_COUNT_CAP', 10000)  # Cursor-paged lists count at most this many rows; 0 disables counting
 
 if GYM_LATITUDE is None or GYM_LONGITUDE is None:
     raise ImproperlyConfigured(
@@ -221,6 +234,21 @@ if GYM_RADIUS_METERS is None or GYM_RADIUS_METERS <= 0:
 if GYM_QR_SESSION_TTL_SECONDS is None or GYM_QR_SESSION_TTL_SECONDS <= 0:
     raise ImproperlyConfigured('GYM_QR_SESSION_TTL_SECONDS must be greater than 0.')
 
+if GYM_QR_TOKEN_MODE not in {'session', 'signed'}:
+    raise ImproperlyConfigured("GYM_QR_TOKEN_MODE must be either 'session' or 'signed'.")
+
+if GYM_AUTO_CHECKOUT_VISIT_HOURS is None or GYM_AUTO_CHECKOUT_VISIT_HOURS <= 0:
+    raise ImproperlyConfigured('GYM_AUTO_CHECKOUT_VISIT_HOURS must be greater than 0.')
+
+if GYM_AUTO_CHECKOUT_AFTER_HOURS is None or GYM_AUTO_CHECKOUT_AFTER_HOURS < GYM_AUTO_CHECKOUT_VISIT_HOURS:
+    raise ImproperlyConfigured('GYM_AUTO_CHECKOUT_AFTER_HOURS must be at least GYM_AUTO_CHECKOUT_VISIT_HOURS.')
+
+if GYM_ATTENDANCE_API_THREADS is None or GYM_ATTENDANCE_API_THREADS <= 0:
+    raise ImproperlyConfigured('GYM_ATTENDANCE_API_THREADS must be greater than 0.')
+
+if GYM_LIST_COUNT_CAP is None or GYM_LIST_COUNT_CAP < 0:
+    raise ImproperlyConfigured('GYM_LIST_COUNT_CAP must be 0 or greater.')
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
@@ -252,6 +280,16 @@ else:
         }
     }
 
+# Signed QR tokens are single-use only through the cache, so it must be shared by every worker
+if GYM_QR_TOKEN_MODE == 'signed' and not USE_REDIS:
+    raise ImproperlyConfigured("GYM_QR_TOKEN_MODE='signed' requires USE_REDIS so used tokens are shared across workers.")
+
+# Admin dashboard snapshot lifetime; writes invalidate sections sooner via signals
+DASHBOARD_CACHE_TIMEOUT_SECONDS = getenv_int('DASHBOARD_CACHE_TIMEOUT_SECONDS', 300)
+
+# Subscription form member choices; member/subscription writes invalidate them sooner
+GYM_MEMBER_CHOICES_CACHE_SECONDS = getenv_int('GYM_MEMBER_CHOICES_CACHE_SECONDS', 3600)
+
 # ==================== AUTHENTICATION SETTINGS ====================
 
 # Site ID for django.contrib.sites
@@ -344,6 +382,13 @@ ESEWA_BASE_URL = os.getenv('ESEWA_BASE_URL', 'https://rc-epay.esewa.com.np')
 # Email settings for notifications
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'noreply@mscube.com')
 
+# Outbound email queue (drained by `python manage.py run_email_worker`)
+NOTIFICATION_EMAIL_BATCH_SIZE = getenv_int('NOTIFICATION_EMAIL_BATCH_SIZE', 100)  # Messages per SMTP connection
+EMAIL_QUEUE_MAX_ATTEMPTS = getenv_int('EMAIL_QUEUE_MAX_ATTEMPTS', 5)
+EMAIL_QUEUE_RETRY_BASE_SECONDS = getenv_int('EMAIL_QUEUE_RETRY_BASE_SECONDS', 60)  # Doubles on every retry
+EMAIL_QUEUE_RETRY_MAX_SECONDS = getenv_int('EMAIL_QUEUE_RETRY_MAX_SECONDS', 3600)
+EMAIL_QUEUE_LOCK_TIMEOUT_SECONDS = getenv_int('EMAIL_QUEUE_LOCK_TIMEOUT_SECONDS', 600)  # Reclaim rows from crashed workers
+
 
 # Security Settings (Production)
 if not DEBUG:
@@ -0,0 +1,124 @@
+// Type-ahead member picker: queries the member search endpoint as staff type
+// and fills a hidden member_id (or a list of member_ids) for the form.
+(() => {
+    const DEBOUNCE_MS = 200;
+
+    const initTypeahead = (root) => {
+        const input = root.querySelector('[data-typeahead-input]');
+        const results = root.querySelector('[data-typeahead-results]');
+        const value = root.querySelector('[data-typeahead-value]');
+        const selected = root.querySelector('[data-typeahead-selected]');
+        const multiple = root.hasAttribute('data-multiple');
+        const fieldName = root.dataset.fieldName;
+        let query = '';
+        let page = 1;
+        let timer = null;
+        let controller = null;
+
+        const hideResults = () => results.classList.add('hidden');
+
+        const choose = (member) => {
+            if (multiple) {
+                if (!selected.querySelector(`input[value="${member.id}"]`)) {
+                    const chip = document.createElement('span');
+                    chip.className = 'inline-flex items-center gap-2 px-3 py-1 bg-dark-bg border border-border rounded-full text-sm text-white';
+                    chip.textContent = member.name;
+                    const hidden = document.createElement('input');
+                    hidden.type = 'hidden';
+                    hidden.name = fieldName;
+                    hidden.value = member.id;
+                    const remove = document.createElement('button');
+                    remove.type = 'button';
+                    remove.className = 'text-text-muted hover:text-white';
+                    remove.textContent = '×';
+                    remove.addEventListener('click', () => chip.remove());
+                    chip.append(hidden, remove);
+                    selected.appendChild(chip);
+                }
+                input.value = '';
+            } else {
+                value.value = member.id;
+                input.value = member.name;
+            }
+            hideResults();
+        };
+
+        const render = (data, append) => {
+            if (!append) {
+                results.innerHTML = '';
+            }
+            results.querySelector('[data-typeahead-more]')?.remove();
+            data.results.forEach((member) => {
+                const item = document.createElement('li');
+                item.className = 'px-4 py-2 text-sm text-white cursor-pointer hover:bg-dark-bg flex justify-between';
+                item.textContent = `${member.name} (#${member.id})`;
+                const status = document.createElement('span');
+                status.className = member.subscription_status === 'active' ? 'text-success text-xs' : 'text-warning text-xs';
+                status.textContent = member.subscription_status === 'active' ? 'Active' : 'No subscription';
+                item.appendChild(status);
+                item.addEventListener('mousedown', (event) => {
+                    event.preventDefault();
+                    choose(member);
+                });
+                results.appendChild(item);
+            });
+            if (data.has_more) {
+                const more = document.createElement('li');
+                more.dataset.typeaheadMore = '';
+                more.className = 'px-4 py-2 text-xs text-primary cursor-pointer hover:bg-dark-bg';
+                more.textContent = 'Show more...';
+                more.addEventListener('mousedown', (event) => {
+                    event.preventDefault();
+                    search(page + 1);
+                });
+                results.appendChild(more);
+            }
+            if (!results.children.length) {
+                const empty = document.createElement('li');
+                empty.className = 'px-4 py-2 text-sm text-text-muted';
+                empty.textContent = 'No matching members';
+                results.appendChild(empty);
+            }
+            results.classList.remove('hidden');
+        };
+
+        const search = (nextPage) => {
+            controller?.abort();
+            controller = new AbortController();
+            const url = new URL(root.dataset.searchUrl, window.location.origin);
+            url.searchParams.set('q', query);
+            url.searchParams.set('page', nextPage);
+            fetch(url, {signal: controller.signal, headers: {'Accept': 'application/json'}})
+                .then((response) => (response.ok ? response.json() : Promise.reject(response)))
+                .then((data) => {
+                    page = data.page;
+                    render(data, nextPage > 1);
+                })
+                .catch(() => {});
+        };
+
+        input.addEventListener('input', () => {
+            if (value) {
+                value.value = '';
+            }
+            clearTimeout(timer);
+            query = input.value.trim();
+            if (!query) {
+                hideResults();
+                return;
+            }
+            timer = setTimeout(() => search(1), DEBOUNCE_MS);
+        });
+        input.addEventListener('blur', hideResults);
+
+        // A single pick must come from the list, not free text.
+        root.closest('form')?.addEventListener('submit', (event) => {
+            if (value && !value.value) {
+                event.preventDefault();
+                input.focus();
+            }
+        });
+    };
+
+    document.querySelectorAll('[data-member-typeahead]').forEach(initTypeahead);
+})();